@@ -0,0 +1 @@
+"""Benchmarks and local stand-ins for StudyBuddy's external services."""
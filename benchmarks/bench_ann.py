@@ -0,0 +1,117 @@
+"""Benchmark the approximate index types against exact FAISS search.
+
+Generates clustered unit vectors, a stand-in for embeddings of a large
+project, and builds each index type the app chooses from with
+core/ann_index.py: exact (Flat), HNSW, IVF and IVF with product
+quantization. Reports build time, index size, median query latency and
+recall@k against the exact index, measured with the same queries the app
+measures after each build.
+
+Usage:
+    python -m benchmarks.bench_ann --sizes 50000,200000 --dimensions 384
+"""
+
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from src.studybuddy.config.settings import settings
+from src.studybuddy.core.ann_index import (
+    AnnIndex,
+    build_index,
+    ivf_list_count,
+    measure_recall,
+    pq_code_size,
+)
+
+
+def make_vectors(count: int, dimensions: int, seed: int) -> np.ndarray:
+    """Create clustered unit vectors, like embeddings of chunks on a few topics."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 500), dimensions), dtype=np.float32)
+    # Chunks vary along a few directions of their topic, plus a little noise
+    directions = rng.standard_normal((len(centers), 16, dimensions), dtype=np.float32) * 0.25
+    vectors = np.empty((count, dimensions), dtype=np.float32)
+    for start in range(0, count, 10000):
+        end = min(count, start + 10000)
+        topics = rng.integers(0, len(centers), end - start)
+        weights = rng.standard_normal((end - start, 16), dtype=np.float32)
+        vectors[start:end] = (
+            centers[topics]
+            + np.einsum("nk,nkd->nd", weights, directions[topics])
+            + rng.standard_normal((end - start, dimensions), dtype=np.float32) * 0.05
+        )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_spec(exact_index, spec: str, args) -> dict:
+    """Build one index type and measure it against the exact index."""
+    if spec == "Flat":
+        ann = AnnIndex(exact_index, spec, {"build_seconds": 0.0})
+    else:
+        ann = build_index(exact_index, spec)
+    measured = measure_recall(exact_index, ann, args.k, args.queries)
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = exact_index.reconstruct_batch(
+        rng.choice(exact_index.ntotal, args.queries, replace=False)
+    )
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        ann.search(query[None], args.k, exact_index)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "build_s": ann.info["build_seconds"],
+        "size_mb": round(faiss.serialize_index(ann.index).nbytes / 2**20, 1),
+        "p50_ms": round(sorted(latencies)[len(latencies) // 2], 3),
+        "recall_at_k": 1.0 if spec == "Flat" else measured["recall_at_k"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=lambda value: [int(size) for size in value.split(",")],
+        default=[50000, 200000],
+    )
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_FETCH_K)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        exact_index = faiss.IndexFlatL2(args.dimensions)
+        exact_index.add(make_vectors(size, args.dimensions, args.seed))
+        nlist = ivf_list_count(size)
+        specs = [
+            "Flat",
+            f"HNSW{settings.ANN_HNSW_M},Flat",
+            f"IVF{nlist},Flat",
+            f"IVF{nlist},PQ{pq_code_size(args.dimensions)}",
+        ]
+        results[size] = {spec: bench_spec(exact_index, spec, args) for spec in specs}
+
+    print(
+        json.dumps(
+            {
+                "dimensions": args.dimensions,
+                "k": args.k,
+                "hnsw_ef_search": settings.ANN_HNSW_EF_SEARCH,
+                "ivf_nprobe": settings.ANN_IVF_NPROBE,
+                "pq_rerank_factor": settings.ANN_RERANK_FACTOR,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
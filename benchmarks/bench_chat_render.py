@@ -0,0 +1,106 @@
+"""Benchmark drawing a long chat history with Streamlit.
+
+Renders a synthetic history headless with Streamlit's AppTest and times
+reruns of the same session, once with the windowed, cached renderer of
+UIComponents.render_chat_history and once with the per-message loop it
+replaced.
+
+Usage:
+    python -m benchmarks.bench_chat_render --messages 1000 --reruns 20
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from streamlit.testing.v1 import AppTest
+
+
+def render_app():
+    """Script run by AppTest; draws st.session_state.history."""
+    import streamlit as st
+
+    from src.studybuddy.ui.components import UIComponents
+    from src.studybuddy.ui.templates import BOT_MESSAGE_TEMPLATE, USER_MESSAGE_TEMPLATE
+
+    history = st.session_state.history
+    if st.session_state.mode == "windowed":
+        UIComponents.render_chat_history(history)
+    else:
+        # The loop render_chat_history used before
+        st.markdown('<div class="chat-container">', unsafe_allow_html=True)
+        for i, message in enumerate(history):
+            template = USER_MESSAGE_TEMPLATE if i % 2 == 0 else BOT_MESSAGE_TEMPLATE
+            st.markdown(template.replace("{{MSG}}", message.content), unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+
+
+def make_history(rng: random.Random, count: int) -> list:
+    """Create alternating questions and answers of realistic length."""
+    words = ["cell", "energy", "membrane", "protein", "enzyme", "light", "water", "atp"]
+    history = []
+    for position in range(count):
+        if position % 2 == 0:
+            text = "What is " + " ".join(rng.choices(words, k=8)) + "?"
+            history.append(HumanMessage(content=text))
+        else:
+            history.append(AIMessage(content=" ".join(rng.choices(words, k=120)) + "."))
+    return history
+
+
+def time_mode(mode: str, history: list, reruns: int) -> dict:
+    """Time the first render and the reruns of one rendering mode."""
+    app = AppTest.from_function(render_app, default_timeout=120)
+    app.session_state["mode"] = mode
+    app.session_state["history"] = history
+
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+    if app.exception:
+        raise SystemExit(app.exception[0].message)
+
+    latencies = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "elements": len(app.markdown),
+        "first_run_ms": round(first_run * 1000, 1),
+        "rerun_mean_ms": round(statistics.fmean(latencies), 1),
+        "rerun_p50_ms": round(latencies[len(latencies) // 2], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    history = make_history(random.Random(args.seed), args.messages)
+    windowed = time_mode("windowed", history, args.reruns)
+    per_message = time_mode("per_message", history, args.reruns)
+
+    print(
+        json.dumps(
+            {
+                "messages": len(history),
+                "windowed": windowed,
+                "per_message": per_message,
+                "speedup": round(per_message["rerun_mean_ms"] / windowed["rerun_mean_ms"], 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
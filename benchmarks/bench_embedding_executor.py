@@ -0,0 +1,147 @@
+"""Benchmark BatchedEmbeddingExecutor against the local fake OpenAI server.
+
+Measures embedding throughput at several concurrency levels with injected
+latency and errors, then checks that a failed run resumes from the
+embedding cache without re-sending completed batches.
+
+Usage:
+    python -m benchmarks.bench_embedding_executor --texts 2000 --latency-ms 100 --error-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from src.studybuddy.core.embedding_cache import CachedEmbeddings
+from src.studybuddy.core.embedding_executor import BatchedEmbeddingExecutor
+
+
+class SDKEmbeddings(Embeddings):
+    """Minimal OpenAI SDK embeddings client, one request per call.
+
+    OpenAIEmbeddings tokenizes with tiktoken before sending, which needs to
+    download its encoding; this client keeps the benchmark fully offline.
+    """
+
+    def __init__(self, base_url: str):
+        self.client = openai.OpenAI(base_url=base_url, api_key="fake-key", max_retries=0)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(
+            model="text-embedding-ada-002", input=texts, encoding_format="float"
+        )
+        return [item.embedding for item in response.data]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_client(server: FakeOpenAIServer) -> Embeddings:
+    """Create an OpenAI embeddings client pointed at the fake server."""
+    return SDKEmbeddings(server.base_url)
+
+
+def run_throughput(args, concurrency: int) -> dict:
+    """Embed the synthetic texts at one concurrency level."""
+    texts = [f"chunk {i} " + "lorem ipsum " * 40 for i in range(args.texts)]
+    with FakeOpenAIServer(
+        latency_ms=args.latency_ms, error_rate=args.error_rate, seed=concurrency
+    ) as server:
+        executor = BatchedEmbeddingExecutor(
+            make_client(server),
+            batch_size=args.batch_size,
+            max_concurrency=concurrency,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            backoff_base=0.05,
+            backoff_max=1.0,
+        )
+        start = time.perf_counter()
+        vectors = executor.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+
+    assert len(vectors) == len(texts)
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "texts_per_second": round(len(texts) / elapsed, 1),
+        "requests": executor.requests,
+        "retries": executor.retries,
+        "server_max_in_flight": server.max_in_flight,
+    }
+
+
+def run_resume(args) -> dict:
+    """Fail a run part-way, then resume it through the embedding cache."""
+    texts = [f"resume {i} " + "dolor sit amet " * 30 for i in range(args.texts)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "cache.sqlite3")
+
+        # Errors that are never retried make the first run stop part-way
+        with FakeOpenAIServer(error_rate=0.2, error_status=400, seed=1) as server:
+            cache = CachedEmbeddings(
+                BatchedEmbeddingExecutor(
+                    make_client(server),
+                    batch_size=args.batch_size,
+                    max_concurrency=4,
+                    max_retries=0,
+                ),
+                model_name="fake-embedding",
+                path=cache_path,
+                max_entries=len(texts) * 2,
+            )
+            try:
+                cache.embed_documents(texts)
+                first_run_failed = False
+            except Exception:
+                first_run_failed = True
+            cached_after_failure = cache.get_stats()["entries"]
+
+        with FakeOpenAIServer(seed=2) as server:
+            resumed = CachedEmbeddings(
+                BatchedEmbeddingExecutor(
+                    make_client(server), batch_size=args.batch_size, max_concurrency=4
+                ),
+                model_name="fake-embedding",
+                path=cache_path,
+                max_entries=len(texts) * 2,
+            )
+            resumed.embed_documents(texts)
+            resumed_requests = server.requests
+
+    return {
+        "first_run_failed": first_run_failed,
+        "cached_after_failure": cached_after_failure,
+        "resumed_cache_hits": resumed.hits,
+        "resumed_requests": resumed_requests,
+        "full_run_requests": -(-len(texts) // args.batch_size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rpm", type=float, default=100000)
+    parser.add_argument("--tpm", type=float, default=100000000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    results = {
+        "throughput": [run_throughput(args, level) for level in args.concurrency],
+        "resume": run_resume(args),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the cost of a Streamlit rerun of the StudyBuddy app.
+
+Runs main.py headless with Streamlit's AppTest and times repeated reruns
+of the same session, as triggered by every widget interaction. With
+--cold, the shared resource cache is cleared before each rerun, which
+reproduces building every service from scratch on each rerun.
+
+Usage:
+    python -m benchmarks.bench_rerun_overhead --reruns 20
+    python -m benchmarks.bench_rerun_overhead --reruns 20 --cold
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--cold", action="store_true")
+    args = parser.parse_args()
+
+    # No request is sent during a rerun without user input; the key only
+    # has to pass the environment check
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("STUDYBUDDY_MODELS_DIR", tempfile.mkdtemp())
+
+    app = AppTest.from_file("main.py", default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+    if app.exception:
+        raise SystemExit(app.exception[0].message)
+
+    latencies = []
+    for _ in range(args.reruns):
+        if args.cold:
+            st.cache_resource.clear()
+        start = time.perf_counter()
+        app.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "cold": args.cold,
+                "first_run_ms": round(first_run * 1000, 1),
+                "reruns": len(latencies),
+                "rerun_mean_ms": round(statistics.fmean(latencies), 1),
+                "rerun_p50_ms": round(latencies[len(latencies) // 2], 1),
+                "rerun_max_ms": round(latencies[-1], 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Benchmark PageTextSplitter against the character splitter it replaced.
+
+Generates a synthetic corpus of page texts, wrapped into lines as PDF
+extraction returns them, and splits it twice: with the previous
+CharacterTextSplitter setup (newline separator, 1,000 characters, 200
+overlap, all documents joined into one string) and with PageTextSplitter
+over each document's page stream. Reports time, peak memory, chunk token
+sizes and how many chunks span two documents.
+
+Usage:
+    python -m benchmarks.bench_splitter --pages 2000 --documents 20
+"""
+
+import argparse
+import bisect
+import json
+import random
+import time
+import tracemalloc
+from typing import List
+
+from langchain.text_splitter import CharacterTextSplitter
+
+from benchmarks.corpus import LINE_CHARS, make_page_text
+from src.studybuddy.config.settings import settings
+from src.studybuddy.core.text_splitter import PageTextSplitter
+
+
+def make_documents(rng: random.Random, documents: int, pages: int, words: int) -> List[List[str]]:
+    """Create documents as lists of page texts with extraction-like lines."""
+    corpus = []
+    for _ in range(documents):
+        document = []
+        for _ in range(pages // documents):
+            text = make_page_text(rng, rng.randint(words // 2, words))
+            lines = [text[start : start + LINE_CHARS] for start in range(0, len(text), LINE_CHARS)]
+            document.append("\n".join(lines))
+        corpus.append(document)
+    return corpus
+
+
+def token_stats(token_counts: List[int]) -> dict:
+    """Summarize chunk sizes in tokens."""
+    ordered = sorted(token_counts)
+    return {
+        "tokens_mean": round(sum(ordered) / len(ordered), 1),
+        "tokens_p95": ordered[int(len(ordered) * 0.95)],
+        "tokens_max": ordered[-1],
+        "over_budget": sum(count > settings.CHUNK_TOKENS for count in ordered),
+    }
+
+
+def run_timed(func):
+    """Run a function once for time and once under tracemalloc for peak memory."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(elapsed * 1000, 1), round(peak / 2**20, 1)
+
+
+def bench_character(corpus: List[List[str]], count_tokens) -> dict:
+    """Split the joined text of every document like split_text_into_chunks did."""
+    splitter = CharacterTextSplitter(
+        separator="\n", chunk_size=1000, chunk_overlap=200, length_function=len,
+        add_start_index=True,
+    )
+    texts = ["".join(f"{page}\n" for page in document) for document in corpus]
+    boundaries, offset = [], 0
+    for text in texts[:-1]:
+        offset += len(text)
+        boundaries.append(offset)
+    raw_text = "".join(texts)
+
+    chunks, elapsed_ms, peak_mb = run_timed(lambda: splitter.create_documents([raw_text]))
+    spanning = 0
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        end = start + len(chunk.page_content)
+        # A boundary strictly inside the chunk means it mixes two documents
+        position = bisect.bisect_right(boundaries, start)
+        spanning += position < len(boundaries) and boundaries[position] < end
+    return {
+        "ms": elapsed_ms,
+        "peak_mb": peak_mb,
+        "chunks": len(chunks),
+        "chunks_spanning_documents": spanning,
+        "provenance": False,
+        **token_stats([count_tokens(chunk.page_content) for chunk in chunks]),
+    }
+
+
+def bench_page_tokens(corpus: List[List[str]]) -> dict:
+    """Split each document's page stream into chunk records."""
+    splitter = PageTextSplitter()
+
+    def split():
+        return [
+            record
+            for number, document in enumerate(corpus)
+            for record in splitter.split_pages(document, f"document-{number}")
+        ]
+
+    # Counts are cached across documents, as in the shared processor; the
+    # first, uncached run is timed
+    records, elapsed_ms, peak_mb = run_timed(split)
+    return {
+        "ms": elapsed_ms,
+        "peak_mb": peak_mb,
+        "chunks": len(records),
+        "chunks_spanning_documents": 0,
+        "provenance": True,
+        **token_stats([splitter.count_tokens(record.text) for record in records]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--words-per-page", type=int, default=450)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_documents(
+        random.Random(args.seed), args.documents, args.pages, args.words_per_page
+    )
+    # One counter for both, so sizes are comparable; it is not timed
+    counter = PageTextSplitter(chunk_tokens=10**9)
+
+    page_tokens = bench_page_tokens(corpus)
+    character = bench_character(corpus, counter.count_tokens)
+    print(
+        json.dumps(
+            {
+                "pages": sum(len(document) for document in corpus),
+                "documents": len(corpus),
+                "characters": sum(len(page) + 1 for document in corpus for page in document),
+                "chunk_tokens": settings.CHUNK_TOKENS,
+                "tokenizer": "tiktoken" if _has_encoding() else "estimate",
+                "character_splitter": character,
+                "page_token_splitter": page_tokens,
+            },
+            indent=2,
+        )
+    )
+
+
+def _has_encoding() -> bool:
+    from src.studybuddy.core.tokens import get_encoding
+
+    return get_encoding(settings.EMBEDDING_MODEL) is not None
+
+
+if __name__ == "__main__":
+    main()
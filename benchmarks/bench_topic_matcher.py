@@ -0,0 +1,127 @@
+"""Benchmark TopicMatcher against the linear topic scan it replaced.
+
+Builds a synthetic syllabus of topic phrases, then times question matching
+with the indexed matcher and with the old per-topic loop, and the cost of
+adding topics one at a time between questions.
+
+Usage:
+    python -m benchmarks.bench_topic_matcher --topics 100000 --queries 2000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List, Optional
+
+from src.studybuddy.core.topic_matcher import TopicMatcher
+
+
+def make_vocabulary(rng: random.Random, size: int) -> List[str]:
+    """Create pronounceable pseudo-words."""
+    consonants, vowels = "bcdfghklmnprstvz", "aeiou"
+    words = set()
+    while len(words) < size:
+        syllables = rng.randint(2, 4)
+        words.add(
+            "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables))
+        )
+    return sorted(words)
+
+
+def make_topics(rng: random.Random, vocabulary: List[str], count: int) -> List[str]:
+    """Create distinct topic phrases of one to four words."""
+    topics: Dict[str, None] = {}
+    while len(topics) < count:
+        topics[" ".join(rng.sample(vocabulary, rng.randint(1, 4)))] = None
+    return list(topics)
+
+
+def make_queries(
+    rng: random.Random, vocabulary: List[str], topics: List[str], count: int
+) -> List[str]:
+    """Create questions; half of them mention a topic phrase."""
+    queries = []
+    for position in range(count):
+        words = ["what", "is"] + rng.sample(vocabulary, rng.randint(2, 8))
+        if position % 2 == 0:
+            words.insert(rng.randrange(2, len(words)), rng.choice(topics))
+        queries.append(" ".join(words) + "?")
+    return queries
+
+
+def linear_match(topics: List[str], query: str) -> Optional[str]:
+    """The topic loop ChatbotService.generate_response used before."""
+    for topic in topics:
+        if topic in query or any(word in query for word in topic.split()):
+            return topic
+    return None
+
+
+def time_queries(match, queries: List[str]) -> dict:
+    """Time each query and summarize the latencies in milliseconds."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        match(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "queries": len(queries),
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 4),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--linear-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    topics = make_topics(rng, vocabulary, args.topics)
+    queries = make_queries(rng, vocabulary, topics, args.queries)
+
+    start = time.perf_counter()
+    matcher = TopicMatcher(topics)
+    matcher.match("warm up")  # compiles the automaton
+    build_seconds = time.perf_counter() - start
+
+    indexed = time_queries(matcher.match, queries)
+    indexed["build_seconds"] = round(build_seconds, 3)
+
+    # Topics added between questions, as add_to_knowledge_base does
+    extra = make_topics(rng, vocabulary, 1000)
+    start = time.perf_counter()
+    for position, topic in enumerate(extra):
+        matcher.add(topic)
+        matcher.match(queries[position % len(queries)])
+    incremental_ms = (time.perf_counter() - start) * 1000 / len(extra)
+
+    linear = time_queries(
+        lambda query: linear_match(topics, query), queries[: args.linear_queries]
+    )
+
+    print(
+        json.dumps(
+            {
+                "topics": len(topics),
+                "indexed": indexed,
+                "add_then_match_mean_ms": round(incremental_ms, 4),
+                "linear": linear,
+                "speedup": round(linear["mean_ms"] / indexed["mean_ms"], 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Benchmark compact vector storage and memory-mapped project loading.
+
+Saves the same project, clustered unit vectors as in bench_ann.py and
+synthetic chunk texts, once per settings.VECTOR_STORAGE type through
+IndexStore. Each saved project is then loaded in a fresh interpreter that
+runs queries the way a session does, and the growth of its private
+(anonymous) and shared (file-backed, memory-mapped) resident memory is
+reported. "float32-in-memory" loads the float32 project fully into memory,
+as projects were loaded before memory mapping, for comparison. Shared
+pages live in the OS cache, so sessions and processes searching the same
+project hold them once.
+
+The ranking change of float16 and int8 storage is measured against
+float32 on chunk vectors with a little noise added: the average share of
+the float32 top-k found in the top-k, and how often the top hit agrees.
+
+Resident memory is read from /proc, so memory figures need Linux.
+
+Usage:
+    python -m benchmarks.bench_vector_storage --count 50000 --dimensions 384
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import make_vectors
+from benchmarks.fakes import FakeEmbeddings
+from src.studybuddy.config.settings import settings
+from src.studybuddy.core.index_store import IndexStore
+
+STORAGE_TYPES = ("float32", "float16", "int8")
+PROJECT_ID = "bench"
+
+
+def resident_mb() -> dict:
+    """Get this process's private and shared resident memory in MB."""
+    memory = {}
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                memory[key] = int(value.split()[0]) / 1024
+    return {"private_mb": memory["RssAnon"], "shared_mb": memory["RssFile"]}
+
+
+def make_texts(count: int, chars: int, seed: int) -> list:
+    """Create chunk texts of about the given length from a small vocabulary."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word{i}" for i in range(2000)])
+    per_text = max(1, chars // 8)
+    return [
+        f"Chunk {i}. " + " ".join(words[rng.integers(0, len(words), per_text)])
+        for i in range(count)
+    ]
+
+
+def build_project(models_dir: str, args) -> dict:
+    """Save the benchmark project once per storage type.
+
+    Returns:
+        Saved file sizes in MB and save seconds per storage type
+    """
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    from src.studybuddy.core.vector_storage import create_index
+
+    vectors = make_vectors(args.count, args.dimensions, args.seed)
+    texts = make_texts(args.count, args.text_chars, args.seed)
+    settings.VECTOR_STORAGE = "float32"
+    settings.ANN_INDEX_TYPE = "flat"
+    vector_store = FAISS(
+        FakeEmbeddings(args.dimensions),
+        create_index(args.dimensions, vectors),
+        InMemoryDocstore(),
+        {},
+    )
+    file_hash = "0" * 64
+    vector_store.add_embeddings(
+        zip(texts, vectors),
+        metadatas=[{"source": "bench.pdf", "page": i // 4} for i in range(args.count)],
+        ids=[IndexStore.chunk_id(file_hash, i) for i in range(args.count)],
+    )
+    exact_index = vector_store.index
+
+    results = {}
+    for storage in STORAGE_TYPES:
+        store = IndexStore(os.path.join(models_dir, storage))
+        manifest = store.new_manifest()
+        manifest["files"] = [
+            {"name": "bench.pdf", "sha256": file_hash, "chunk_count": args.count}
+        ]
+        settings.VECTOR_STORAGE = storage
+        vector_store.index = exact_index
+        start = time.perf_counter()
+        store.save(PROJECT_ID, vector_store, manifest)
+        project_dir = store.project_dir(PROJECT_ID)
+        results[storage] = {
+            "save_s": round(time.perf_counter() - start, 2),
+            "vectors_mb": round(os.path.getsize(project_dir / store.INDEX_FILE) / 2**20, 1),
+            "chunks_mb": round(
+                sum(
+                    os.path.getsize(project_dir / name)
+                    for name in (store.CHUNKS_FILE, store.OFFSETS_FILE)
+                )
+                / 2**20,
+                1,
+            ),
+        }
+    return results
+
+
+def measure_ranking(models_dir: str, args) -> dict:
+    """Compare the rankings of each storage type with float32."""
+    rng = np.random.default_rng(args.seed + 1)
+    loaded = {
+        storage: IndexStore(os.path.join(models_dir, storage)).load(
+            PROJECT_ID, FakeEmbeddings(args.dimensions)
+        )
+        for storage in STORAGE_TYPES
+    }
+    reference = loaded["float32"].index
+    queries = reference.reconstruct_batch(
+        rng.choice(reference.ntotal, args.queries, replace=False)
+    )
+    # Perturbed chunks rather than midpoints, so the top hit is rarely a tie
+    queries += rng.standard_normal(queries.shape, dtype=np.float32) * args.noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    _, expected = reference.search(queries, args.k)
+
+    results = {}
+    for storage, vector_store in loaded.items():
+        _, found = vector_store.index.search(queries, args.k)
+        overlap = [
+            len(set(row_found) & set(row_expected)) / args.k
+            for row_found, row_expected in zip(found, expected)
+        ]
+        results[storage] = {
+            "top_k_overlap": round(float(np.mean(overlap)), 4),
+            "top_1_agreement": round(float(np.mean(found[:, 0] == expected[:, 0])), 4),
+        }
+    return results
+
+
+def measure_memory(models_dir: str, storage: str, args) -> dict:
+    """Load a saved project and query it in a fresh interpreter."""
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.bench_vector_storage",
+            "--child", models_dir, storage,
+            "--dimensions", str(args.dimensions),
+            "--k", str(args.k), "--queries", str(args.queries),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_child(models_dir: str, storage: str, args) -> dict:
+    """Load a project, run queries and get the resident memory this added."""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    from src.studybuddy.core.vector_storage import ChunkDocstore
+
+    # Searched exactly, like the saved project; no approximate index is built
+    settings.ANN_INDEX_TYPE = "flat"
+    in_memory = storage == "float32-in-memory"
+    store = IndexStore(os.path.join(models_dir, "float32" if in_memory else storage))
+    project_dir = store.project_dir(PROJECT_ID)
+    embeddings = FakeEmbeddings()
+    # Load what every process has loaded after its first question: the
+    # embedding backend and BLAS buffers
+    importlib.import_module("src.studybuddy.core.embeddings")
+    store.is_compatible(store.load_manifest(PROJECT_ID))
+    warm_index = faiss.IndexFlatL2(args.dimensions)
+    warm_index.add(np.zeros((1, args.dimensions), dtype=np.float32))
+    warm_index.search(np.zeros((1, args.dimensions), dtype=np.float32), 1)
+    before = resident_mb()
+    start = time.perf_counter()
+    if in_memory:
+        chunks = ChunkDocstore(project_dir / store.CHUNKS_FILE, project_dir / store.OFFSETS_FILE)
+        vector_store = FAISS(
+            embeddings,
+            faiss.read_index(str(project_dir / store.INDEX_FILE)),
+            InMemoryDocstore({chunk_id: chunks.search(chunk_id) for chunk_id in chunks.ids}),
+            dict(enumerate(chunks.ids)),
+        )
+    else:
+        vector_store = store.load(PROJECT_ID, embeddings)
+    load_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed)
+    queries = rng.standard_normal((args.queries, vector_store.index.d), dtype=np.float32)
+    start = time.perf_counter()
+    for query in queries:
+        vector_store.similarity_search_with_score_by_vector(query, k=args.k)
+    query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    after = resident_mb()
+    return {
+        "load_s": round(load_s, 3),
+        "query_ms": round(query_ms, 2),
+        **{key: round(after[key] - before[key], 1) for key in after},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--text-chars", type=int, default=600)
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_FETCH_K)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", nargs=2, metavar=("MODELS_DIR", "STORAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(*args.child, args)))
+        return
+
+    with tempfile.TemporaryDirectory() as models_dir:
+        results = build_project(models_dir, args)
+        for storage, ranking in measure_ranking(models_dir, args).items():
+            results[storage].update(ranking)
+        memory = {
+            storage: measure_memory(models_dir, storage, args)
+            for storage in ("float32-in-memory",) + STORAGE_TYPES
+        }
+
+    print(
+        json.dumps(
+            {
+                "count": args.count,
+                "dimensions": args.dimensions,
+                "text_chars": args.text_chars,
+                "k": args.k,
+                "storage": results,
+                "memory_after_load_and_queries": memory,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
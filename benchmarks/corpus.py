@@ -0,0 +1,144 @@
+"""Synthetic PDF corpus for StudyBuddy benchmarks.
+
+Writes valid, text-extractable PDFs of a chosen number of pages and words
+per page without any PDF library, so benchmarks need no sample documents.
+The text is drawn from a fixed study vocabulary with a seeded generator,
+so the same arguments always produce byte-identical files.
+
+Usage:
+    python -m benchmarks.corpus --files 4 --pages 50 --words-per-page 400 --out corpus/
+"""
+
+import argparse
+import io
+import os
+import random
+from typing import List
+
+VOCABULARY = (
+    "cell membrane nucleus mitochondria protein enzyme energy glucose oxygen "
+    "carbon dioxide water light chlorophyll photosynthesis respiration atp dna "
+    "rna gene chromosome mutation evolution species ecosystem force mass "
+    "acceleration velocity momentum gravity friction energy work power heat "
+    "temperature pressure volume atom molecule bond reaction acid base salt "
+    "equation function derivative integral limit matrix vector probability "
+    "theorem proof history empire revolution treaty economy trade culture"
+).split()
+
+# Characters per line and lines per page that fit a Letter page at 10 pt
+LINE_CHARS = 90
+PAGE_LINES = 60
+
+
+class CorpusFile(io.BytesIO):
+    """In-memory PDF with a name, like a Streamlit UploadedFile."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Build a PDF with one page per text, wrapped into lines.
+
+    Text beyond a page's PAGE_LINES lines is cut off.
+    """
+    page_count = len(pages)
+    font_id = 3 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(page_count))}]"
+            f" /Count {page_count} >>"
+        ).encode(),
+    ]
+    for index, text in enumerate(pages):
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * index} 0 R >>"
+            ).encode()
+        )
+        lines = [text[start : start + LINE_CHARS] for start in range(0, len(text), LINE_CHARS)]
+        content = (
+            "BT /F1 10 Tf 36 756 Td 12 TL "
+            + " ".join(f"({_escape(line)}) '" for line in lines[:PAGE_LINES])
+            + " ET"
+        ).encode("latin-1", "replace")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+        )
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(output)
+
+
+def make_page_text(rng: random.Random, words: int) -> str:
+    """Create one page of sentence-like study text."""
+    sentences, remaining = [], words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 20))
+        sentence = " ".join(rng.choices(VOCABULARY, k=length))
+        sentences.append(sentence.capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+
+def make_corpus(
+    files: int = 4, pages: int = 50, words_per_page: int = 400, seed: int = 0
+) -> List[CorpusFile]:
+    """Create named in-memory PDFs.
+
+    Args:
+        files: Number of PDFs
+        pages: Pages per PDF
+        words_per_page: Words of text per page (about 500 fit a page)
+        seed: Seed of the text generator
+
+    Returns:
+        PDFs named lecture_<n>.pdf, usable wherever uploads are expected
+    """
+    rng = random.Random(seed)
+    return [
+        CorpusFile(
+            f"lecture_{number}.pdf",
+            make_pdf([make_page_text(rng, words_per_page) for _ in range(pages)]),
+        )
+        for number in range(files)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="corpus")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for pdf in make_corpus(args.files, args.pages, args.words_per_page, args.seed):
+        with open(os.path.join(args.out, pdf.name), "wb") as f:
+            f.write(pdf.getvalue())
+        print(os.path.join(args.out, pdf.name))
+
+
+if __name__ == "__main__":
+    main()
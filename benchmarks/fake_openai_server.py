@@ -0,0 +1,179 @@
+"""Local OpenAI-compatible embeddings server with latency and error injection.
+
+Serves ``POST /v1/embeddings`` with deterministic vectors, so the embedding
+pipeline can be exercised without network access or API costs. Point the
+OpenAI client at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1``.
+
+Usage:
+    python -m benchmarks.fake_openai_server --port 8765 --latency-ms 200 --error-rate 0.1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+def fake_embedding(item, dimensions: int) -> List[float]:
+    """Build a deterministic unit vector for a text or token list."""
+    digest = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    rng = random.Random(struct.unpack("<Q", digest[:8])[0])
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+class FakeOpenAIServer:
+    """Threaded stand-in for the OpenAI embeddings endpoint.
+
+    Args:
+        port: Port to listen on, 0 picks a free one
+        latency_ms: Delay added to every request
+        error_rate: Fraction of requests answered with ``error_status``
+        error_status: HTTP status of injected errors (429 adds Retry-After)
+        dimensions: Length of the returned vectors
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        dimensions: int = 256,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.dimensions = dimensions
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass as the OpenAI client's base_url."""
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    fail = server._rng.random() < server.error_rate
+                    if fail:
+                        server.errors += 1
+                try:
+                    time.sleep(server.latency_ms / 1000.0)
+                    if not self.path.rstrip("/").endswith("/embeddings"):
+                        self._reply(404, {"error": {"message": "Not found"}})
+                    elif fail:
+                        self._reply(
+                            server.error_status,
+                            {"error": {"message": "Injected error", "type": "fake"}},
+                            {"Retry-After": "0.05"} if server.error_status == 429 else {},
+                        )
+                    else:
+                        self._reply(200, server._embeddings_response(json.loads(body)))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _embeddings_response(self, request: dict) -> dict:
+        """Build an OpenAI-style embeddings response."""
+        inputs = request.get("input", [])
+        # A single string or a single token list is one input
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        tokens = sum(len(item) if isinstance(item, list) else len(item) // 4 for item in inputs)
+        return {
+            "object": "list",
+            "model": request.get("model", "fake-embedding"),
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": fake_embedding(item, self.dimensions),
+                }
+                for index, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+
+def main():
+    """Run the stand-in server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--dimensions", type=int, default=256)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        dimensions=args.dimensions,
+    )
+    print(f"Serving fake OpenAI embeddings at {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Deterministic stand-ins for the OpenAI embeddings and chat models.
+
+They answer instantly (or after a fixed delay) and always return the same
+output for the same input, so benchmark timings measure StudyBuddy's own
+code rather than the network, and runs can be compared.
+"""
+
+import hashlib
+import time
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded by the hash of each text.
+
+    Args:
+        dimensions: Vector length
+        latency_ms: Delay added to every call, as a stand-in for an API round trip
+    """
+
+    def __init__(self, dimensions: int = 384, latency_ms: float = 0.0):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.texts = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts."""
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self.embed_matrix(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query."""
+        return self.embed_documents([text])[0]
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a (len(texts), dimensions) float32 matrix."""
+        matrix = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int.from_bytes(
+                hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            matrix[row] = np.random.default_rng(seed).standard_normal(self.dimensions)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that streams a fixed-length reply derived from the prompt.
+
+    The reply echoes words of the last message, so condensed questions and
+    answers differ per question while staying deterministic. Tokens go
+    through the callback manager like a real streaming model's.
+    """
+
+    reply_words: int = 60
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        words = str(messages[-1].content).split()[-20:] or ["ok"]
+        for position in range(self.reply_words):
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=words[position % len(words)] + " ")
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
@@ -0,0 +1,300 @@
+"""Benchmark suite for StudyBuddy's ingestion, retrieval and chatbot hot paths.
+
+Generates a synthetic PDF corpus, swaps the OpenAI models for the
+deterministic fakes of benchmarks.fakes and times:
+
+- DocumentProcessor.extract_text_from_pdfs, split_text_into_chunks and
+  create_vector_store over the corpus
+- FAISS similarity search at several index sizes
+- ChatbotService.generate_response and search_knowledge_base
+- ChatService.handle_user_question through the document conversation chain
+
+Every benchmark is timed without instrumentation, then run once more under
+tracemalloc for its peak Python heap (FAISS's own allocations are not
+traced; the process's peak RSS is reported in "meta"). Results are written
+as JSON. Given a baseline written by an earlier run, --compare lists the
+benchmarks whose median time or peak memory grew by more than --tolerance
+and exits with status 1 if any did.
+
+Usage:
+    python -m benchmarks.run_suite --output results.json
+    python -m benchmarks.run_suite --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from typing import Callable, Dict, List
+
+# Keep the run offline and away from the user's models directory; the
+# settings are read when the app modules are first imported
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("STUDYBUDDY_MODELS_DIR", tempfile.mkdtemp(prefix="studybuddy-bench-"))
+
+from benchmarks.corpus import VOCABULARY, make_corpus  # noqa: E402
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+
+# Changes smaller than these are noise, whatever the relative change
+MIN_TIME_CHANGE_MS = 0.05
+MIN_MEMORY_CHANGE_MB = 1.0
+
+
+def summarize(latencies_ms: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    ordered = sorted(latencies_ms)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def peak_memory_mb(func: Callable[[], object]) -> float:
+    """Run a function once under tracemalloc and return its peak heap in MB."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Time repeated runs of a whole operation, after one warm-up run."""
+    func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {**summarize(latencies), "peak_mb": peak_memory_mb(func)}
+
+
+def measure_calls(func: Callable[[str], object], inputs: List[str]) -> Dict[str, float]:
+    """Time one call per input, for per-request latency percentiles."""
+    func(inputs[0])
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        **summarize(latencies),
+        "peak_mb": peak_memory_mb(lambda: [func(item) for item in inputs]),
+    }
+
+
+def make_questions(rng: random.Random, count: int) -> List[str]:
+    """Create study questions over the corpus vocabulary."""
+    return [
+        "What is the " + " ".join(rng.sample(VOCABULARY, rng.randint(2, 6))) + "?"
+        for _ in range(count)
+    ]
+
+
+def bench_ingestion(args, embeddings: FakeEmbeddings) -> Dict[str, dict]:
+    """Time text extraction, splitting and vector store creation."""
+    from src.studybuddy.core.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    processor.embeddings = embeddings
+    corpus = make_corpus(args.files, args.pages, args.words_per_page, args.seed)
+    raw_text = processor.extract_text_from_pdfs(corpus)
+    chunks = processor.split_text_into_chunks(raw_text)
+
+    pages = args.files * args.pages
+    results = {
+        "ingestion.extract_text_from_pdfs": {
+            **measure(lambda: processor.extract_text_from_pdfs(corpus), args.repeat),
+            "pages": pages,
+        },
+        "ingestion.split_text_into_chunks": {
+            **measure(lambda: processor.split_text_into_chunks(raw_text), args.repeat),
+            "characters": len(raw_text),
+            "chunks": len(chunks),
+        },
+        "ingestion.create_vector_store": {
+            **measure(lambda: processor.create_vector_store(chunks), args.repeat),
+            "chunks": len(chunks),
+        },
+    }
+    return results
+
+
+def bench_retrieval(args, embeddings: FakeEmbeddings) -> Dict[str, dict]:
+    """Time FAISS similarity search at several index sizes."""
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+
+    rng = np.random.default_rng(args.seed)
+    questions = make_questions(random.Random(args.seed), args.queries)
+    results = {}
+    for size in args.index_sizes:
+        vectors = rng.standard_normal((size, args.dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        vector_store = FAISS.from_embeddings(
+            [(f"chunk {i}", vector) for i, vector in enumerate(vectors)],
+            embeddings,
+        )
+        del vectors
+        results[f"retrieval.faiss_search.{size}"] = {
+            **measure_calls(partial(vector_store.similarity_search, k=4), questions),
+            "vectors": size,
+            "dimensions": args.dimensions,
+        }
+        del vector_store
+    return results
+
+
+def bench_chatbot(args) -> Dict[str, dict]:
+    """Time the simple chatbot's answers and knowledge base search."""
+    from src.studybuddy.core.peft_service import ChatbotService
+
+    chatbot = ChatbotService()
+    rng = random.Random(args.seed)
+    for position in range(args.kb_topics):
+        topic = f"{' '.join(rng.sample(VOCABULARY, 2))} {position}"
+        chatbot.add_to_knowledge_base(topic, " ".join(rng.choices(VOCABULARY, k=60)))
+    questions = make_questions(rng, args.queries)
+    terms = [" ".join(rng.sample(VOCABULARY, rng.randint(1, 2))) for _ in range(args.queries)]
+
+    return {
+        "chatbot.generate_response": {
+            **measure_calls(chatbot.generate_response, questions),
+            "topics": len(chatbot.knowledge_base),
+        },
+        "chatbot.search_knowledge_base": {
+            **measure_calls(lambda term: chatbot.search_knowledge_base(term, limit=10), terms),
+            "topics": len(chatbot.knowledge_base),
+        },
+    }
+
+
+def bench_chat(args, embeddings: FakeEmbeddings) -> Dict[str, dict]:
+    """Time answering questions through the document conversation chain."""
+    from src.studybuddy.core.chat_service import ANSWER_TAG, ChatService
+    from src.studybuddy.core.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    processor.embeddings = embeddings
+    corpus = make_corpus(args.files, args.pages, args.words_per_page, args.seed)
+    chunks = processor.split_text_into_chunks(processor.extract_text_from_pdfs(corpus))
+    vector_store = processor.create_vector_store(chunks)
+
+    chat_service = ChatService()
+    chat_service.llm = FakeChatModel()
+    chat_service.answer_llm = FakeChatModel(tags=[ANSWER_TAG])
+    conversation = chat_service.create_conversation_chain(vector_store)
+    questions = make_questions(random.Random(args.seed + 1), args.chat_questions)
+    tokens = []
+
+    return {
+        "chat.handle_user_question": {
+            **measure_calls(
+                lambda q: chat_service.handle_user_question(
+                    q, conversation, on_token=tokens.append
+                ),
+                questions,
+            ),
+            "chunks": len(chunks),
+        },
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> dict:
+    """Compare median time and peak memory with a baseline run.
+
+    Returns:
+        Dictionary with the per-benchmark "changes" and the "regressions"
+        that grew by more than the tolerance
+    """
+    changes, regressions = {}, []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        changes[name] = {}
+        for metric, floor in (("p50_ms", MIN_TIME_CHANGE_MS), ("peak_mb", MIN_MEMORY_CHANGE_MB)):
+            before, after = previous.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            ratio = after / before if before else float("inf")
+            changes[name][metric] = {
+                "baseline": before,
+                "current": after,
+                "change": round(ratio - 1, 3),
+            }
+            if ratio > 1 + tolerance and after - before > floor:
+                regressions.append(f"{name} {metric}: {before} -> {after}")
+    return {"tolerance": tolerance, "changes": changes, "regressions": regressions}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=50, help="pages per file")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument(
+        "--index-sizes", type=lambda value: [int(size) for size in value.split(",")],
+        default=[1000, 10000, 50000],
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chat-questions", type=int, default=20)
+    parser.add_argument("--kb-topics", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddings(args.dimensions)
+    results = {}
+    results.update(bench_ingestion(args, embeddings))
+    results.update(bench_retrieval(args, embeddings))
+    results.update(bench_chatbot(args))
+    results.update(bench_chat(args, embeddings))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "config": {
+                key: value for key, value in vars(args).items()
+                if key not in ("output", "compare", "tolerance")
+            },
+        },
+        "results": results,
+    }
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        report["comparison"] = compare(results, baseline, args.tolerance)
+        status = 1 if report["comparison"]["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
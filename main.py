@@ -3,14 +3,17 @@
 import streamlit as st
 
 # Import our modules
-from src.studybuddy.core.document_processor import DocumentProcessor
-from src.studybuddy.core.chat_service import ChatService
-from src.studybuddy.core.project_manager import ProjectManager
+from src.studybuddy.core.resources import (
+    get_chat_service,
+    get_document_processor,
+    get_project_manager,
+)
 from src.studybuddy.ui.components import UIComponents
 from src.studybuddy.ui.templates import CSS_STYLES
 from src.studybuddy.utils.helpers import (
     validate_environment,
     initialize_streamlit_config,
+    initialize_chat_session_state,
 )
 
 
@@ -18,11 +21,20 @@ class StudyBuddyApp:
     """Study Buddy application with clean UI."""
 
     def __init__(self):
-        self.document_processor = DocumentProcessor()
-        self.chat_service = ChatService()
-        self.project_manager = ProjectManager()
+        # Shared by all sessions and reruns; see core/resources.py
+        self.project_manager = get_project_manager()
         self.ui = UIComponents()
 
+    @property
+    def document_processor(self):
+        """Shared document processor, loaded when documents are first handled."""
+        return get_document_processor()
+
+    @property
+    def chat_service(self):
+        """Shared chat service, loaded when a conversation first needs it."""
+        return get_chat_service()
+
     def setup_app(self):
         """Setup the application."""
         initialize_streamlit_config()
@@ -31,28 +43,39 @@ class StudyBuddyApp:
             st.stop()
 
         st.write(CSS_STYLES, unsafe_allow_html=True)
-        self.chat_service.initialize_session_state()
+        initialize_chat_session_state()
+        self.project_manager.initialize_projects_session_state()
 
     def process_documents(self, pdf_docs):
         """Process uploaded documents."""
         if not pdf_docs:
             st.warning("Please upload PDF files.")
             return
+        if not st.session_state.current_project_id:
+            st.warning("Please select or create a project first.")
+            return
 
-        with st.spinner("Processing documents..."):
-            # Process documents
-            vector_store = self.document_processor.process_documents(pdf_docs)
+        with st.status("Processing documents...", expanded=True) as status:
+            # Add the files to the project index; already indexed files are
+            # skipped. A new index is attached as soon as its first batch
+            # lands, so it is queryable even if this run is interrupted.
+            vector_store = self.document_processor.process_documents(
+                pdf_docs,
+                st.session_state.current_project_id,
+                vector_store=st.session_state.get("vector_store"),
+                progress=self.ui.render_ingestion_progress(),
+                on_first_batch=self.attach_vector_store,
+            )
             if not vector_store:
+                status.update(label="Processing failed", state="error")
                 return
 
-            # Create conversation
-            conversation = self.chat_service.create_conversation_chain(vector_store)
-            if not conversation:
-                return
-
-            # Update session
-            st.session_state.conversation = conversation
-            st.session_state.documents_processed = True
+            if st.session_state.get("vector_store") is not vector_store:
+                if not self.attach_vector_store(vector_store):
+                    status.update(label="Processing failed", state="error")
+                    return
+            else:
+                self.refresh_lexical_index()
 
             # Save to project
             file_names = [pdf.name for pdf in pdf_docs]
@@ -60,16 +83,100 @@ class StudyBuddyApp:
                 st.session_state.current_project_id, pdf_docs, file_names
             )
 
-            st.success("Documents processed successfully!")
+            status.update(label="Documents processed successfully!", state="complete")
             st.rerun()
 
+    def remove_document(self, file_hash):
+        """Remove one document from the current project's index."""
+        project_id = st.session_state.current_project_id
+        if not self.project_manager.remove_file_from_project(project_id, file_hash):
+            st.error("Could not remove the document.")
+            return
+        self.refresh_lexical_index()
+        self.project_manager.save_session_to_project(project_id)
+        st.rerun()
+
+    def attach_vector_store(self, vector_store) -> bool:
+        """Create a conversation over a vector store and make it current."""
+        lexical_index = self.document_processor.index_store.load_lexical(
+            st.session_state.current_project_id
+        )
+        # Continue the project's chat rather than starting a new one
+        conversation = self.chat_service.create_conversation_chain(
+            vector_store, lexical_index, st.session_state.get("chat_history")
+        )
+        if not conversation:
+            return False
+
+        st.session_state.conversation = conversation
+        st.session_state.chat_history = conversation.memory.chat_memory.messages or None
+        st.session_state.vector_store = vector_store
+        st.session_state.documents_processed = True
+        self.update_index_version()
+        return True
+
+    def refresh_lexical_index(self):
+        """Give the current conversation the project's rebuilt keyword index."""
+        self.chat_service.update_lexical_index(
+            st.session_state.get("conversation"),
+            self.document_processor.index_store.load_lexical(
+                st.session_state.current_project_id
+            ),
+        )
+        self.update_index_version()
+
+    def update_index_version(self):
+        """Track the current project's index version for the answer cache.
+
+        Answers cached for the previous version are no longer looked up by
+        this session. They are left to expire, since other sessions and
+        projects with the same documents may still use that version.
+        """
+        st.session_state.index_version = self.document_processor.index_store.index_version(
+            st.session_state.current_project_id
+        )
+
+    def restore_project_index(self):
+        """Reattach the saved index of the current project if it is not loaded.
+
+        Called when a question is asked rather than when the page is drawn,
+        so opening a project does not load the chat dependencies.
+        """
+        project_id = st.session_state.current_project_id
+        if not project_id or st.session_state.get("conversation") is not None:
+            return
+
+        vector_store = st.session_state.get("vector_store")
+        if vector_store is None:
+            if not self.project_manager.index_store.has_index(project_id):
+                return
+            vector_store = self.document_processor.load_project_index(project_id)
+            if vector_store is None:
+                return
+
+        if not self.attach_vector_store(vector_store):
+            return
+        self.project_manager.save_session_to_project(project_id)
+
     def handle_user_input(self, user_question):
-        """Handle user question."""
+        """Handle user question, streaming the answer as it is generated."""
+        # Reuse the saved index instead of asking for a re-upload
+        self.restore_project_index()
+
+        on_token, answer_placeholder = self.ui.render_streaming_answer()
         response = self.chat_service.handle_user_question(
-            user_question, st.session_state.conversation
+            user_question,
+            st.session_state.conversation,
+            index_version=st.session_state.get("index_version"),
+            on_token=on_token,
+            file_hashes=st.session_state.get("document_scope"),
         )
+        # The committed answer is drawn with the rest of the chat history
+        answer_placeholder.empty()
 
         if response:
+            if response.get("time_to_first_token") is not None:
+                st.session_state.time_to_first_token = response["time_to_first_token"]
             st.session_state.chat_history = response["chat_history"]
             self.project_manager.save_session_to_project(
                 st.session_state.current_project_id
@@ -80,9 +187,15 @@ class StudyBuddyApp:
         self.setup_app()
 
         # Create default project if needed
-        if not self.project_manager.get_all_projects():
+        if not self.project_manager.get_projects_summary()["total_projects"]:
             default_id = self.project_manager.create_project("My First Project", "📚")
             self.project_manager.set_current_project(default_id)
+        elif not st.session_state.current_project_id:
+            # Reopen the project this browser had open; a new session picks
+            # one from the list, so sessions never share a project by default
+            project_id = self.project_manager.get_session_project_id()
+            if project_id:
+                self.project_manager.set_current_project(project_id)
 
         # Header
         self.ui.render_header()
@@ -94,13 +207,17 @@ class StudyBuddyApp:
         col1, col2 = st.columns([1, 3])
 
         with col1:
-            sidebar_result = self.ui.render_sidebar(
-                self.project_manager, self.chat_service
-            )
+            sidebar_result = self.ui.render_sidebar(self.project_manager)
             if sidebar_result and sidebar_result.get("action") == "process":
                 self.process_documents(sidebar_result.get("files"))
+            elif sidebar_result and sidebar_result.get("action") == "remove":
+                self.remove_document(sidebar_result.get("file_hash"))
 
         with col2:
+            if not st.session_state.current_project_id:
+                self.ui.render_project_prompt()
+                return
+
             # Chat input
             user_input = self.ui.render_chat_input()
             if user_input:
@@ -7,11 +7,23 @@ and chat with them using OpenAI's language models.
 __version__ = "1.0.0"
 __author__ = "StudyBuddy Team"
 
+import importlib
+from typing import TYPE_CHECKING
+
 from .config.settings import settings
-from .core.document_processor import DocumentProcessor
-from .core.chat_service import ChatService
-from .core.project_manager import ProjectManager
-from .ui.components import UIComponents
+
+if TYPE_CHECKING:
+    from .core.document_processor import DocumentProcessor
+    from .core.chat_service import ChatService
+    from .core.project_manager import ProjectManager
+    from .ui.components import UIComponents
+
+_LAZY_EXPORTS = {
+    "DocumentProcessor": ".core.document_processor",
+    "ChatService": ".core.chat_service",
+    "ProjectManager": ".core.project_manager",
+    "UIComponents": ".ui.components",
+}
 
 __all__ = [
     "settings",
@@ -20,3 +32,17 @@ __all__ = [
     "ProjectManager",
     "UIComponents",
 ]
+
+
+def __getattr__(name: str):
+    """Import exported classes on first access (PEP 562)."""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -17,23 +17,116 @@ class Settings:
     LLM_MODEL = "gpt-3.5-turbo"
     LLM_TEMPERATURE = 0.7
 
+    # Embeddings
+    EMBEDDING_BACKEND = os.getenv("STUDYBUDDY_EMBEDDING_BACKEND", "openai")  # or local
+    LOCAL_EMBEDDING_DIMENSIONS = 384
+    LOCAL_EMBEDDING_NGRAM_RANGE = (3, 5)
+    EMBEDDING_MODEL = "text-embedding-ada-002"
+    EMBEDDING_REQUEST_BATCH_SIZE = 64  # Texts per embeddings API request
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv("STUDYBUDDY_EMBEDDING_CONCURRENCY", "4"))
+    EMBEDDING_REQUESTS_PER_MINUTE = 3000
+    EMBEDDING_TOKENS_PER_MINUTE = 1000000
+    EMBEDDING_MAX_RETRIES = 6
+    EMBEDDING_BACKOFF_BASE = 0.5  # Seconds
+    EMBEDDING_BACKOFF_MAX = 30.0  # Seconds
+
     # Text Processing
-    CHUNK_SIZE = 1000
-    CHUNK_OVERLAP = 200
-    TEXT_SEPARATOR = "\n"
+    CHUNK_TOKENS = 256  # Maximum embedding model tokens per chunk
+    CHUNK_OVERLAP_TOKENS = 50  # Tokens a chunk repeats from the previous one
+    TOKEN_COUNT_CACHE_SIZE = 100000  # Lines and words whose token counts are kept
+
+    # Streaming Ingestion
+    INGEST_BATCH_SIZE = 256  # Chunks embedded and indexed per batch
+
+    # Retrieval
+    RETRIEVAL_MODE = os.getenv("STUDYBUDDY_RETRIEVAL_MODE", "hybrid")  # or vector, lexical
+    RETRIEVAL_K = 4  # Chunks passed to the LLM
+    RETRIEVAL_FETCH_K = 20  # Candidates taken from each ranking before fusion
+    RRF_K = 60
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+
+    # Approximate Nearest Neighbour Search
+    # "auto" (IVF) or hnsw above ANN_MIN_VECTORS; flat always searches exactly
+    ANN_INDEX_TYPE = os.getenv("STUDYBUDDY_ANN_INDEX", "auto")
+    # Projects with fewer vectors are always searched exactly
+    ANN_MIN_VECTORS = int(os.getenv("STUDYBUDDY_ANN_MIN_VECTORS", "50000"))
+    # Vector memory above which IVF stores product-quantized codes; 0 never quantizes
+    ANN_MAX_MEMORY_MB = float(os.getenv("STUDYBUDDY_ANN_MAX_MEMORY_MB", "0"))
+    ANN_HNSW_M = 32
+    ANN_HNSW_EF_CONSTRUCTION = 200
+    ANN_HNSW_EF_SEARCH = 256
+    ANN_IVF_NPROBE = 16
+    ANN_PQ_BYTES = 64  # Bytes per product-quantized vector
+    ANN_RERANK_FACTOR = 4  # Quantized candidates per result, reranked with exact vectors
+    ANN_RECALL_QUERIES = 200  # Queries recall@k is measured with after each build
+
+    # Vector Storage
+    # Precision of stored vectors: float32, float16 (half the memory) or int8 (a quarter)
+    VECTOR_STORAGE = os.getenv("STUDYBUDDY_VECTOR_STORAGE", "float32")
 
     # Streamlit Configuration
     PAGE_TITLE = "StudyBuddy - AI Document Assistant"
     PAGE_ICON = "🤖"
     LAYOUT = "wide"
 
+    # Chat Display
+    CHAT_WINDOW_TURNS = 20  # Recent turns drawn; "Load earlier" adds as many again
+
     # File Upload
     ALLOWED_FILE_TYPES = ["pdf"]
     MAX_FILE_SIZE_MB = 200
 
+    # PDF Extraction
+    PDF_EXTRACTION_WORKERS = int(
+        os.getenv("STUDYBUDDY_PDF_WORKERS", str(os.cpu_count() or 1))
+    )
+    PDF_PAGES_PER_TASK = 25
+
     # Project Management
     DEFAULT_PROJECT_EMOJI = "📚"
     PROJECT_EMOJIS = ["📚", "🔬", "📐", "📖", "💻", "🎨", "🏛️", "🌍", "🧪", "📊"]
+    PROJECT_PAGE_SIZE = 20  # Projects listed per page of the project selector
+
+    # Persistent Storage
+    MODELS_DIR = os.getenv("STUDYBUDDY_MODELS_DIR", "models")
+    PROJECTS_DB_PATH = os.path.join(MODELS_DIR, "projects.sqlite3")
+    BLOBS_DIR = os.path.join(MODELS_DIR, "blobs")  # Uploaded files by content hash
+    # Unreferenced blobs changed more recently may belong to a running upload
+    BLOB_GC_MIN_AGE_SECONDS = 60 * 60
+    # Projects per session whose index and chain stay loaded, the current one included
+    MAX_RESIDENT_PROJECTS = int(os.getenv("STUDYBUDDY_MAX_RESIDENT_PROJECTS", "1"))
+
+    # Connections kept open to the OpenAI API, shared by all sessions
+    HTTP_MAX_CONNECTIONS = 32
+
+    # Embedding Cache
+    EMBEDDING_CACHE_PATH = os.path.join(MODELS_DIR, "embedding_cache.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(
+        os.getenv("STUDYBUDDY_EMBEDDING_CACHE_MAX_ENTRIES", "50000")
+    )
+
+    # Knowledge Base Search
+    KB_SEARCH_PAGE_SIZE = 10
+    KB_SNIPPET_CHARS = 160
+
+    # Conversation Memory
+    MEMORY_MAX_TOKENS = 1000  # Chat history tokens sent with each question
+    MEMORY_SUMMARY_MAX_TOKENS = 250  # Part of the budget for the summary of older turns
+
+    # Answer Cache
+    ANSWER_CACHE_MAX_ENTRIES = 2000
+    ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+    # Cosine similarity above which a similar question reuses an answer; 0 disables
+    ANSWER_CACHE_SEMANTIC_THRESHOLD = float(
+        os.getenv("STUDYBUDDY_ANSWER_CACHE_SEMANTIC_THRESHOLD", "0")
+    )
+
+    # Metrics and Tracing
+    METRICS_MAX_TRACES = 200  # Recent operation traces kept for export and the debug panel
+    # File each finished trace is appended to as a JSON line (optional)
+    METRICS_LOG_PATH = os.getenv("STUDYBUDDY_METRICS_LOG")
+    DEBUG_PANEL = os.getenv("STUDYBUDDY_DEBUG_PANEL", "false").lower() == "true"
 
     @classmethod
     def validate_api_key(cls) -> bool:
@@ -44,10 +137,37 @@ class Settings:
     def get_text_splitter_config(cls) -> dict:
         """Get text splitter configuration."""
         return {
-            "separator": cls.TEXT_SEPARATOR,
-            "chunk_size": cls.CHUNK_SIZE,
-            "chunk_overlap": cls.CHUNK_OVERLAP,
-            "length_function": len,
+            "chunk_tokens": cls.CHUNK_TOKENS,
+            "overlap_tokens": cls.CHUNK_OVERLAP_TOKENS,
+            "model": cls.EMBEDDING_MODEL,
+        }
+
+    @classmethod
+    def get_chunking_fingerprint(cls) -> dict:
+        """Get the serializable part of the splitter config for index manifests."""
+        return {"splitter": "page-tokens", **cls.get_text_splitter_config()}
+
+    @classmethod
+    def get_embedding_backend_id(cls) -> str:
+        """Identify the embedding backend and model, as recorded in index manifests.
+
+        Computed without loading the backends, so stored indexes can be
+        checked while the page is drawn.
+        """
+        if cls.EMBEDDING_BACKEND == "local":
+            # The model name of HashingEmbeddings with these settings
+            low, high = cls.LOCAL_EMBEDDING_NGRAM_RANGE
+            return f"local:hashing-{cls.LOCAL_EMBEDDING_DIMENSIONS}-{low}-{high}"
+        return f"openai:{cls.EMBEDDING_MODEL}"
+
+    @classmethod
+    def get_embeddings_config(cls) -> dict:
+        """Get embeddings configuration."""
+        # Retries are handled by BatchedEmbeddingExecutor, not the client
+        return {
+            "model": cls.EMBEDDING_MODEL,
+            "chunk_size": cls.EMBEDDING_REQUEST_BATCH_SIZE,
+            "max_retries": 0,
         }
 
     @classmethod
@@ -55,6 +175,15 @@ class Settings:
         """Get LLM configuration."""
         return {"temperature": cls.LLM_TEMPERATURE, "model_name": cls.LLM_MODEL}
 
+    @classmethod
+    def get_answer_settings(cls) -> dict:
+        """Get the settings a cached answer depends on besides the documents."""
+        return {
+            **cls.get_llm_config(),
+            "retrieval_mode": cls.RETRIEVAL_MODE,
+            "retrieval_k": cls.RETRIEVAL_K,
+        }
+
 
 # Global settings instance
 settings = Settings()
@@ -1,9 +1,20 @@
 """Core package initialization."""
 
-from .document_processor import DocumentProcessor
-from .chat_service import ChatService
-from .project_manager import ProjectManager
-from .peft_service import ChatbotService
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .document_processor import DocumentProcessor
+    from .chat_service import ChatService
+    from .project_manager import ProjectManager
+    from .peft_service import ChatbotService
+
+_LAZY_EXPORTS = {
+    "DocumentProcessor": ".document_processor",
+    "ChatService": ".chat_service",
+    "ProjectManager": ".project_manager",
+    "ChatbotService": ".peft_service",
+}
 
 __all__ = [
     "DocumentProcessor",
@@ -11,3 +22,21 @@ __all__ = [
     "ProjectManager",
     "ChatbotService",
 ]
+
+
+def __getattr__(name: str):
+    """Import exported services on first access (PEP 562).
+
+    Importing the package stays cheap; LangChain, FAISS and PyPDF2 are only
+    loaded once a service that needs them is used.
+    """
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
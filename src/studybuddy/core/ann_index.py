@@ -0,0 +1,431 @@
+"""Approximate nearest neighbour indexes for large projects.
+
+A project's exact FAISS index (IndexFlatL2, or a scalar quantizer when
+vectors are stored compactly; see core/vector_storage.py) stays the source
+of truth: it is what ingestion adds to, what removing a document deletes
+from, and what is saved as index.faiss. Once a project holds
+settings.ANN_MIN_VECTORS vectors, every save schedules an approximate
+index to be derived from the saved exact index on a background thread:
+IVF, or HNSW if configured, and IVF with product quantization when the
+vectors would exceed settings.ANN_MAX_MEMORY_MB. Its recall@k against the
+exact index is measured as part of the build.
+
+A built index is saved next to the exact one and attached to the vector
+store it was built for. Searches use it while that vector store is
+unchanged; after an add or delete they fall back to the exact index until
+the build scheduled by the next save is attached.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..config.settings import settings
+from . import metrics
+from .vector_storage import read_index
+
+ANN_FILE = "ann.faiss"
+ANN_META_FILE = "ann.json"
+
+# Vectors read from the exact index per add call while building
+ADD_BATCH_SIZE = 8192
+# Training vectors per IVF list; FAISS warns below 39
+TRAIN_POINTS_PER_LIST = 64
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+# Vector store -> approximate index attached to it
+_attached: "weakref.WeakKeyDictionary[Any, AnnIndex]" = weakref.WeakKeyDictionary()
+# Project directory -> index ID of the latest save a build was requested for
+_latest_builds: Dict[str, Optional[str]] = {}
+
+
+def ivf_list_count(count: int) -> int:
+    """Get the number of IVF lists for a number of vectors.
+
+    About 4 * sqrt(count), rounded to a power of two so the trained
+    quantizer is kept until the project has grown about fourfold.
+    """
+    return 2 ** round(math.log2(4 * math.sqrt(count)))
+
+
+def pq_code_size(dimensions: int) -> int:
+    """Get the bytes per vector of product quantization for a dimensionality.
+
+    The largest number of sub-quantizers up to settings.ANN_PQ_BYTES that
+    divides the dimensions.
+    """
+    return max(m for m in range(1, settings.ANN_PQ_BYTES + 1) if dimensions % m == 0)
+
+
+def choose_index_spec(count: int, dimensions: int) -> str:
+    """Choose the FAISS index factory string for a project's vectors.
+
+    Args:
+        count: Number of vectors
+        dimensions: Dimensions of each vector
+
+    Returns:
+        "Flat" for exact search, otherwise an HNSW, IVF or IVF-PQ spec
+    """
+    index_type = settings.ANN_INDEX_TYPE
+    if index_type not in ("auto", "hnsw", "ivf") or count < settings.ANN_MIN_VECTORS:
+        return "Flat"
+    nlist = ivf_list_count(count)
+    vector_mb = count * dimensions * 4 / 2**20
+    if settings.ANN_MAX_MEMORY_MB and vector_mb > settings.ANN_MAX_MEMORY_MB:
+        return f"IVF{nlist},PQ{pq_code_size(dimensions)}"
+    if index_type == "hnsw":
+        return f"HNSW{settings.ANN_HNSW_M},Flat"
+    # IVF reaches a higher recall than HNSW at the same latency on clustered
+    # embeddings, and builds faster; see benchmarks/bench_ann.py
+    return f"IVF{nlist},Flat"
+
+
+class AnnIndex:
+    """An approximate index over the same positions as an exact index.
+
+    Args:
+        index: Trained and populated FAISS index
+        spec: FAISS index factory string it was built from
+        info: Build details: "index_id", "vectors", "trained_for",
+            "build_seconds" and the measurements of measure_recall
+    """
+
+    def __init__(self, index, spec: str, info: Dict[str, Any]):
+        self.index = index
+        self.spec = spec
+        self.info = info
+        # (position-to-ID mapping, vector count) of the vector store it serves
+        self.source: Optional[tuple] = None
+
+    @property
+    def quantized(self) -> bool:
+        """Whether the index stores compressed vectors."""
+        return ",PQ" in self.spec
+
+    def search_parameters(self, selector=None):
+        """Get the search parameters of the index type, with an optional ID selector."""
+        import faiss
+
+        if self.spec.startswith("HNSW"):
+            return faiss.SearchParametersHNSW(efSearch=settings.ANN_HNSW_EF_SEARCH, sel=selector)
+        return faiss.SearchParametersIVF(nprobe=settings.ANN_IVF_NPROBE, sel=selector)
+
+    def search(
+        self, queries: np.ndarray, k: int, exact_index=None, selector=None
+    ) -> np.ndarray:
+        """Find the positions of the nearest vectors of each query.
+
+        Args:
+            queries: Query vectors, float32 of shape (queries, dimensions)
+            k: Number of results per query
+            exact_index: Exact index to rerank quantized candidates with (optional)
+            selector: FAISS ID selector limiting the searched positions (optional)
+
+        Returns:
+            Positions of shape (queries, k), best first, -1 where missing
+        """
+        params = self.search_parameters(selector)
+        if not self.quantized or exact_index is None:
+            return self.index.search(queries, k, params=params)[1]
+
+        # Quantized distances only shortlist; the exact vectors decide the order
+        _, candidates = self.index.search(
+            queries, k * settings.ANN_RERANK_FACTOR, params=params
+        )
+        results = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, (query, positions) in enumerate(zip(queries, candidates)):
+            positions = positions[positions != -1]
+            if not len(positions):
+                continue
+            distances = ((exact_index.reconstruct_batch(positions) - query) ** 2).sum(axis=1)
+            best = positions[np.argsort(distances)[:k]]
+            results[row, : len(best)] = best
+        return results
+
+
+def build_index(
+    exact_index, spec: str, previous: Optional[AnnIndex] = None
+) -> AnnIndex:
+    """Build an approximate index over the vectors of an exact index.
+
+    Vectors are read from the exact index in batches, so a memory-mapped
+    exact index is never loaded whole. The trained quantizer of a previous
+    IVF index with the same spec is reused instead of training again.
+
+    Args:
+        exact_index: Flat FAISS index holding the vectors
+        spec: FAISS index factory string, from choose_index_spec
+        previous: Earlier approximate index of the same project (optional)
+
+    Returns:
+        Built approximate index
+    """
+    import faiss
+
+    count, dimensions = exact_index.ntotal, exact_index.d
+    start = time.perf_counter()
+    with metrics.stage("train"):
+        if previous is not None and previous.spec == spec and spec.startswith("IVF"):
+            index = faiss.clone_index(previous.index)
+            index.reset()
+            trained_for = previous.info["trained_for"]
+        else:
+            index = faiss.index_factory(dimensions, spec, faiss.METRIC_L2)
+            trained_for = count
+            if spec.startswith("HNSW"):
+                index.hnsw.efConstruction = settings.ANN_HNSW_EF_CONSTRUCTION
+            if spec.startswith("IVF") and ",PQ" in spec:
+                # Only needed for polysemous search, and most of the training time
+                index.do_polysemous_training = False
+            if not index.is_trained:
+                nlist = faiss.extract_index_ivf(index).nlist
+                sample = min(count, nlist * TRAIN_POINTS_PER_LIST)
+                # Evenly spaced, so every document contributes
+                positions = np.linspace(0, count - 1, sample).astype(np.int64)
+                index.train(exact_index.reconstruct_batch(positions))
+
+    with metrics.stage("add"):
+        for batch_start in range(0, count, ADD_BATCH_SIZE):
+            index.add(
+                exact_index.reconstruct_n(batch_start, min(ADD_BATCH_SIZE, count - batch_start))
+            )
+    metrics.count("add", vectors=count)
+
+    return AnnIndex(
+        index,
+        spec,
+        {
+            "spec": spec,
+            "vectors": count,
+            "trained_for": trained_for,
+            "build_seconds": round(time.perf_counter() - start, 3),
+        },
+    )
+
+
+def measure_recall(
+    exact_index, ann: AnnIndex, k: Optional[int] = None, queries: Optional[int] = None
+) -> Dict[str, float]:
+    """Measure recall@k and query latency of an approximate index.
+
+    Queries are midpoints of pairs of stored vectors, so they lie among the
+    documents without being stored vectors themselves.
+
+    Args:
+        exact_index: Exact index the approximate one was built from
+        ann: Approximate index to measure
+        k: Results per query (defaults to settings.RETRIEVAL_FETCH_K)
+        queries: Number of queries (defaults to settings.ANN_RECALL_QUERIES)
+
+    Returns:
+        Dictionary with "k", "queries", "recall_at_k" and the mean
+        milliseconds per query of each index, "exact_ms" and "ann_ms"
+    """
+    k = k or settings.RETRIEVAL_FETCH_K
+    queries = min(queries or settings.ANN_RECALL_QUERIES, exact_index.ntotal // 2)
+    rng = np.random.default_rng(0)
+    pairs = rng.choice(exact_index.ntotal, size=(queries, 2), replace=False)
+    vectors = (
+        exact_index.reconstruct_batch(pairs[:, 0]) + exact_index.reconstruct_batch(pairs[:, 1])
+    ) / 2
+
+    # One query at a time, as the retriever sends them
+    start = time.perf_counter()
+    expected = [exact_index.search(vector[None], k)[1][0] for vector in vectors]
+    exact_ms = (time.perf_counter() - start) * 1000 / queries
+    start = time.perf_counter()
+    found = [ann.search(vector[None], k, exact_index)[0] for vector in vectors]
+    ann_ms = (time.perf_counter() - start) * 1000 / queries
+
+    hits = sum(len(np.intersect1d(want, got[got != -1])) for want, got in zip(expected, found))
+    return {
+        "k": k,
+        "queries": queries,
+        "recall_at_k": round(hits / (k * queries), 4),
+        "exact_ms": round(exact_ms, 3),
+        "ann_ms": round(ann_ms, 3),
+    }
+
+
+def get_ann_index(vector_store) -> Optional[AnnIndex]:
+    """Get the approximate index of a vector store, if it is current."""
+    with _lock:
+        ann = _attached.get(vector_store)
+    if ann is None or not _is_current(vector_store, ann.source):
+        return None
+    return ann
+
+
+def describe(vector_store) -> Dict[str, Any]:
+    """Describe how a vector store is searched, for the debug panel."""
+    if vector_store is None:
+        return {}
+    with _lock:
+        ann = _attached.get(vector_store)
+    if ann is None:
+        return {"spec": "Flat", "vectors": vector_store.index.ntotal}
+    return {**ann.info, "current": _is_current(vector_store, ann.source)}
+
+
+def schedule_build(vector_store, index_path: Path, index_id: Optional[str]) -> Optional[Future]:
+    """Derive an approximate index from a project's saved exact index.
+
+    Called after every save. The build runs on a background thread and
+    reads the saved index file, not the vector store, so the session can
+    keep adding to it meanwhile. Builds superseded by a later save are
+    skipped. A finished build is saved and attached to the vector store,
+    unless the vector store has changed since.
+
+    Args:
+        vector_store: Vector store the saved index was written from
+        index_path: Path of the saved exact index
+        index_id: ID of the save, recorded with the approximate index
+
+    Returns:
+        Future of the build, or None if the project is searched exactly
+    """
+    exact_index = vector_store.index
+    spec = choose_index_spec(exact_index.ntotal, exact_index.d)
+    project_dir = Path(index_path).parent
+    with _lock:
+        # Kept attached; it is only used while the vector store is unchanged
+        previous = _attached.get(vector_store)
+        _latest_builds[str(project_dir)] = index_id
+    if spec == "Flat":
+        remove_saved(project_dir)
+        return None
+
+    source = (vector_store.index_to_docstore_id, exact_index.ntotal)
+    return _get_executor().submit(
+        _build, weakref.ref(vector_store), source, Path(index_path), index_id, spec, previous
+    )
+
+
+def load_saved(vector_store, index_path: Path, index_id: Optional[str]) -> Optional[AnnIndex]:
+    """Attach the saved approximate index of a loaded project.
+
+    A missing or outdated one is rebuilt in the background instead.
+
+    Args:
+        vector_store: Vector store just loaded from index_path
+        index_path: Path of the saved exact index
+        index_id: ID of the save the exact index was written by
+
+    Returns:
+        The attached approximate index, or None
+    """
+    exact_index = vector_store.index
+    spec = choose_index_spec(exact_index.ntotal, exact_index.d)
+    if spec == "Flat":
+        return None
+
+    project_dir = Path(index_path).parent
+    try:
+        with open(project_dir / ANN_META_FILE, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        info = {}
+    if (
+        info.get("index_id") == index_id
+        and info.get("spec") == spec
+        and info.get("vectors") == exact_index.ntotal
+    ):
+        import faiss
+
+        try:
+            ann = AnnIndex(faiss.read_index(str(project_dir / ANN_FILE)), spec, info)
+        except RuntimeError:
+            ann = None
+        if ann is not None:
+            _attach(vector_store, ann, (vector_store.index_to_docstore_id, exact_index.ntotal))
+            return ann
+
+    schedule_build(vector_store, index_path, index_id)
+    return None
+
+
+def remove_saved(project_dir: Path) -> None:
+    """Delete a project's saved approximate index."""
+    for name in (ANN_META_FILE, ANN_FILE):
+        (Path(project_dir) / name).unlink(missing_ok=True)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the thread pool builds run on, shared by every session."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            # One build at a time; FAISS already spreads a build over every core
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="studybuddy-ann")
+        return _executor
+
+
+def _is_current(vector_store, source: Optional[tuple]) -> bool:
+    """Check whether a vector store still holds the vectors an index was built from.
+
+    FAISS replaces the position-to-ID mapping on delete and grows it in
+    place on add, so either shows up here.
+    """
+    if source is None:
+        return False
+    mapping, count = source
+    return (
+        vector_store.index_to_docstore_id is mapping
+        and len(mapping) == count
+        and vector_store.index.ntotal == count
+    )
+
+
+def _attach(vector_store, ann: AnnIndex, source: tuple) -> None:
+    ann.source = source
+    with _lock:
+        _attached[vector_store] = ann
+
+
+def _build(
+    vector_store_ref, source: tuple, index_path: Path, index_id, spec: str, previous
+) -> Optional[AnnIndex]:
+    """Build, measure, save and attach an approximate index."""
+    project_dir = index_path.parent
+    with _lock:
+        if _latest_builds.get(str(project_dir)) != index_id:
+            # A later save has scheduled its own build
+            return None
+
+    import faiss
+
+    with metrics.trace("ann_build") as trace:
+        exact_index = read_index(index_path)
+        if exact_index.ntotal != source[1]:
+            return None
+        ann = build_index(exact_index, spec, previous)
+        with metrics.stage("recall"):
+            ann.info.update(measure_recall(exact_index, ann))
+        ann.info["index_id"] = index_id
+        trace.set(**ann.info)
+
+        with metrics.stage("save"):
+            # The metadata names the save it belongs to, so it goes last
+            remove_saved(project_dir)
+            tmp_path = project_dir / f"{ANN_FILE}.tmp"
+            faiss.write_index(ann.index, str(tmp_path))
+            os.replace(tmp_path, project_dir / ANN_FILE)
+            tmp_path = project_dir / f"{ANN_META_FILE}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(ann.info, f)
+            os.replace(tmp_path, project_dir / ANN_META_FILE)
+
+    vector_store = vector_store_ref()
+    if vector_store is not None and _is_current(vector_store, source):
+        _attach(vector_store, ann, source)
+    return ann
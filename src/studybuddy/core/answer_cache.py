@@ -0,0 +1,169 @@
+"""Process-wide cache of chat answers for repeated questions."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import streamlit as st
+
+from ..config.settings import settings
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivial rewordings share a cache key."""
+    return " ".join(_NON_WORD.sub(" ", question.lower()).split())
+
+
+class AnswerCache:
+    """LRU cache of answers with TTL expiry and optional semantic matching.
+
+    Entries are keyed by the normalized question plus a scope string that
+    captures the project's index version and the model settings, so an
+    answer is never served for a different set of documents or model.
+    Index versions are derived from the documents and shared by every
+    session and project holding them, so answers of outdated versions are
+    not dropped eagerly; they are never looked up again and age out
+    through the TTL and LRU eviction.
+    With a semantic threshold set, a question whose embedding is close
+    enough to a cached question in the same scope reuses its answer.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        semantic_threshold: Optional[float] = None,
+    ):
+        self.max_entries = max_entries or settings.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.ANSWER_CACHE_TTL_SECONDS
+        self.semantic_threshold = (
+            settings.ANSWER_CACHE_SEMANTIC_THRESHOLD
+            if semantic_threshold is None
+            else semantic_threshold
+        )
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        # (scope, normalized question) -> (answer, stored at, question embedding)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, Optional[np.ndarray]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        question: str,
+        scope: str,
+        embed: Optional[Callable[[str], List[float]]] = None,
+    ) -> Optional[str]:
+        """Look up a cached answer.
+
+        Args:
+            question: User's question
+            scope: Index version and model settings the answer must match
+            embed: Query embedding function for semantic hits (optional)
+
+        Returns:
+            Cached answer or None on a miss
+        """
+        key = (scope, normalize_question(question))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+
+        if embed is not None and self.semantic_threshold > 0:
+            answer = self._semantic_get(question, scope, embed, now)
+            if answer is not None:
+                return answer
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        question: str,
+        scope: str,
+        answer: str,
+        embed: Optional[Callable[[str], List[float]]] = None,
+    ) -> None:
+        """Store an answer, evicting the least recently used entries."""
+        embedding = None
+        if embed is not None and self.semantic_threshold > 0:
+            embedding = self._unit_vector(embed(question))
+
+        with self._lock:
+            key = (scope, normalize_question(question))
+            self._entries[key] = (answer, time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss counters and the current size."""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    @staticmethod
+    def make_scope(index_version: str, model_settings: dict) -> str:
+        """Build the scope string of an index version and model settings."""
+        options = ",".join(f"{name}={value}" for name, value in sorted(model_settings.items()))
+        return f"{index_version}|{options}"
+
+    def _semantic_get(
+        self, question: str, scope: str, embed, now: float
+    ) -> Optional[str]:
+        """Find the cached answer of the most similar question in a scope."""
+        with self._lock:
+            candidates = [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if key[0] == scope
+                and entry[2] is not None
+                and now - entry[1] <= self.ttl_seconds
+            ]
+        if not candidates:
+            return None
+
+        query = self._unit_vector(embed(question))
+        matrix = np.stack([entry[2] for _, entry in candidates])
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+
+        key, entry = candidates[best]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.semantic_hits += 1
+        return entry[0]
+
+    @staticmethod
+    def _unit_vector(vector: List[float]) -> np.ndarray:
+        """Convert an embedding to a normalized float32 array."""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache() -> AnswerCache:
+    """Get the answer cache shared by every session of this process."""
+    return AnswerCache()
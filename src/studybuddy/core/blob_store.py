@@ -0,0 +1,158 @@
+"""Content-addressed storage of uploaded files and what is derived from them."""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Set
+
+from ..config.settings import settings
+
+
+class BlobStore:
+    """Stores uploaded PDFs once, keyed by the SHA-256 of their contents.
+
+    Every blob lives at models/blobs/<first two hex digits>/<sha256>.pdf,
+    so the same file uploaded to several projects is stored once. Next to
+    it, a <sha256>.derived/ directory caches what processing the file
+    produced: its page texts, its chunks per chunking configuration and
+    their vectors per chunking configuration and embedding backend. A file
+    that was processed before is then neither parsed nor embedded again.
+
+    The store does not track who uses a blob; ProjectStore counts the
+    references and deletes blobs (with their derived artifacts) that are no
+    longer referenced.
+    """
+
+    BLOB_SUFFIX = ".pdf"
+    DERIVED_SUFFIX = ".derived"
+    PAGES_FILE = "pages.json"
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = Path(base_dir or settings.BLOBS_DIR)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Compute the key of some file contents."""
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def derived_key(**config: Any) -> str:
+        """Build the key of an artifact from the settings it was derived with."""
+        fingerprint = json.dumps(config, sort_keys=True)
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, file_hash: str) -> Path:
+        """Get the path of a blob."""
+        return self.base_dir / file_hash[:2] / f"{file_hash}{self.BLOB_SUFFIX}"
+
+    def derived_dir(self, file_hash: str) -> Path:
+        """Get the directory of a blob's derived artifacts."""
+        return self.base_dir / file_hash[:2] / f"{file_hash}{self.DERIVED_SUFFIX}"
+
+    def exists(self, file_hash: str) -> bool:
+        """Check whether a blob is stored."""
+        return self.path(file_hash).exists()
+
+    def put(self, data: bytes) -> str:
+        """Store file contents unless they are stored already.
+
+        Returns:
+            SHA-256 of the contents
+        """
+        file_hash = self.hash_bytes(data)
+        path = self.path(file_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return file_hash
+
+    def delete(self, file_hash: str) -> None:
+        """Delete a blob and everything derived from it."""
+        self.path(file_hash).unlink(missing_ok=True)
+        shutil.rmtree(self.derived_dir(file_hash), ignore_errors=True)
+
+    def stored_hashes(self, min_age_seconds: float = 0) -> Set[str]:
+        """Get the hashes of stored blobs and derived artifacts.
+
+        Args:
+            min_age_seconds: Skip those changed less than this long ago
+        """
+        changed_before = time.time() - min_age_seconds
+        hashes = set()
+        for suffix in (self.BLOB_SUFFIX, self.DERIVED_SUFFIX):
+            for path in self.base_dir.glob(f"??/*{suffix}"):
+                try:
+                    if path.stat().st_mtime <= changed_before:
+                        hashes.add(path.name.split(".")[0])
+                except OSError:
+                    pass  # Deleted meanwhile
+        return hashes
+
+    def has_pages(self, file_hash: str) -> bool:
+        """Check whether the page texts of a blob are cached."""
+        return (self.derived_dir(file_hash) / self.PAGES_FILE).exists()
+
+    def has_chunks(self, file_hash: str, key: str) -> bool:
+        """Check whether the chunks of a blob are cached for a chunking configuration."""
+        return (self.derived_dir(file_hash) / f"chunks-{key}.json").exists()
+
+    def load_pages(self, file_hash: str) -> Optional[List[str]]:
+        """Get the extracted page texts of a blob, if cached."""
+        return self._read_json(self.derived_dir(file_hash) / self.PAGES_FILE)
+
+    def save_pages(self, file_hash: str, pages: List[str]) -> None:
+        """Cache the extracted page texts of a blob."""
+        self._write_json(self.derived_dir(file_hash) / self.PAGES_FILE, pages)
+
+    def load_chunks(self, file_hash: str, key: str) -> Optional[List[list]]:
+        """Get the chunk rows of a blob for a chunking configuration, if cached."""
+        return self._read_json(self.derived_dir(file_hash) / f"chunks-{key}.json")
+
+    def save_chunks(self, file_hash: str, key: str, chunks: List[list]) -> None:
+        """Cache the chunks of a blob for a chunking configuration.
+
+        Chunks are stored as the rows of ChunkRecord.to_row.
+        """
+        self._write_json(self.derived_dir(file_hash) / f"chunks-{key}.json", chunks)
+
+    def load_vectors(self, file_hash: str, key: str):
+        """Get the chunk vectors of a blob as a float32 matrix, if cached."""
+        import numpy as np
+
+        try:
+            return np.load(self.derived_dir(file_hash) / f"vectors-{key}.npy")
+        except (OSError, ValueError):
+            return None
+
+    def save_vectors(self, file_hash: str, key: str, vectors) -> None:
+        """Cache the chunk vectors of a blob, one row per chunk."""
+        import numpy as np
+
+        path = self.derived_dir(file_hash) / f"vectors-{key}.npy"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(vectors, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        """Atomically write a JSON file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
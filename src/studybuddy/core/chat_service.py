@@ -1,102 +1,318 @@
 """Chat service for handling conversations with documents."""
 
-from typing import Optional
+import hashlib
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Collection, Dict, List, Optional
+from uuid import UUID
 import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
 from langchain_openai import ChatOpenAI
 from langchain_community.vectorstores import FAISS
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
 
 from ..config.settings import settings
+from ..utils.helpers import initialize_chat_session_state
+from . import metrics
+from .answer_cache import AnswerCache, get_answer_cache
+from .conversation_memory import create_memory
+from .http_client import get_http_client
+from .lexical_index import BM25Index
 from .peft_service import ChatbotService
+from .retrieval import HybridRetriever, create_retriever
+
+
+# Tag of the LLM that writes the final answer, as opposed to the one
+# condensing follow-up questions
+ANSWER_TAG = "answer"
+
+
+class AnswerStreamHandler(BaseCallbackHandler):
+    """Forwards the answer LLM's tokens as they arrive.
+
+    Tokens of other LLM calls in the chain, such as condensing a
+    follow-up question, are ignored.
+    """
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self.started_at = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+
+    def on_llm_new_token(
+        self, token: str, *, tags: Optional[List[str]] = None, **kwargs: Any
+    ) -> None:
+        if ANSWER_TAG not in (tags or []):
+            return
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.started_at
+        self.on_token(token)
+
+
+class StageTimingHandler(BaseCallbackHandler):
+    """Times a chain's retrieval and LLM runs as stages of a trace.
+
+    The answer LLM's runs are the "answer" stage and other LLM runs, which
+    condense follow-up questions, the "condense" stage. Tokens are counted
+    as they stream, or taken from the reported usage otherwise.
+    """
+
+    def __init__(self, trace: "metrics.Trace"):
+        self.trace = trace
+        self._runs: Dict[UUID, list] = {}
+
+    def _start(self, run_id: UUID, stage: str) -> None:
+        self._runs[run_id] = [stage, time.perf_counter(), 0]
+
+    def _end(self, run_id: UUID, **counts: int) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        stage, started_at, streamed_tokens = run
+        if streamed_tokens:
+            counts["tokens"] = streamed_tokens
+        self.trace.record(
+            stage,
+            time.perf_counter() - started_at,
+            **{key: value for key, value in counts.items() if value},
+        )
+
+    def _llm_stage(self, tags: Optional[List[str]]) -> str:
+        return "answer" if ANSWER_TAG in (tags or []) else "condense"
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id: UUID, tags: Optional[List[str]] = None, **kwargs: Any
+    ) -> None:
+        self._start(run_id, self._llm_stage(tags))
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id: UUID, tags: Optional[List[str]] = None, **kwargs: Any
+    ) -> None:
+        self._start(run_id, self._llm_stage(tags))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._runs:
+            self._runs[run_id][2] += 1
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self._end(
+            run_id,
+            tokens=usage.get("completion_tokens", 0),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_retriever_start(self, serialized, query: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
 
 
 class ChatService:
-    """Handles chat functionality and conversation management."""
+    """Handles chat functionality and conversation management.
+
+    One instance is shared by all sessions; conversations and settings of
+    a session are kept in st.session_state.
+    """
 
     def __init__(self):
-        self.llm = ChatOpenAI(**settings.get_llm_config())
-        self.conversation = None
+        http_client = get_http_client()
+        self.llm = ChatOpenAI(**settings.get_llm_config(), http_client=http_client)
+        self.answer_llm = ChatOpenAI(
+            **settings.get_llm_config(),
+            http_client=http_client,
+            streaming=True,
+            tags=[ANSWER_TAG],
+        )
         self.chatbot_service = ChatbotService()
-        self.use_simple_chatbot = False
+        self.answer_cache = get_answer_cache()
+
+    @property
+    def use_simple_chatbot(self) -> bool:
+        """Whether the current session answers with the simple chatbot."""
+        return st.session_state.get("simple_chatbot_enabled", False)
 
     def create_conversation_chain(
-        self, vector_store: FAISS
+        self,
+        vector_store: FAISS,
+        lexical_index: Optional[BM25Index] = None,
+        chat_history: Optional[List[BaseMessage]] = None,
     ) -> Optional[ConversationalRetrievalChain]:
         """Create conversation chain from vector store.
 
         Args:
             vector_store: FAISS vector store containing document embeddings
+            lexical_index: BM25 index over the same chunks for hybrid retrieval (optional)
+            chat_history: Earlier messages the conversation continues from (optional)
 
         Returns:
             Conversation chain or None if error occurs
         """
         try:
+            memory = create_memory(self.llm)
+            if chat_history:
+                memory.load_history(chat_history)
             conversation_chain = ConversationalRetrievalChain.from_llm(
-                llm=self.llm,
-                retriever=vector_store.as_retriever(),
-                memory=ConversationBufferMemory(
-                    memory_key="chat_history", return_messages=True
-                ),
+                llm=self.answer_llm,
+                condense_question_llm=self.llm,
+                retriever=create_retriever(vector_store, lexical_index),
+                memory=memory,
             )
             return conversation_chain
         except Exception as e:
             st.error(f"Error creating conversation chain: {str(e)}")
             return None
 
-    def handle_user_question(self, question: str, conversation_chain) -> Optional[dict]:
+    def update_lexical_index(
+        self, conversation_chain, lexical_index: Optional[BM25Index]
+    ):
+        """Point an existing conversation at a rebuilt BM25 index.
+
+        Keeps the conversation's memory, unlike creating a new chain.
+        """
+        if conversation_chain and isinstance(
+            conversation_chain.retriever, HybridRetriever
+        ):
+            conversation_chain.retriever.lexical_index = lexical_index
+
+    def scope_documents(
+        self, conversation_chain, file_hashes: Optional[Collection[str]]
+    ):
+        """Limit a conversation's retrieval to some documents, or None for all."""
+        if conversation_chain and isinstance(
+            conversation_chain.retriever, HybridRetriever
+        ):
+            conversation_chain.retriever.file_hashes = (
+                None if file_hashes is None else frozenset(file_hashes)
+            )
+
+    @metrics.traced("question")
+    def handle_user_question(
+        self,
+        question: str,
+        conversation_chain,
+        index_version: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        file_hashes: Optional[Collection[str]] = None,
+    ) -> Optional[dict]:
         """Process user question and get response.
 
+        Answers from the document chain are cached per index version, so a
+        question already answered over the same documents skips the LLM.
+        Otherwise the answer can be streamed token by token; the seconds
+        until its first token are returned as "time_to_first_token".
+
+        Each call is traced as the "question" operation, with the time and
+        counts of its "answer_cache", "retrieve", "condense" and "answer"
+        stages; see core/metrics.py.
+
         Args:
             question: User's question
             conversation_chain: Active conversation chain
+            index_version: Version of the project index, enables the answer cache (optional)
+            on_token: Called with each answer token as it is generated (optional)
+            file_hashes: Only retrieve from these documents; all of them if None
 
         Returns:
             Response dictionary with chat history or None if error
         """
+        trace = metrics.current_trace()
         try:
-            with st.spinner("🤔 StudyBuddy is thinking..."):
+            self.scope_documents(conversation_chain, file_hashes)
+            if file_hashes is not None:
+                trace.set(documents=len(file_hashes))
+            scope, embed = None, None
+            if index_version and conversation_chain and not self.use_simple_chatbot:
+                with metrics.stage("answer_cache"):
+                    scope = self._answer_scope(index_version, conversation_chain)
+                    embed = self._query_embedder(conversation_chain)
+                    cached_answer = self.answer_cache.get(question, scope, embed)
+                hit = cached_answer is not None
+                metrics.count("answer_cache", cache_hits=int(hit), cache_misses=int(not hit))
+                if hit:
+                    trace.set(mode="cache")
+                    # Summarizing evicted turns is left to the next answered question
+                    conversation_chain.memory.add_turn(
+                        {"question": question}, {"answer": cached_answer}
+                    )
+                    return {
+                        "question": question,
+                        "chat_history": conversation_chain.memory.chat_memory.messages,
+                        "answer": cached_answer,
+                        "cached": True,
+                    }
+
+            use_chatbot = self.use_simple_chatbot or not conversation_chain
+            streaming = on_token is not None and not use_chatbot
+            # A streamed answer shows progress itself
+            with nullcontext() if streaming else st.spinner("🤔 StudyBuddy is thinking..."):
                 # Check if we should use simple chatbot mode
-                if self.use_simple_chatbot or not conversation_chain:
+                if use_chatbot:
+                    trace.set(mode="chatbot")
                     # Get relevant context if available
                     context = ""
                     if conversation_chain:
                         retriever = conversation_chain.retriever
-                        relevant_docs = retriever.get_relevant_documents(question)
+                        with metrics.stage("retrieve"):
+                            relevant_docs = retriever.get_relevant_documents(question)
+                        metrics.count("retrieve", documents=len(relevant_docs))
                         context = "\n".join(
                             [doc.page_content for doc in relevant_docs[:2]]
                         )
 
                     # Generate chatbot response
-                    chatbot_response = self.chatbot_service.generate_response(
-                        question, context
-                    )
+                    with metrics.stage("answer"):
+                        chatbot_response = self.chatbot_service.generate_response(
+                            question, context
+                        )
 
                     # Create a mock response in the expected format
                     from langchain.schema import HumanMessage, AIMessage
 
-                    # Get existing chat history if available
-                    chat_history = []
+                    # Append the turn to the conversation memory if available
                     if conversation_chain and conversation_chain.memory:
-                        chat_history = (
-                            conversation_chain.memory.chat_memory.messages.copy()
+                        conversation_chain.memory.add_turn(
+                            {"question": question}, {"answer": chatbot_response}
                         )
-
-                    # Add new messages
-                    chat_history.append(HumanMessage(content=question))
-                    chat_history.append(AIMessage(content=chatbot_response))
-
-                    # Update memory if available
-                    if conversation_chain and conversation_chain.memory:
-                        conversation_chain.memory.chat_memory.messages = chat_history
+                        chat_history = conversation_chain.memory.chat_memory.messages
+                    else:
+                        chat_history = [
+                            HumanMessage(content=question),
+                            AIMessage(content=chatbot_response),
+                        ]
 
                     return {"chat_history": chat_history, "answer": chatbot_response}
                 else:
                     # Use normal LangChain response with documents
-                    response = conversation_chain.invoke({"question": question})
+                    trace.set(mode="documents")
+                    callbacks = [StageTimingHandler(trace)]
+                    if not streaming:
+                        response = conversation_chain.invoke(
+                            {"question": question}, config={"callbacks": callbacks}
+                        )
+                    else:
+                        handler = AnswerStreamHandler(on_token)
+                        response = conversation_chain.invoke(
+                            {"question": question},
+                            config={"callbacks": callbacks + [handler]},
+                        )
+                        response["time_to_first_token"] = handler.time_to_first_token
+                    # The chain returns the summarized prompt history; show all of it
+                    response["chat_history"] = conversation_chain.memory.chat_memory.messages
+                    if scope:
+                        self.answer_cache.put(question, scope, response["answer"], embed)
                     return response
 
         except Exception as e:
+            trace.error = type(e).__name__
             st.error(f"❌ Error processing your question: {str(e)}")
             # Fallback to simple chatbot
             try:
@@ -105,17 +321,73 @@ class ChatService:
             except:
                 return None
 
-    def toggle_simple_chatbot(self, enable: bool):
-        """Toggle simple chatbot mode."""
-        self.use_simple_chatbot = enable
+    def get_answer_cache_stats(self) -> dict:
+        """Get hit rates of the shared answer cache."""
+        return self.answer_cache.get_stats()
+
+    @staticmethod
+    def _answer_scope(index_version: str, conversation_chain) -> str:
+        """Build the answer cache scope of a question in a conversation.
+
+        Follow-up questions are rephrased using the chat history, so the
+        history the prompt sees is part of the scope; opening questions share
+        one scope. So are the documents the question is limited to.
+        """
+        messages = conversation_chain.memory.load_memory_variables({})[
+            conversation_chain.memory.memory_key
+        ]
+        history = ""
+        if messages:
+            history = hashlib.sha256(
+                "\0".join(message.content for message in messages).encode("utf-8")
+            ).hexdigest()[:16]
+        documents = ""
+        file_hashes = getattr(conversation_chain.retriever, "file_hashes", None)
+        if file_hashes is not None:
+            documents = hashlib.sha256(
+                "\0".join(sorted(file_hashes)).encode("utf-8")
+            ).hexdigest()[:16]
+        return AnswerCache.make_scope(
+            index_version,
+            {**settings.get_answer_settings(), "history": history, "documents": documents},
+        )
+
+    @staticmethod
+    def _query_embedder(conversation_chain):
+        """Get the query embedding function of a conversation's vector store."""
+        vector_store = getattr(conversation_chain.retriever, "vector_store", None)
+        embeddings = getattr(vector_store, "embedding_function", None)
+        return getattr(embeddings, "embed_query", None)
 
     def get_study_tips(self) -> list:
         """Get study tips from the chatbot service."""
         return self.chatbot_service.get_study_tips()
 
-    def search_knowledge_base(self, search_term: str) -> list:
-        """Search the chatbot's knowledge base."""
-        return self.chatbot_service.search_knowledge_base(search_term)
+    def search_knowledge_base(
+        self, search_term: str, page: int = 1, page_size: Optional[int] = None
+    ) -> dict:
+        """Search the chatbot's knowledge base one page at a time.
+
+        Args:
+            search_term: Search terms
+            page: Page number, starting at 1
+            page_size: Results per page (defaults to KB_SEARCH_PAGE_SIZE)
+
+        Returns:
+            Dictionary with the page's "results" ({"topic", "score", "snippet"}),
+            the "total" number of matches, "page" and "page_size"
+        """
+        page = max(page, 1)
+        page_size = page_size or settings.KB_SEARCH_PAGE_SIZE
+        total, results = self.chatbot_service.search_knowledge_base_ranked(
+            search_term, limit=page_size, offset=(page - 1) * page_size
+        )
+        return {
+            "results": results,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+        }
 
     def get_available_topics(self) -> list:
         """Get available topics from the chatbot."""
@@ -123,15 +395,4 @@ class ChatService:
 
     def initialize_session_state(self):
         """Initialize Streamlit session state variables."""
-        if "conversation" not in st.session_state:
-            st.session_state.conversation = None
-        if "chat_history" not in st.session_state:
-            st.session_state.chat_history = None
-        if "documents_processed" not in st.session_state:
-            st.session_state.documents_processed = False
-        if "uploaded_files" not in st.session_state:
-            st.session_state.uploaded_files = []
-        if "file_names" not in st.session_state:
-            st.session_state.file_names = []
-        if "simple_chatbot_enabled" not in st.session_state:
-            st.session_state.simple_chatbot_enabled = False
+        initialize_chat_session_state()
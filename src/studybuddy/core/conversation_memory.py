@@ -0,0 +1,188 @@
+"""Conversation memory with a hard token budget for StudyBuddy chats."""
+
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from langchain_core.pydantic_v1 import Field
+
+from ..config.settings import settings
+from .tokens import estimate_tokens, get_encoding
+
+# Tokens of role and separator markup around every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a text for the configured chat model.
+
+    Falls back to an estimate of four characters per token when tiktoken
+    has no encoding for the model.
+    """
+    encoding = get_encoding(settings.LLM_MODEL)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to at most max_tokens tokens."""
+    encoding = get_encoding(settings.LLM_MODEL)
+    if encoding is None:
+        return text[: max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Chat memory that keeps the prompt history under a token budget.
+
+    The prompt sees a sliding window of the most recent messages plus a
+    running summary of the messages that slid out of it. Each message's
+    token count is computed once when it is added, and the summary is only
+    extended with newly evicted messages, so a turn costs the same however
+    long the session has been running. Turns added without an LLM call,
+    such as cached answers, leave summarizing to the next answered turn.
+
+    The full history stays in chat_memory.messages, appended to in place,
+    for display and for saving with the project.
+    """
+
+    llm: BaseLanguageModel
+    max_token_limit: int = 1000
+    summary_token_limit: int = 250
+    memory_key: str = "chat_history"
+    return_messages: bool = True
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+
+    summary: str = ""
+    summary_tokens: int = 0
+    window_start: int = 0
+    window_tokens: int = 0
+    summarized_until: int = 0  # Messages before it are summarized or dropped
+    token_counts: List[int] = Field(default_factory=list)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the summary and the recent messages for the prompt."""
+        messages: List[BaseMessage] = self.chat_memory.messages[self.window_start :]
+        if self.summary:
+            messages = [SystemMessage(content=self.summary)] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {
+            self.memory_key: get_buffer_string(
+                messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix
+            )
+        }
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Append a turn, then slide the window back under the budget."""
+        super().save_context(inputs, outputs)
+        self._count_new_messages()
+        self._prune()
+
+    def add_turn(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """Append a turn without calling the LLM, such as a cached answer.
+
+        The window slides as usual; the turns it leaves behind are folded
+        into the summary by the next save_context.
+        """
+        super().save_context(inputs, outputs)
+        self._count_new_messages()
+        self._slide_window()
+
+    def clear(self) -> None:
+        """Forget the history, the window and the summary."""
+        super().clear()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.window_start = 0
+        self.window_tokens = 0
+        self.summarized_until = 0
+        self.token_counts = []
+
+    def load_history(self, messages: List[BaseMessage]) -> None:
+        """Start from a saved chat history, such as a reopened project's.
+
+        The window is slid over the history without summarizing the turns
+        it leaves behind, so restoring a long chat makes no LLM calls; those
+        turns are dropped from the prompt instead.
+        """
+        self.clear()
+        self.chat_memory.add_messages(messages)
+        self._count_new_messages()
+        self._slide_window()
+        self.summarized_until = self.window_start
+
+    def get_prompt_tokens(self) -> int:
+        """Get the tokens the history currently adds to a prompt."""
+        return self.window_tokens + self.summary_tokens
+
+    def _count_new_messages(self) -> None:
+        """Count the tokens of messages added since the last turn."""
+        messages = self.chat_memory.messages
+        for position in range(len(self.token_counts), len(messages)):
+            tokens = count_tokens(messages[position].content) + MESSAGE_OVERHEAD_TOKENS
+            self.token_counts.append(tokens)
+            self.window_tokens += tokens
+
+    def _prune(self) -> None:
+        """Move the oldest window messages into the summary until under budget.
+
+        Whole turns (a question and its answer) are evicted together, and
+        the latest turn always stays in the window. Turns evicted earlier by
+        add_turn are summarized along with them.
+        """
+        self._slide_window()
+        if self.window_start > self.summarized_until:
+            self._extend_summary(
+                self.chat_memory.messages[self.summarized_until : self.window_start]
+            )
+            self.summarized_until = self.window_start
+
+    def _slide_window(self) -> None:
+        """Drop whole turns from the start of the window until under budget."""
+        messages = self.chat_memory.messages
+        window_budget = (
+            self.max_token_limit - self.summary_token_limit - MESSAGE_OVERHEAD_TOKENS
+        )
+        while self.window_tokens > window_budget and self.window_start < len(messages) - 2:
+            self.window_tokens -= sum(
+                self.token_counts[self.window_start : self.window_start + 2]
+            )
+            self.window_start += 2
+
+    def _extend_summary(self, evicted: List[BaseMessage]) -> None:
+        """Fold evicted messages into the running summary."""
+        prompt = SUMMARY_PROMPT.format(
+            summary=self.summary,
+            new_lines=get_buffer_string(
+                evicted, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix
+            ),
+        )
+        summary = self.llm.invoke(prompt)
+        summary = getattr(summary, "content", summary).strip()
+        self.summary = truncate_to_tokens(summary, self.summary_token_limit)
+        self.summary_tokens = count_tokens(self.summary) + MESSAGE_OVERHEAD_TOKENS
+
+
+def create_memory(llm: BaseLanguageModel) -> TokenBudgetMemory:
+    """Create conversation memory with the configured token budget.
+
+    Args:
+        llm: Chat model used to summarize older messages
+    """
+    return TokenBudgetMemory(
+        llm=llm,
+        max_token_limit=settings.MEMORY_MAX_TOKENS,
+        summary_token_limit=settings.MEMORY_SUMMARY_MAX_TOKENS,
+        memory_key="chat_history",
+        return_messages=True,
+    )
@@ -1,23 +1,194 @@
 """Document processing utilities for StudyBuddy."""
 
-from typing import List, Optional
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 import streamlit as st
 from PyPDF2 import PdfReader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings  # Updated import
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
 from ..config.settings import settings
+from . import metrics
+from .blob_store import BlobStore
+from .embeddings import create_embeddings
+from .index_store import IndexStore
+from .text_splitter import ChunkRecord, PageTextSplitter
+from .vector_storage import create_index, ensure_writable
+
+# Called as progress(stage, done, total) while documents are processed;
+# total is None when a stage's size is not known up front
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+
+def _spool_pdf(pdf, path: str) -> None:
+    """Copy an uploaded PDF to a file block by block, without consuming it."""
+    position = pdf.tell()
+    pdf.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(pdf, f, IndexStore.READ_BLOCK_SIZE)
+    pdf.seek(position)
+
+
+def _pdf_size(pdf) -> int:
+    """Get the size of an uploaded PDF in bytes without copying it."""
+    if hasattr(pdf, "size"):
+        return pdf.size
+    if hasattr(pdf, "getbuffer"):
+        with pdf.getbuffer() as view:
+            return view.nbytes
+    position = pdf.tell()
+    size = pdf.seek(0, os.SEEK_END)
+    pdf.seek(position)
+    return size
+
+
+def _count_pages(path: str) -> int:
+    """Count the pages of a PDF file, reading only what the count needs."""
+    with open(path, "rb") as f:
+        return len(PdfReader(f).pages)
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF file.
+
+    Runs inside worker processes, so it takes the file's path rather than
+    the upload.
+    """
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most ``size`` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 class DocumentProcessor:
     """Handles PDF document processing and text extraction."""
 
     def __init__(self):
-        self.text_splitter = CharacterTextSplitter(
-            **settings.get_text_splitter_config()
-        )
-        self.embeddings = OpenAIEmbeddings()  # Now using updated class
+        self.text_splitter = PageTextSplitter(**settings.get_text_splitter_config())
+        self.embeddings = create_embeddings()
+        self.index_store = IndexStore()
+        self.blob_store = BlobStore()
+
+    def iter_pdf_pages(
+        self, pdf_docs, errors: Optional[Dict[int, str]] = None
+    ) -> Iterator[Tuple[int, str, str]]:
+        """Stream page text out of uploaded PDFs using a process pool.
+
+        Files are split into page ranges that are extracted in parallel, with
+        only a bounded number of ranges in flight so memory does not grow with
+        the upload. Pages are yielded in upload and page order. When a file
+        fails, its error is recorded and its remaining pages are skipped
+        without affecting the other files. Errors are keyed by file index, as
+        uploads may share a name.
+
+        Args:
+            pdf_docs: List of uploaded PDF files from Streamlit
+            errors: Dictionary that receives file index -> error message (optional)
+
+        Yields:
+            (file index, file name, page text) tuples
+        """
+        errors = errors if errors is not None else {}
+        pages_per_task = settings.PDF_PAGES_PER_TASK
+
+        # Uploads are copied to temporary files one at a time, so no copy of
+        # them is held in memory, and workers read page ranges from disk
+        # instead of having the PDFs pickled once per range
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files: List[Tuple[int, str, str, int]] = []
+            for file_index, pdf in enumerate(pdf_docs):
+                path = os.path.join(tmp_dir, f"{file_index}.pdf")
+                try:
+                    _spool_pdf(pdf, path)
+                    files.append((file_index, pdf.name, path, _count_pages(path)))
+                except Exception as e:
+                    errors[file_index] = str(e)
+
+            total_pages = sum(page_count for *_, page_count in files)
+            workers = min(settings.PDF_EXTRACTION_WORKERS, -(-total_pages // pages_per_task))
+            tasks = (
+                (file_index, name, path, start, min(start + pages_per_task, page_count))
+                for file_index, name, path, page_count in files
+                for start in range(0, page_count, pages_per_task)
+            )
+
+            if workers <= 1:
+                for file_index, name, path, start, stop in tasks:
+                    if file_index in errors:
+                        continue
+                    try:
+                        pages = _extract_page_range(path, start, stop)
+                    except Exception as e:
+                        errors[file_index] = str(e)
+                        continue
+                    for page in pages:
+                        yield file_index, name, page
+                return
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+
+                def submit_next() -> None:
+                    for file_index, name, path, start, stop in tasks:
+                        if file_index in errors:
+                            continue
+                        future = pool.submit(_extract_page_range, path, start, stop)
+                        in_flight.append((file_index, name, future))
+                        return
+
+                for _ in range(workers * 2):
+                    submit_next()
+
+                while in_flight:
+                    file_index, name, future = in_flight.popleft()
+                    submit_next()
+                    if file_index in errors:
+                        future.cancel()
+                        continue
+                    try:
+                        pages = future.result()
+                    except Exception as e:
+                        errors[file_index] = str(e)
+                        continue
+                    for page in pages:
+                        yield file_index, name, page
+
+    def extract_pages_from_pdfs(self, pdf_docs) -> List[Tuple[str, List[str]]]:
+        """Extract per-page text from uploaded PDFs using a process pool.
+
+        A file that fails is reported and skipped without discarding the others.
+
+        Args:
+            pdf_docs: List of uploaded PDF files from Streamlit
+
+        Returns:
+            (file name, page texts) for every readable file, in upload order
+        """
+        errors: Dict[int, str] = {}
+        documents: Dict[int, Tuple[str, List[str]]] = {}
+        for file_index, name, page in self.iter_pdf_pages(pdf_docs, errors):
+            documents.setdefault(file_index, (name, []))[1].append(page)
+
+        for file_index, error in errors.items():
+            st.warning(f"Skipped PDF {pdf_docs[file_index].name}: {error}")
+
+        return [
+            document
+            for file_index, document in documents.items()
+            if file_index not in errors
+        ]
 
     def extract_text_from_pdfs(self, pdf_docs) -> Optional[str]:
         """Extract text from uploaded PDF documents.
@@ -26,18 +197,13 @@ class DocumentProcessor:
             pdf_docs: List of uploaded PDF files from Streamlit
 
         Returns:
-            Concatenated text from all PDFs or None if error occurs
+            Concatenated text from all readable PDFs or None if none could be read
         """
-        text = ""
-        for pdf in pdf_docs:
-            try:
-                reader = PdfReader(pdf)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-            except Exception as e:
-                st.error(f"Error reading PDF {pdf.name}: {str(e)}")
-                return None
-        return text
+        documents = self.extract_pages_from_pdfs(pdf_docs)
+        if not documents and pdf_docs:
+            st.error("Error reading PDFs: none of the uploaded files could be read")
+            return None
+        return "".join(f"{page}\n" for _, pages in documents for page in pages)
 
     def split_text_into_chunks(self, raw_text: str) -> List[str]:
         """Split raw text into manageable chunks.
@@ -46,10 +212,22 @@ class DocumentProcessor:
             raw_text: Raw text extracted from documents
 
         Returns:
-            List of text chunks
+            List of text chunks of at most settings.CHUNK_TOKENS tokens
         """
         return self.text_splitter.split_text(raw_text)
 
+    def iter_chunks(self, pages: Iterable[str], file_hash: str = "") -> Iterator[ChunkRecord]:
+        """Split a stream of page texts into chunk records in one pass.
+
+        Args:
+            pages: Page texts of one document, in order
+            file_hash: SHA-256 of the document, stored in its records
+
+        Yields:
+            Chunk records with their page range and character offsets
+        """
+        return self.text_splitter.split_pages(pages, file_hash)
+
     def create_vector_store(self, text_chunks: List[str]) -> Optional[FAISS]:
         """Create FAISS vector store from text chunks.
 
@@ -66,27 +244,387 @@ class DocumentProcessor:
             st.error(f"Error creating vector store: {str(e)}")
             return None
 
-    def process_documents(self, pdf_docs) -> Optional[FAISS]:
+    def build_vector_store(
+        self,
+        chunks: Iterable[Tuple[str, str, dict]],
+        vector_store: Optional[FAISS] = None,
+        progress: Optional[ProgressCallback] = None,
+        on_first_batch: Optional[Callable[[FAISS], None]] = None,
+        on_batch: Optional[Callable[[list, list], None]] = None,
+    ) -> Optional[FAISS]:
+        """Embed and index a stream of chunks in fixed-size batches.
+
+        Each batch is embedded and appended to a growing index, so only one
+        batch of embeddings is held in memory at a time. Chunks that come
+        with their vector are not embedded again. If embedding fails
+        part-way, the chunks already added to an existing index are removed
+        again before the error is raised.
+
+        Args:
+            chunks: (chunk id, chunk text, metadata) triples, or quadruples
+                ending with the chunk's vector when it is already known
+            vector_store: Existing index to add the chunks to (optional)
+            progress: Progress callback for the "embed" and "index" stages (optional)
+            on_first_batch: Called with a new index once it holds its first batch (optional)
+            on_batch: Called with each batch and its vectors once indexed (optional)
+
+        Returns:
+            FAISS vector store, None if there were no chunks and no existing index
+
+        Raises:
+            Exception: Errors from the embeddings backend are propagated
+        """
+        existing = vector_store
+        added_ids: List[str] = []
+        try:
+            for batch in _batched(chunks, settings.INGEST_BATCH_SIZE):
+                ids = [chunk[0] for chunk in batch]
+                texts = [chunk[1] for chunk in batch]
+                metadatas = [chunk[2] for chunk in batch]
+
+                vectors = [chunk[3] if len(chunk) > 3 else None for chunk in batch]
+                missing = [position for position, vector in enumerate(vectors) if vector is None]
+                if missing:
+                    cache_hits = getattr(self.embeddings, "hits", 0)
+                    with metrics.stage("embed"):
+                        embedded = self.embeddings.embed_documents(
+                            [texts[position] for position in missing]
+                        )
+                    for position, vector in zip(missing, embedded):
+                        vectors[position] = vector
+                    metrics.count(
+                        "embed",
+                        texts=len(missing),
+                        cache_hits=getattr(self.embeddings, "hits", 0) - cache_hits,
+                    )
+                # Chunks that came with their vector count as cache hits too
+                metrics.count("embed", cache_hits=len(batch) - len(missing))
+                if progress:
+                    progress("embed", len(added_ids) + len(batch), None)
+
+                is_first_batch = vector_store is None
+                with metrics.stage("index"):
+                    if is_first_batch:
+                        vector_store = FAISS(
+                            self.embeddings,
+                            create_index(len(vectors[0]), np.asarray(vectors, dtype=np.float32)),
+                            InMemoryDocstore(),
+                            {},
+                        )
+                    else:
+                        ensure_writable(vector_store)
+                    vector_store.add_embeddings(
+                        zip(texts, vectors), metadatas=metadatas, ids=ids
+                    )
+                metrics.count("index", vectors=len(batch))
+                if is_first_batch and on_first_batch:
+                    on_first_batch(vector_store)
+
+                added_ids.extend(ids)
+                if progress:
+                    progress("index", len(added_ids), None)
+                if on_batch:
+                    on_batch(batch, vectors)
+        except Exception:
+            if existing is not None and added_ids:
+                existing.delete(added_ids)
+            raise
+
+        return vector_store
+
+    def load_project_index(self, project_id: str) -> Optional[FAISS]:
+        """Load a project's previously saved vector store from disk.
+
+        Args:
+            project_id: Project whose index should be loaded
+
+        Returns:
+            FAISS vector store or None if no usable index is stored
+        """
+        return self.index_store.load(project_id, self.embeddings)
+
+    @metrics.traced("ingest")
+    def process_documents(
+        self,
+        pdf_docs,
+        project_id: Optional[str] = None,
+        vector_store: Optional[FAISS] = None,
+        progress: Optional[ProgressCallback] = None,
+        on_first_batch: Optional[Callable[[FAISS], None]] = None,
+    ) -> Optional[FAISS]:
         """Complete document processing pipeline.
 
+        Pages stream from extraction into the splitter, chunks into embedding
+        batches, and batches into a growing index, so memory stays bounded
+        regardless of upload size. Chunks never span two files.
+
+        When a project ID is given, the uploaded files are added to the
+        project's index: files that are already indexed are skipped, only new
+        files are embedded, and the updated index is saved for next time.
+
+        Each call is traced as the "ingest" operation, with the time and
+        counts of its "extract", "split", "load", "embed", "index" and
+        "save" stages; see core/metrics.py.
+
+        Files processed before, in any project, are neither parsed nor
+        embedded again: their page texts, chunks and vectors are kept in the
+        blob store, keyed by file hash and the settings they depend on.
+
         Args:
             pdf_docs: List of uploaded PDF files
+            project_id: Project whose index the files are added to (optional)
+            vector_store: Loaded project index, loaded from disk if not given (optional)
+            progress: Called as progress(stage, done, total) for the
+                "extract", "split", "embed" and "index" stages (optional)
+            on_first_batch: Called with a new index as soon as it is queryable (optional)
 
         Returns:
             FAISS vector store ready for querying or None if error
         """
-        # Extract text
-        raw_text = self.extract_text_from_pdfs(pdf_docs)
-        if raw_text is None:
+        manifest = self.index_store.new_manifest()
+        if project_id:
+            stored_manifest = self.index_store.load_manifest(project_id)
+            if self.index_store.is_compatible(stored_manifest):
+                manifest = stored_manifest
+                if vector_store is None:
+                    vector_store = self.index_store.load(project_id, self.embeddings)
+            else:
+                # Indexes built with other settings cannot be extended
+                vector_store = None
+        if vector_store is None:
+            manifest["files"] = []
+
+        # Only embed files whose content is not indexed yet
+        known_hashes = {file_entry["sha256"] for file_entry in manifest["files"]}
+        new_docs, new_hashes = [], []
+        for pdf in pdf_docs:
+            file_hash = self.index_store.hash_file(pdf)
+            if file_hash not in known_hashes:
+                known_hashes.add(file_hash)
+                new_docs.append(pdf)
+                new_hashes.append(file_hash)
+
+        if not new_docs:
+            if vector_store is None:
+                st.error("❌ No text found in PDFs")
+            return vector_store
+
+        # Keyed by index in new_docs, as uploads may share a name
+        errors: Dict[int, str] = {}
+        counts = {"extract": 0, "split": 0}
+        chunk_counts = [0] * len(new_docs)
+
+        # Files processed before, in this or any other project, reuse the
+        # text, chunks and vectors derived from them then
+        chunking = settings.get_chunking_fingerprint()
+        chunks_key = BlobStore.derived_key(chunking=chunking)
+        vectors_key = BlobStore.derived_key(
+            chunking=chunking, embedding_backend=manifest["embedding_backend"]
+        )
+        reused = [
+            file_index
+            for file_index, file_hash in enumerate(new_hashes)
+            if self.blob_store.has_chunks(file_hash, chunks_key)
+            or self.blob_store.has_pages(file_hash)
+        ]
+        to_extract = sorted(set(range(len(new_docs))) - set(reused))
+
+        # Vectors of files that have none stored yet, kept until all of a
+        # file's chunks are indexed
+        new_vectors: Dict[str, list] = {}
+        expected_vectors: Dict[str, int] = {}
+
+        def keep(save: Callable, *args) -> None:
+            # Derived artifacts are only a cache, so failing to write one is harmless
+            try:
+                save(*args)
+            except OSError:
+                pass
+
+        def report(stage: str) -> None:
+            counts[stage] += 1
+            if progress:
+                progress(stage, counts[stage], None)
+
+        def document_pages(page_stream, first_page: str) -> Iterator[str]:
+            report("extract")
+            yield first_page
+            for page in page_stream:
+                report("extract")
+                yield page
+
+        def file_chunks(
+            file_index: int, records: Iterable[ChunkRecord], vectors=None
+        ) -> Iterator[tuple]:
+            for record in records:
+                report("split")
+                position = chunk_counts[file_index]
+                chunk_counts[file_index] += 1
+                chunk_id = self.index_store.chunk_id(record.file_hash, position)
+                metadata = {
+                    "source": new_docs[file_index].name,
+                    "file_hash": record.file_hash,
+                    "page_start": record.page_start,
+                    "page_end": record.page_end,
+                    "char_start": record.char_start,
+                    "char_end": record.char_end,
+                }
+                if vectors is None:
+                    yield chunk_id, record.text, metadata
+                else:
+                    yield chunk_id, record.text, metadata, vectors[position]
+
+        def stored_chunks(file_index: int) -> Iterator[tuple]:
+            file_hash = new_hashes[file_index]
+            with metrics.stage("load"):
+                rows = self.blob_store.load_chunks(file_hash, chunks_key)
+            if rows is not None:
+                chunks = [ChunkRecord.from_row(row, file_hash) for row in rows]
+            else:
+                # Extracted before, but split with other settings
+                with metrics.stage("load"):
+                    pages = self.blob_store.load_pages(file_hash) or []
+                chunks = list(metrics.timed(self.iter_chunks(pages, file_hash), "split"))
+                metrics.count("split", chunks=len(chunks))
+                keep(
+                    self.blob_store.save_chunks,
+                    file_hash,
+                    chunks_key,
+                    [chunk.to_row() for chunk in chunks],
+                )
+
+            with metrics.stage("load"):
+                vectors = self.blob_store.load_vectors(file_hash, vectors_key)
+            metrics.count("load", files=1, chunks=len(chunks))
+            if vectors is None or len(vectors) != len(chunks):
+                vectors = None
+                new_vectors[file_hash] = []
+                expected_vectors[file_hash] = len(chunks)
+            yield from file_chunks(file_index, chunks, vectors)
+
+        def extracted_chunks() -> Iterator[tuple]:
+            # Group the page stream by file so each document is split on its own
+            extract_docs = [new_docs[i] for i in to_extract]
+            metrics.count("extract", bytes=sum(_pdf_size(pdf) for pdf in extract_docs))
+            extract_errors: Dict[int, str] = {}
+            pages = metrics.timed(
+                self.iter_pdf_pages(extract_docs, extract_errors), "extract"
+            )
+            pending = next(pages, None)
+            while pending is not None:
+                position, _, first_page = pending
+                file_index = to_extract[position]
+                file_hash = new_hashes[file_index]
+                pending = None
+
+                def same_file() -> Iterator[str]:
+                    nonlocal pending
+                    for item in pages:
+                        if item[0] != position:
+                            pending = item
+                            return
+                        yield item[2]
+
+                file_pages: List[str] = []
+
+                def recorded(page_stream: Iterator[str]) -> Iterator[str]:
+                    for page in page_stream:
+                        file_pages.append(page)
+                        yield page
+
+                chunks: List[ChunkRecord] = []
+                new_vectors[file_hash] = []
+                for chunk in metrics.timed(
+                    self.iter_chunks(
+                        recorded(document_pages(same_file(), first_page)), file_hash
+                    ),
+                    "split",
+                ):
+                    chunks.append(chunk)
+                    yield from file_chunks(file_index, [chunk])
+                metrics.count("extract", pages=len(file_pages))
+                metrics.count("split", chunks=len(chunks))
+
+                if position in extract_errors:
+                    new_vectors.pop(file_hash, None)
+                    continue
+                keep(self.blob_store.save_pages, file_hash, file_pages)
+                keep(
+                    self.blob_store.save_chunks,
+                    file_hash,
+                    chunks_key,
+                    [chunk.to_row() for chunk in chunks],
+                )
+                expected_vectors[file_hash] = len(chunks)
+            errors.update(
+                (to_extract[position], error) for position, error in extract_errors.items()
+            )
+
+        def chunk_stream() -> Iterator[tuple]:
+            for file_index in reused:
+                yield from stored_chunks(file_index)
+            yield from extracted_chunks()
+
+        def record_vectors(batch: list, vectors: list) -> None:
+            for chunk, vector in zip(batch, vectors):
+                collected = new_vectors.get(chunk[2]["file_hash"])
+                if collected is not None:
+                    collected.append(vector)
+            for file_hash, count in list(expected_vectors.items()):
+                if len(new_vectors[file_hash]) == count:
+                    keep(
+                        self.blob_store.save_vectors,
+                        file_hash,
+                        vectors_key,
+                        new_vectors.pop(file_hash),
+                    )
+                    del expected_vectors[file_hash]
+
+        try:
+            vector_store = self.build_vector_store(
+                chunk_stream(),
+                vector_store=vector_store,
+                progress=progress,
+                on_first_batch=on_first_batch,
+                on_batch=record_vectors,
+            )
+        except Exception as e:
+            st.error(f"Error creating vector store: {str(e)}")
             return None
 
-        if not raw_text.strip():
+        for file_index, error in errors.items():
+            st.warning(f"Skipped PDF {new_docs[file_index].name}: {error}")
+
+        if vector_store is None:
             st.error("❌ No text found in PDFs")
             return None
 
-        # Split into chunks
-        text_chunks = self.split_text_into_chunks(raw_text)
+        for file_index, (pdf, file_hash, chunk_count) in enumerate(
+            zip(new_docs, new_hashes, chunk_counts)
+        ):
+            file_entry = {"name": pdf.name, "sha256": file_hash, "chunk_count": chunk_count}
+            if file_index in errors:
+                # Drop whatever a file contributed before it failed
+                partial_ids = self.index_store.chunk_ids(file_entry)
+                if partial_ids:
+                    ensure_writable(vector_store)
+                    vector_store.delete(partial_ids)
+                continue
+            manifest["files"].append(file_entry)
+
+        trace = metrics.current_trace()
+        if trace:
+            trace.set(
+                files=len(new_docs),
+                reused_files=len(reused),
+                failed_files=len(errors),
+                chunks=sum(chunk_counts),
+            )
 
-        # Create vector store
-        vector_store = self.create_vector_store(text_chunks)
+        if project_id:
+            try:
+                with metrics.stage("save"):
+                    self.index_store.save(project_id, vector_store, manifest)
+            except (OSError, RuntimeError) as e:
+                st.warning(f"Could not save the document index: {str(e)}")
         return vector_store
@@ -0,0 +1,189 @@
+"""Persistent, content-addressed cache in front of an embeddings backend."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from ..config.settings import settings
+from .embedding_executor import BatchedEmbeddingExecutor
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the wrapped backend.
+
+    Vectors are stored in SQLite as float32 blobs keyed by the SHA-256 of the
+    model name and chunk text, so identical chunks are embedded once no matter
+    which upload or project they come from. The least recently used entries
+    are evicted once the cache grows past ``max_entries``.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    _LOOKUP_BATCH = 500
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path or settings.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._clock = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used "
+            "ON embeddings (last_used)"
+        )
+        row = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM embeddings"
+        ).fetchone()
+        self._size, self._clock = row
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        """Build the cache key of a text for the current model."""
+        return hashlib.sha256(
+            f"{self.model_name}\0{text}".encode("utf-8")
+        ).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, reusing cached vectors where possible.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per input text, in input order
+        """
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # Deduplicate misses so repeated chunks in one call are embedded once
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            key_of = {text: key for key, text in missing.items()}
+
+            def store_batch(batch_texts: List[str], batch_vectors) -> None:
+                fresh = {
+                    key_of[text]: array("f", vector)
+                    for text, vector in zip(batch_texts, batch_vectors)
+                }
+                self._store(fresh)
+                cached.update(fresh)
+
+            if isinstance(self.embeddings, BatchedEmbeddingExecutor):
+                # Store each request batch as it completes, so a failed run
+                # resumes from where it stopped
+                self.embeddings.embed_documents(
+                    list(missing.values()), on_batch=store_batch
+                )
+            else:
+                missing_texts = list(missing.values())
+                store_batch(
+                    missing_texts, self.embeddings.embed_documents(missing_texts)
+                )
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the cached vector for repeated questions."""
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            with self._lock:
+                self.hits += 1
+            return list(cached[key])
+
+        with self._lock:
+            self.misses += 1
+        vector = array("f", self.embeddings.embed_query(text))
+        self._store({key: vector})
+        return list(vector)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+        }
+
+    def _lookup(self, keys: List[str]) -> Dict[str, array]:
+        """Fetch cached vectors and mark them as recently used."""
+        found: Dict[str, array] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), self._LOOKUP_BATCH):
+                batch = unique_keys[start : start + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+
+            if found:
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(self._clock, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, array]) -> None:
+        """Insert new vectors and evict least recently used entries."""
+        with self._lock:
+            self._clock += 1
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, vector.tobytes(), self._clock)
+                    for key, vector in vectors.items()
+                ],
+            )
+            self._size += self._conn.total_changes - before
+
+            excess = self._size - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._size -= excess
+            self._conn.commit()
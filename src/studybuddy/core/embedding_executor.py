@@ -0,0 +1,183 @@
+"""Concurrent, rate-limited execution of embedding requests."""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+from ..config.settings import settings
+
+# Called with (texts, vectors) as soon as a request batch has been embedded
+BatchCallback = Callable[[List[str], List[List[float]]], None]
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until ``amount`` tokens are available, then take them."""
+        # Requests larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_time = (amount - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class BatchedEmbeddingExecutor(Embeddings):
+    """Embeddings wrapper that sends request batches concurrently.
+
+    Texts are split into request batches that run on a thread pool with a
+    bounded number of requests in flight. Request and token rates are shaped
+    by token buckets, and rate-limit, timeout and server errors are retried
+    with jittered exponential backoff. Completed batches are reported
+    through ``on_batch`` as they finish, so a caller can persist partial
+    progress and resume after a failure without re-sending them.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ):
+        self.embeddings = embeddings
+        self.batch_size = batch_size or settings.EMBEDDING_REQUEST_BATCH_SIZE
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = (
+            settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff_base = backoff_base or settings.EMBEDDING_BACKOFF_BASE
+        self.backoff_max = backoff_max or settings.EMBEDDING_BACKOFF_MAX
+        self.request_bucket = TokenBucket(
+            requests_per_minute or settings.EMBEDDING_REQUESTS_PER_MINUTE
+        )
+        self.token_bucket = TokenBucket(
+            tokens_per_minute or settings.EMBEDDING_TOKENS_PER_MINUTE
+        )
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(
+        self, texts: List[str], on_batch: Optional[BatchCallback] = None
+    ) -> List[List[float]]:
+        """Embed texts in concurrent request batches.
+
+        Args:
+            texts: Texts to embed
+            on_batch: Called with (texts, vectors) for each completed batch (optional)
+
+        Returns:
+            One embedding per input text, in input order
+
+        Raises:
+            Exception: The first error that could not be retried away. Batches
+                that completed before it have already been passed to on_batch.
+        """
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        if len(batches) <= 1:
+            return self._run_batch(batches[0], on_batch) if batches else []
+
+        results: Dict[int, List[List[float]]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {
+                pool.submit(self._run_batch, batch, on_batch): batch_index
+                for batch_index, batch in enumerate(batches)
+            }
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in pending:
+                future.cancel()
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    raise error
+                results[futures[future]] = future.result()
+
+        return [vector for index in range(len(batches)) for vector in results[index]]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the same rate limiting and retries."""
+        return self._call_with_retries(lambda: self.embeddings.embed_query(text), [text])
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get request and retry counters."""
+        return {"requests": self.requests, "retries": self.retries}
+
+    def _run_batch(
+        self, texts: List[str], on_batch: Optional[BatchCallback]
+    ) -> List[List[float]]:
+        """Embed one request batch and report it."""
+        vectors = self._call_with_retries(
+            lambda: self.embeddings.embed_documents(texts), texts
+        )
+        if on_batch:
+            on_batch(texts, vectors)
+        return vectors
+
+    def _call_with_retries(self, call, texts: List[str]):
+        """Run a request under the rate limits, retrying transient errors."""
+        # Roughly four characters per token for English text
+        estimated_tokens = sum(len(text) for text in texts) / 4 + len(texts)
+        attempt = 0
+        while True:
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimated_tokens)
+            with self._lock:
+                self.requests += 1
+            try:
+                return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Check whether an error is a rate limit, timeout or server error."""
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Compute a full-jitter backoff delay, honouring Retry-After."""
+        response = getattr(error, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after")
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.backoff_max)
+        except ValueError:
+            pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
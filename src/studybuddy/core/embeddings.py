@@ -0,0 +1,133 @@
+"""Embedding backends for StudyBuddy."""
+
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from ..config.settings import settings
+from .embedding_cache import CachedEmbeddings
+from .embedding_executor import BatchedEmbeddingExecutor
+from .http_client import get_http_client
+
+EMBEDDING_BACKENDS = ("openai", "local")
+
+# Odd 64-bit constants for polynomial n-gram hashing and final mixing
+_HASH_PRIME = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+
+
+class HashingEmbeddings(Embeddings):
+    """Offline embeddings from hashed character n-grams.
+
+    Every character n-gram of a text is hashed to a signed bucket of a
+    fixed-size vector (a sparse random projection of the n-gram counts), the
+    counts are dampened logarithmically and the result is L2-normalised. A
+    whole batch is hashed and accumulated with a handful of NumPy array
+    operations, with no per-n-gram Python loop, so it runs fast on a CPU
+    and needs no network or model download.
+    """
+
+    def __init__(self, dimensions: int = 384, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+
+    @property
+    def model_name(self) -> str:
+        """Identifier of this embedding configuration."""
+        low, high = self.ngram_range
+        return f"hashing-{self.dimensions}-{low}-{high}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts."""
+        return self.embed_matrix(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query."""
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts as a (len(texts), dimensions) float32 matrix."""
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+
+        # Lay all texts out in one code-point array, separated by a NUL that
+        # n-grams are not allowed to span
+        normalized = [" ".join(text.lower().split()) for text in texts]
+        codes = np.frombuffer(
+            "\0".join(normalized).encode("utf-32-le"), dtype=np.uint32
+        ).astype(np.uint64)
+        lengths = np.fromiter((len(text) for text in normalized), dtype=np.int64)
+        rows = np.repeat(np.arange(len(texts)), lengths + 1)[: len(codes)]
+        rows[np.cumsum(lengths + 1)[:-1] - 1] = -1
+
+        all_rows, all_buckets, all_signs = [], [], []
+        with np.errstate(over="ignore"):
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                count = len(codes) - n + 1
+                if count <= 0:
+                    continue
+                hashes = np.full(count, n, dtype=np.uint64)
+                for offset in range(n):
+                    hashes = hashes * _HASH_PRIME + codes[offset : offset + count]
+
+                valid = (rows[:count] == rows[n - 1 : n - 1 + count]) & (rows[:count] >= 0)
+                hashes = hashes[valid]
+                hashes ^= hashes >> np.uint64(33)
+                hashes *= _MIX_1
+                hashes ^= hashes >> np.uint64(33)
+                hashes *= _MIX_2
+                hashes ^= hashes >> np.uint64(33)
+
+                all_rows.append(rows[:count][valid])
+                all_buckets.append((hashes % np.uint64(self.dimensions)).astype(np.int64))
+                all_signs.append(np.where(hashes >> np.uint64(63), -1.0, 1.0))
+
+        matrix = np.zeros(len(texts) * self.dimensions)
+        if all_rows:
+            flat = np.concatenate(all_rows) * self.dimensions + np.concatenate(all_buckets)
+            matrix = np.bincount(
+                flat, weights=np.concatenate(all_signs), minlength=len(matrix)
+            )
+        matrix = matrix.reshape(len(texts), self.dimensions)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+
+def get_backend_name() -> str:
+    """Get the configured embedding backend, falling back to OpenAI."""
+    backend = settings.EMBEDDING_BACKEND
+    return backend if backend in EMBEDDING_BACKENDS else "openai"
+
+
+def create_embeddings() -> Embeddings:
+    """Create the configured embeddings backend.
+
+    OpenAI embeddings are wrapped in the concurrent executor and the
+    persistent cache. Local embeddings are cheaper to compute than to look
+    up, so they are used directly.
+    """
+    if get_backend_name() == "local":
+        return _create_local_embeddings()
+
+    return CachedEmbeddings(
+        BatchedEmbeddingExecutor(
+            OpenAIEmbeddings(
+                **settings.get_embeddings_config(), http_client=get_http_client()
+            )
+        ),
+        model_name=settings.EMBEDDING_MODEL,
+    )
+
+
+def _create_local_embeddings() -> HashingEmbeddings:
+    """Create the local hashing embedder from settings."""
+    return HashingEmbeddings(
+        dimensions=settings.LOCAL_EMBEDDING_DIMENSIONS,
+        ngram_range=settings.LOCAL_EMBEDDING_NGRAM_RANGE,
+    )
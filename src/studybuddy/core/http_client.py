@@ -0,0 +1,21 @@
+"""Shared HTTP connection pool for OpenAI requests."""
+
+import httpx
+import streamlit as st
+
+from ..config.settings import settings
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_client() -> httpx.Client:
+    """Get the HTTP client shared by every OpenAI model of this process.
+
+    Reusing one client keeps TLS connections to the API alive across
+    requests, reruns and sessions instead of opening a pool per model.
+    """
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+        )
+    )
@@ -0,0 +1,324 @@
+"""On-disk persistence of per-project vector indexes for StudyBuddy."""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from ..config.settings import settings
+from .lexical_index import BM25Index
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+
+class IndexStore:
+    """Saves and reloads project vector stores under models/project_<id>/.
+
+    Each project directory holds five files next to its metadata.json:
+    the raw FAISS index, the chunk texts in index order with a side file of
+    their offsets and IDs, a BM25 keyword index over the same chunks, and a
+    manifest describing what the index was built from. The manifest is
+    written last, so a project only counts as indexed once all of its files
+    are in place. Vectors are stored with settings.VECTOR_STORAGE, and both
+    they and the chunk texts are memory-mapped on load; see
+    core/vector_storage.py.
+    Large projects also get an approximate index derived from the exact one
+    in the background; see core/ann_index.py.
+
+    Chunk vectors are keyed by the hash of the file they came from, so a
+    single file's vectors can be added or removed without a rebuild.
+
+    FAISS and LangChain are imported on first load or save, so reading
+    manifests (to list a project's documents) stays cheap.
+    """
+
+    INDEX_FILE = "index.faiss"
+    CHUNKS_FILE = "chunks.jsonl"
+    OFFSETS_FILE = "chunks.idx"
+    LEXICAL_FILE = "lexical.bm25"
+    MANIFEST_FILE = "manifest.json"
+    MANIFEST_VERSION = 2
+    READ_BLOCK_SIZE = 1 << 20  # Bytes of an upload read at a time
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = Path(base_dir or settings.MODELS_DIR)
+
+    def project_dir(self, project_id: str) -> Path:
+        """Get the storage directory of a project."""
+        return self.base_dir / f"project_{project_id}"
+
+    @staticmethod
+    def hash_file(pdf) -> str:
+        """Compute the SHA-256 of an uploaded file block by block, without consuming it."""
+        digest = hashlib.sha256()
+        position = pdf.tell()
+        pdf.seek(0)
+        while block := pdf.read(IndexStore.READ_BLOCK_SIZE):
+            digest.update(block)
+        pdf.seek(position)
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_key(file_hash: str) -> str:
+        """Get the prefix shared by the chunk IDs of a file."""
+        return file_hash[:16]
+
+    @staticmethod
+    def chunk_id(file_hash: str, position: int) -> str:
+        """Build the stable vector ID of a chunk within a file."""
+        return f"{IndexStore.file_key(file_hash)}-{position}"
+
+    def chunk_ids(self, file_entry: Dict[str, Any]) -> List[str]:
+        """Get the vector IDs of every chunk of a manifest file entry."""
+        return [
+            self.chunk_id(file_entry["sha256"], position)
+            for position in range(file_entry.get("chunk_count", 0))
+        ]
+
+    def new_manifest(self) -> Dict[str, Any]:
+        """Create an empty manifest for the current chunking and embedding backend.
+
+        Files are appended to its "files" list as {"name", "sha256",
+        "chunk_count"} entries when they are indexed.
+        """
+        return {
+            "version": self.MANIFEST_VERSION,
+            "files": [],
+            "chunking": settings.get_chunking_fingerprint(),
+            "embedding_backend": settings.get_embedding_backend_id(),
+        }
+
+    def is_compatible(self, manifest: Optional[Dict[str, Any]]) -> bool:
+        """Check whether a stored index was built with the current settings.
+
+        Indexes built by another embedding backend or model are rejected,
+        since their vectors are not comparable with the query embeddings.
+        """
+        if not manifest:
+            return False
+        expected = self.new_manifest()
+        return all(
+            manifest.get(key) == expected[key]
+            for key in ("version", "chunking", "embedding_backend")
+        )
+
+    def index_version(self, project_id: str) -> Optional[str]:
+        """Get a version string that changes whenever a project's index does.
+
+        It is derived from the indexed files and the settings they were
+        indexed with, so projects holding the same documents share it.
+
+        Returns:
+            Version string or None if no compatible index is stored
+        """
+        manifest = self.load_manifest(project_id)
+        if not self.is_compatible(manifest):
+            return None
+        fingerprint = json.dumps(
+            {
+                "files": sorted(entry["sha256"] for entry in manifest["files"]),
+                "chunking": manifest["chunking"],
+                "embedding_backend": manifest["embedding_backend"],
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+    def indexed_hashes(self) -> Set[str]:
+        """Get the hashes of the files indexed in any stored project."""
+        hashes = set()
+        for path in self.base_dir.glob(f"project_*/{self.MANIFEST_FILE}"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            hashes.update(entry["sha256"] for entry in manifest.get("files", []))
+        return hashes
+
+    def has_index(self, project_id: str) -> bool:
+        """Check whether a complete index is stored for a project."""
+        return (self.project_dir(project_id) / self.MANIFEST_FILE).exists()
+
+    def load_manifest(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Load the manifest of a stored project index, if any."""
+        path = self.project_dir(project_id) / self.MANIFEST_FILE
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(
+        self, project_id: str, vector_store: "FAISS", manifest: Dict[str, Any]
+    ) -> None:
+        """Persist a project's vector store and manifest.
+
+        Args:
+            project_id: Project the index belongs to
+            vector_store: FAISS vector store to persist
+            manifest: Manifest describing the index inputs
+        """
+        project_dir = self.project_dir(project_id)
+        project_dir.mkdir(parents=True, exist_ok=True)
+
+        # Drop the old manifest first so a crash mid-save never leaves a
+        # manifest pointing at a half-written index
+        (project_dir / self.MANIFEST_FILE).unlink(missing_ok=True)
+
+        import faiss
+
+        from .vector_storage import ChunkWriter, convert_index
+
+        vector_store.index = convert_index(vector_store.index)
+        index_tmp = project_dir / f"{self.INDEX_FILE}.tmp"
+        faiss.write_index(vector_store.index, str(index_tmp))
+        os.replace(index_tmp, project_dir / self.INDEX_FILE)
+
+        # Chunks are written and indexed for BM25 in one pass, without a list of them
+        chunk_count = len(vector_store.index_to_docstore_id)
+        with ChunkWriter(
+            project_dir / self.CHUNKS_FILE, project_dir / self.OFFSETS_FILE
+        ) as writer:
+
+            def written_chunks():
+                for position in range(chunk_count):
+                    doc_id = vector_store.index_to_docstore_id[position]
+                    doc = vector_store.docstore.search(doc_id)
+                    yield writer.add(doc_id, doc.page_content, doc.metadata)
+
+            lexical_index = BM25Index.build(written_chunks())
+        lexical_index.save(str(project_dir / self.LEXICAL_FILE))
+
+        # A new ID per save ties the approximate index to this exact index
+        manifest = dict(manifest, chunk_count=chunk_count, index_id=uuid.uuid4().hex)
+        self._write_json(project_dir / self.MANIFEST_FILE, manifest)
+
+        from .ann_index import schedule_build
+
+        schedule_build(vector_store, project_dir / self.INDEX_FILE, manifest["index_id"])
+
+    def load(self, project_id: str, embeddings) -> Optional["FAISS"]:
+        """Load a project's stored vector store.
+
+        Args:
+            project_id: Project to load
+            embeddings: Embeddings used to embed queries against the index
+
+        Returns:
+            FAISS vector store or None if nothing usable is stored
+        """
+        manifest = self.load_manifest(project_id)
+        if not self.is_compatible(manifest):
+            return None
+
+        from .vector_storage import ChunkDocstore, read_index
+
+        project_dir = self.project_dir(project_id)
+        try:
+            index = read_index(project_dir / self.INDEX_FILE)
+            docstore = ChunkDocstore(
+                project_dir / self.CHUNKS_FILE, project_dir / self.OFFSETS_FILE
+            )
+        except (OSError, RuntimeError, ValueError):
+            return None
+
+        if index.ntotal != len(docstore.ids):
+            return None
+
+        from langchain_community.vectorstores import FAISS
+
+        index_to_docstore_id = dict(enumerate(docstore.ids))
+        vector_store = FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+        from .ann_index import load_saved
+
+        load_saved(vector_store, project_dir / self.INDEX_FILE, manifest.get("index_id"))
+        return vector_store
+
+    def load_lexical(self, project_id: str) -> Optional[BM25Index]:
+        """Load the BM25 keyword index of a project's stored chunks.
+
+        Args:
+            project_id: Project to load
+
+        Returns:
+            BM25 index or None if nothing usable is stored
+        """
+        if not self.is_compatible(self.load_manifest(project_id)):
+            return None
+        try:
+            return BM25Index.load(str(self.project_dir(project_id) / self.LEXICAL_FILE))
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def remove_file(
+        self, project_id: str, file_hash: str, vector_store: Optional["FAISS"] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Delete one file's vectors from a project index and save it.
+
+        Args:
+            project_id: Project to remove the file from
+            file_hash: SHA-256 of the file to remove
+            vector_store: Loaded project vector store, updated in place (optional)
+
+        Returns:
+            Updated manifest or None if the project has no stored index
+        """
+        manifest = self.load_manifest(project_id)
+        if manifest is None:
+            return None
+        if vector_store is None:
+            vector_store = self.load(project_id, None)
+            if vector_store is None:
+                return None
+
+        # Match vectors by ID prefix rather than the manifest's chunk count, so
+        # the in-memory store is cleaned up even if it has drifted from disk
+        prefix = f"{self.file_key(file_hash)}-"
+        ids = [
+            chunk_id
+            for chunk_id in vector_store.index_to_docstore_id.values()
+            if chunk_id.startswith(prefix)
+        ]
+        if ids:
+            from .vector_storage import ensure_writable
+
+            ensure_writable(vector_store)
+            vector_store.delete(ids)
+
+        remaining = [
+            file_entry
+            for file_entry in manifest.get("files", [])
+            if file_entry["sha256"] != file_hash
+        ]
+        manifest["files"] = remaining
+        self.save(project_id, vector_store, manifest)
+        return manifest
+
+    def delete(self, project_id: str) -> None:
+        """Remove a project's stored index, keeping its other files."""
+        project_dir = self.project_dir(project_id)
+        for name in (
+            self.MANIFEST_FILE,
+            self.INDEX_FILE,
+            self.CHUNKS_FILE,
+            self.OFFSETS_FILE,
+            self.LEXICAL_FILE,
+        ):
+            (project_dir / name).unlink(missing_ok=True)
+
+        from .ann_index import remove_saved
+
+        remove_saved(project_dir)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        """Atomically write a JSON file."""
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,319 @@
+"""Persistent full-text search index over the chatbot's knowledge base."""
+
+import bisect
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config.settings import settings
+from .lexical_index import TOKEN_PATTERN, tokenize
+
+# Topic words count as this many occurrences in the topic's text
+TOPIC_WEIGHT = 3
+
+# Score multipliers of terms found by prefix or by tolerating a typo
+PREFIX_WEIGHT = 0.7
+TYPO_WEIGHT = 0.5
+
+# Vocabulary terms a single query term may expand to by prefix
+MAX_PREFIX_EXPANSIONS = 20
+
+# Terms shorter than this are never treated as typos
+MIN_TYPO_LENGTH = 4
+
+# Journal entries after which loading rewrites the snapshot
+COMPACT_AFTER_ENTRIES = 1000
+
+
+def _deletions(term: str) -> Set[str]:
+    """Get every string one deleted character away from a term."""
+    return {term[:position] + term[position + 1 :] for position in range(len(term))}
+
+
+def _edit_distance(first: str, second: str, limit: int) -> int:
+    """Levenshtein distance of two terms, or limit + 1 if it exceeds limit."""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(
+                min(
+                    previous[column] + 1,
+                    current[column - 1] + 1,
+                    previous[column - 1] + (first_char != second_char),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class KnowledgeIndex:
+    """TF-IDF ranked search over knowledge-base topics with fuzzy matching.
+
+    Query terms match vocabulary terms exactly, as prefixes ("photo" finds
+    "photosynthesis") or with a one-character typo ("mitocondria"), with
+    lower weights for the fuzzy kinds. Typo candidates come from an index of
+    single-character deletions, so they are found without comparing
+    against the whole vocabulary.
+
+    The index is stored under the models directory as a snapshot plus an
+    append-only journal of topics added since. Nothing is read until the
+    first search, and topics can be added without loading the index.
+    """
+
+    SNAPSHOT_FILE = "knowledge_index.json"
+    JOURNAL_FILE = "knowledge_index.jsonl"
+    SNAPSHOT_VERSION = 1
+
+    def __init__(
+        self, base_dir: Optional[str] = None, seed: Optional[Dict[str, str]] = None
+    ):
+        self.base_dir = Path(base_dir or settings.MODELS_DIR)
+        self.seed = dict(seed or {})
+        self._loaded = False
+
+        self.topics: List[str] = []
+        self.texts: List[str] = []
+        self.doc_ids: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.vocabulary: List[str] = []
+        self._deletes: Optional[Dict[str, List[str]]] = None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.topics)
+
+    def items(self) -> Dict[str, str]:
+        """Get every topic and its text, including topics added by earlier runs."""
+        self._ensure_loaded()
+        return dict(zip(self.topics, self.texts))
+
+    def add(self, topic: str, information: str) -> None:
+        """Add or replace a topic and record it in the journal.
+
+        Args:
+            topic: Topic name
+            information: Topic text
+        """
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.base_dir / self.JOURNAL_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps([topic, information], ensure_ascii=False) + "\n")
+        if self._loaded:
+            self._index(topic, information)
+
+    def search(
+        self, query: str, limit: int = 10, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Rank topics against a query.
+
+        Args:
+            query: Search terms
+            limit: Number of results to return
+            offset: Number of best results to skip, for paging
+
+        Returns:
+            (total number of matching topics, results of the requested page),
+            each result a {"topic", "score", "snippet"} dict
+        """
+        self._ensure_loaded()
+        scores: Dict[int, float] = {}
+        matched_terms: Set[str] = set()
+        doc_count = len(self.topics)
+
+        for query_term in set(tokenize(query)):
+            best: Dict[int, float] = {}
+            for term, weight in self._expand(query_term):
+                matched_terms.add(term)
+                postings = self.postings[term]
+                idf = math.log(1 + doc_count / len(postings))
+                for doc_id, frequency in postings.items():
+                    score = weight * idf * (1 + math.log(frequency))
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+        results = [
+            {
+                "topic": self.topics[doc_id],
+                "score": round(score, 4),
+                "snippet": self._snippet(self.texts[doc_id], matched_terms),
+            }
+            for doc_id, score in ranked[offset:]
+        ]
+        return len(scores), results
+
+    def _expand(self, query_term: str) -> List[Tuple[str, float]]:
+        """Get the vocabulary terms a query term matches, with their weights."""
+        expansions = []
+        if query_term in self.postings:
+            expansions.append((query_term, 1.0))
+
+        start = bisect.bisect_left(self.vocabulary, query_term)
+        for term in self.vocabulary[start : start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(query_term):
+                break
+            if term != query_term:
+                expansions.append((term, PREFIX_WEIGHT))
+
+        if not expansions and len(query_term) >= MIN_TYPO_LENGTH:
+            deletes = self._get_deletes()
+            candidates: Set[str] = set(deletes.get(query_term, ()))
+            for variant in _deletions(query_term) | {query_term}:
+                candidates.update(deletes.get(variant, ()))
+                if variant in self.postings:
+                    candidates.add(variant)
+            expansions.extend(
+                (term, TYPO_WEIGHT)
+                for term in candidates
+                if _edit_distance(query_term, term, 1) <= 1
+            )
+        return expansions
+
+    def _get_deletes(self) -> Dict[str, List[str]]:
+        """Get the deletion index of the vocabulary, building it on first use."""
+        if self._deletes is None:
+            self._deletes = {}
+            for term in self.vocabulary:
+                self._add_deletes(term)
+        return self._deletes
+
+    def _add_deletes(self, term: str) -> None:
+        if len(term) < MIN_TYPO_LENGTH:
+            return
+        for variant in _deletions(term):
+            self._deletes.setdefault(variant, []).append(term)
+
+    @staticmethod
+    def _snippet(text: str, terms: Set[str]) -> str:
+        """Cut the part of a text around its first matched term, highlighted."""
+        matches = [
+            match for match in TOKEN_PATTERN.finditer(text) if match.group().lower() in terms
+        ]
+        width = settings.KB_SNIPPET_CHARS
+        start = max(0, matches[0].start() - width // 4) if matches else 0
+        if start:
+            # Start at a word boundary
+            start = text.rfind(" ", 0, start) + 1
+        end = min(len(text), start + width)
+
+        pieces, position = [], start
+        for match in matches:
+            if match.start() < start or match.end() > end:
+                continue
+            pieces.append(text[position : match.start()])
+            pieces.append(f"**{match.group()}**")
+            position = match.end()
+        pieces.append(text[position:end])
+
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if end < len(text) else ""
+        return prefix + "".join(pieces) + suffix
+
+    def _index(self, topic: str, information: str) -> None:
+        """Add or replace one topic in the in-memory index."""
+        doc_id = self.doc_ids.get(topic)
+        old_terms = ()
+        if doc_id is None:
+            doc_id = self.doc_ids[topic] = len(self.topics)
+            self.topics.append(topic)
+            self.texts.append(information)
+        else:
+            old_terms = self._term_counts(topic, self.texts[doc_id])
+            for term in old_terms:
+                self.postings[term].pop(doc_id, None)
+            self.texts[doc_id] = information
+
+        for term, count in self._term_counts(topic, information).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+                if self._deletes is not None:
+                    self._add_deletes(term)
+            postings[doc_id] = count
+
+        # Terms left without documents by a replacement stay out of results
+        for term in [term for term in old_terms if not self.postings[term]]:
+            del self.postings[term]
+            self.vocabulary.pop(bisect.bisect_left(self.vocabulary, term))
+            self._deletes = None
+
+    @staticmethod
+    def _term_counts(topic: str, information: str) -> Counter:
+        counts = Counter(tokenize(information))
+        for term in tokenize(topic):
+            counts[term] += TOPIC_WEIGHT
+        return counts
+
+    def _ensure_loaded(self) -> None:
+        """Read the snapshot and replay the journal on first use."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        snapshot_path = self.base_dir / self.SNAPSHOT_FILE
+        try:
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") == self.SNAPSHOT_VERSION:
+                self.topics = snapshot["topics"]
+                self.texts = snapshot["texts"]
+                self.doc_ids = {topic: doc_id for doc_id, topic in enumerate(self.topics)}
+                self.postings = {
+                    term: {doc_id: count for doc_id, count in postings}
+                    for term, postings in snapshot["postings"].items()
+                }
+                self.vocabulary = sorted(self.postings)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        journal = list(self._read_journal())
+        for topic, information in journal:
+            self._index(topic, information)
+        for topic, information in self.seed.items():
+            doc_id = self.doc_ids.get(topic)
+            if doc_id is None or self.texts[doc_id] != information:
+                self._index(topic, information)
+
+        if len(journal) >= COMPACT_AFTER_ENTRIES:
+            self._compact()
+
+    def _read_journal(self) -> Iterable[Tuple[str, str]]:
+        try:
+            with open(self.base_dir / self.JOURNAL_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        topic, information = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    yield topic, information
+        except OSError:
+            return
+
+    def _compact(self) -> None:
+        """Fold the journal into a new snapshot."""
+        snapshot = {
+            "version": self.SNAPSHOT_VERSION,
+            "topics": self.topics,
+            "texts": self.texts,
+            "postings": {
+                term: list(postings.items()) for term, postings in self.postings.items()
+            },
+        }
+        snapshot_path = self.base_dir / self.SNAPSHOT_FILE
+        tmp_path = snapshot_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, snapshot_path)
+        (self.base_dir / self.JOURNAL_FILE).unlink(missing_ok=True)
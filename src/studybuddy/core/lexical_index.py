@@ -0,0 +1,190 @@
+"""Compact BM25 inverted index for keyword retrieval over document chunks."""
+
+import heapq
+import json
+import math
+import os
+import re
+import struct
+from array import array
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from ..config.settings import settings
+
+# Dotted numbers ("3.2.1") are kept whole so section references match exactly
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index over chunks with BM25 ranking.
+
+    Postings are stored in compressed-sparse-row form: one array of document
+    numbers and one of term frequencies for all terms, plus an offsets array
+    marking where each term's postings start. That keeps memory at a few bytes
+    per posting, even for indexes of millions of chunks.
+    """
+
+    _HEADER = struct.Struct("<Q")
+
+    def __init__(
+        self,
+        doc_ids: List[str],
+        vocabulary: List[str],
+        offsets: array,
+        postings: array,
+        frequencies: array,
+        doc_lengths: array,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+    ):
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        self.term_ids = {term: term_id for term_id, term in enumerate(vocabulary)}
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.k1 = settings.BM25_K1 if k1 is None else k1
+        self.b = settings.BM25_B if b is None else b
+        self.avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, str]]) -> "BM25Index":
+        """Build an index from (chunk id, chunk text) pairs.
+
+        Args:
+            chunks: Chunks to index, in any order
+
+        Returns:
+            Built BM25 index
+        """
+        doc_ids: List[str] = []
+        doc_lengths = array("I")
+        term_ids: Dict[str, int] = {}
+        term_postings: List[array] = []
+        term_frequencies: List[array] = []
+
+        for doc_number, (chunk_id, text) in enumerate(chunks):
+            terms = tokenize(text)
+            doc_ids.append(chunk_id)
+            doc_lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(term_postings)
+                    term_postings.append(array("I"))
+                    term_frequencies.append(array("H"))
+                term_postings[term_id].append(doc_number)
+                term_frequencies[term_id].append(min(count, 0xFFFF))
+
+        offsets = array("Q", [0])
+        postings = array("I")
+        frequencies = array("H")
+        for term_id in range(len(term_postings)):
+            postings.extend(term_postings[term_id])
+            frequencies.extend(term_frequencies[term_id])
+            offsets.append(len(postings))
+
+        vocabulary = [""] * len(term_ids)
+        for term, term_id in term_ids.items():
+            vocabulary[term_id] = term
+        return cls(doc_ids, vocabulary, offsets, postings, frequencies, doc_lengths)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(
+        self, query: str, k: int = 4, doc_numbers: Optional[Collection[int]] = None
+    ) -> List[Tuple[str, float]]:
+        """Rank chunks against a query.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            doc_numbers: Only score the chunks at these positions of doc_ids;
+                others are skipped before scoring (optional)
+
+        Returns:
+            (chunk id, BM25 score) pairs, best first
+        """
+        doc_count = len(self.doc_ids)
+        if not doc_count or (doc_numbers is not None and not doc_numbers):
+            return []
+
+        scores: Dict[int, float] = {}
+        k1, b, avg_length = self.k1, self.b, self.avg_doc_length or 1.0
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            doc_freq = end - start
+            idf = math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            for position in range(start, end):
+                doc_number = self.postings[position]
+                if doc_numbers is not None and doc_number not in doc_numbers:
+                    continue
+                tf = self.frequencies[position]
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_number] / avg_length)
+                scores[doc_number] = scores.get(doc_number, 0.0) + idf * tf * (
+                    k1 + 1
+                ) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc_number], score) for doc_number, score in best]
+
+    def save(self, path: str) -> None:
+        """Write the index to a single binary file."""
+        header = json.dumps(
+            {
+                "doc_ids": self.doc_ids,
+                "vocabulary": self.vocabulary,
+                "k1": self.k1,
+                "b": self.b,
+                "postings": len(self.postings),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._HEADER.pack(len(header)))
+            f.write(header)
+            self.offsets.tofile(f)
+            self.postings.tofile(f)
+            self.frequencies.tofile(f)
+            self.doc_lengths.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Read an index written by save()."""
+        with open(path, "rb") as f:
+            (header_length,) = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+
+            offsets = array("Q")
+            offsets.fromfile(f, len(header["vocabulary"]) + 1)
+            postings = array("I")
+            postings.fromfile(f, header["postings"])
+            frequencies = array("H")
+            frequencies.fromfile(f, header["postings"])
+            doc_lengths = array("I")
+            doc_lengths.fromfile(f, len(header["doc_ids"]))
+
+        return cls(
+            header["doc_ids"],
+            header["vocabulary"],
+            offsets,
+            postings,
+            frequencies,
+            doc_lengths,
+            k1=header["k1"],
+            b=header["b"],
+        )
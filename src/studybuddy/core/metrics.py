@@ -0,0 +1,311 @@
+"""In-process tracing and metrics for StudyBuddy.
+
+A Trace times one operation, such as ingesting uploads or answering a
+question, broken down into stages ("extract", "split", "embed", ...). A
+stage may be entered many times and stages may nest; a nested stage's time
+is not counted to the stage around it, so streamed pipelines, where pages
+are extracted while the splitter pulls them, still get each stage's own
+time. Stages also add up counts such as pages, bytes, chunks, tokens and
+cache hits.
+
+Finished traces are recorded in a process-wide MetricsRegistry, which
+keeps histograms and counters for Prometheus and the most recent traces
+for JSON lines export. Code deep inside an operation reports to the
+current trace through the module functions stage, count and timed, which
+do nothing when no trace is active. The module only needs the standard
+library, so instrumented code and the debug panel can use it without
+slowing the app's cold start.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..config.settings import settings
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: Optional["MetricsRegistry"] = None
+_registry_lock = threading.Lock()
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("studybuddy_trace", default=None)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Trace:
+    """Timings and counts of one operation, broken down by stage."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.attributes: Dict[str, Any] = {}
+        self._start = time.perf_counter()
+        # [stage, time its clock last started] of the stages being timed
+        self._stack: List[list] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator["Trace"]:
+        """Time a block as part of a stage, pausing the enclosing stage."""
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.record(parent[0], now - parent[1], calls=0)
+        entry = [name, now]
+        self._stack.append(entry)
+        try:
+            yield self
+        finally:
+            now = time.perf_counter()
+            self._stack.pop()
+            self.record(name, now - entry[1])
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def record(self, stage: str, seconds: float, calls: int = 1, **counts: float):
+        """Add time measured elsewhere, such as in a callback, to a stage."""
+        values = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+        values["seconds"] += seconds
+        values["calls"] += calls
+        self.count(stage, **counts)
+
+    def count(self, stage: str, **counts: float):
+        """Add counts, such as pages or tokens, to a stage."""
+        values = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+        for key, value in counts.items():
+            values[key] = values.get(key, 0) + value
+
+    def timed(self, iterable: Iterable, stage: str) -> Iterator:
+        """Iterate, counting the time spent producing each item to a stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def set(self, **attributes: Any):
+        """Attach descriptive attributes, such as file or cache status."""
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Stop the operation's clock."""
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the trace as a JSON-serializable dictionary."""
+        return {
+            "operation": self.operation,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "stages": {
+                stage: {
+                    "ms": round(values["seconds"] * 1000, 3),
+                    **{key: value for key, value in values.items() if key != "seconds"},
+                }
+                for stage, values in self.stages.items()
+            },
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe histograms, counters and recent traces of a process."""
+
+    def __init__(self, max_traces: Optional[int] = None, log_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelSet, list]] = {}
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self.traces: deque = deque(maxlen=max_traces or settings.METRICS_MAX_TRACES)
+        self.log_path = log_path if log_path is not None else settings.METRICS_LOG_PATH
+
+    def observe(self, name: str, value: float, **labels: str):
+        """Add an observation in seconds to a histogram."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            buckets = series.setdefault(key, [0] * len(LATENCY_BUCKETS) + [0, 0.0])
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[position] += 1
+            buckets[-2] += 1
+            buckets[-1] += value
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        """Add to a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def record(self, trace: Trace):
+        """Record a finished trace in the histograms, counters and trace log."""
+        operation = trace.operation
+        self.observe("studybuddy_operation_seconds", trace.duration or 0.0, operation=operation)
+        if trace.error:
+            self.increment("studybuddy_operation_errors_total", operation=operation)
+        for stage, values in trace.stages.items():
+            self.observe(
+                "studybuddy_stage_seconds", values["seconds"], operation=operation, stage=stage
+            )
+            for key, value in values.items():
+                if key not in ("seconds", "calls"):
+                    self.increment(
+                        f"studybuddy_stage_{key}_total", value, operation=operation, stage=stage
+                    )
+
+        with self._lock:
+            self.traces.append(trace)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+            except OSError:
+                # Metrics must never break the operation they describe
+                pass
+
+    def last_traces(self) -> Dict[str, Dict[str, Any]]:
+        """Get the most recent trace of each operation."""
+        with self._lock:
+            traces = list(self.traces)
+        return {trace.operation: trace.to_dict() for trace in traces}
+
+    def to_prometheus(self) -> str:
+        """Export the histograms and counters in the Prometheus text format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, buckets in sorted(series.items()):
+                    for bound, count in zip(LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{_labels(labels, le=str(bound))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {buckets[-2]}")
+                    lines.append(f"{name}_count{_labels(labels)} {buckets[-2]}")
+                    lines.append(f"{name}_sum{_labels(labels)} {buckets[-1]:.6f}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self) -> str:
+        """Export the recent traces as JSON lines, oldest first."""
+        with self._lock:
+            traces = list(self.traces)
+        return "".join(json.dumps(trace.to_dict(), default=str) + "\n" for trace in traces)
+
+    def reset(self):
+        """Forget all metrics and traces."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.traces.clear()
+
+
+def _labels(labels: LabelSet, **extra: str) -> str:
+    """Format Prometheus labels, escaping their values."""
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the metrics registry shared by every session of this process.
+
+    Kept in a module global rather than st.cache_resource, so operations
+    traced outside a Streamlit run, such as in benchmarks, are recorded too.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the operation running in this context, if any."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(operation: str, registry: Optional[MetricsRegistry] = None) -> Iterator[Trace]:
+    """Trace an operation, making it current for the code it wraps.
+
+    Args:
+        operation: Name of the operation, such as "ingest"
+        registry: Registry to record the trace in, the shared one by default
+
+    Yields:
+        The operation's trace
+    """
+    operation_trace = Trace(operation)
+    token = _current_trace.set(operation_trace)
+    error = None
+    try:
+        yield operation_trace
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_trace.reset(token)
+        operation_trace.finish(error)
+        (registry or get_metrics()).record(operation_trace)
+
+
+def traced(operation: str) -> Callable:
+    """Decorate a function to trace each of its calls as an operation."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace(operation):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Optional[Trace]]:
+    """Time a block as a stage of the current trace, if there is one."""
+    operation_trace = _current_trace.get()
+    if operation_trace is None:
+        yield None
+        return
+    with operation_trace.stage(name):
+        yield operation_trace
+
+
+def count(stage_name: str, **counts: float):
+    """Add counts to a stage of the current trace, if there is one."""
+    operation_trace = _current_trace.get()
+    if operation_trace is not None:
+        operation_trace.count(stage_name, **counts)
+
+
+def timed(iterable: Iterable, stage_name: str) -> Iterable:
+    """Time producing each item as a stage of the current trace, if there is one."""
+    operation_trace = _current_trace.get()
+    if operation_trace is None:
+        return iterable
+    return operation_trace.timed(iterable, stage_name)
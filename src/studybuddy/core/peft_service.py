@@ -2,11 +2,14 @@
 
 import os
 import json
-from typing import List, Dict, Optional, Any
+import threading
+from typing import List, Dict, Optional, Any, Tuple
 import streamlit as st
 from pathlib import Path
 
 from ..config.settings import settings
+from .knowledge_index import KnowledgeIndex
+from .topic_matcher import TopicMatcher
 
 
 class ChatbotService:
@@ -14,7 +17,33 @@ class ChatbotService:
 
     def __init__(self):
         self.is_initialized = True
-        self.knowledge_base = self._get_knowledge_base()
+        # The service is shared by all sessions; guards the knowledge base
+        self._lock = threading.RLock()
+        # The search index is the one store of topics, read from disk on first
+        # use; the topic lookup and matcher are derived from it then
+        self.search_index = KnowledgeIndex(seed=self._get_knowledge_base())
+        self._knowledge_base: Optional[Dict[str, str]] = None
+        self._topic_matcher: Optional[TopicMatcher] = None
+
+    @property
+    def knowledge_base(self) -> Dict[str, str]:
+        """Topics and their information, including topics added by earlier runs."""
+        self._ensure_loaded()
+        return self._knowledge_base
+
+    @property
+    def topic_matcher(self) -> TopicMatcher:
+        """Matcher of questions against the knowledge base topics."""
+        self._ensure_loaded()
+        return self._topic_matcher
+
+    def _ensure_loaded(self) -> None:
+        """Derive the topic lookup and matcher from the search index once."""
+        with self._lock:
+            if self._knowledge_base is None:
+                knowledge_base = self.search_index.items()
+                self._topic_matcher = TopicMatcher(knowledge_base)
+                self._knowledge_base = knowledge_base
 
     def _get_knowledge_base(self) -> Dict[str, str]:
         """Get basic knowledge base for common study topics."""
@@ -32,11 +61,11 @@ class ChatbotService:
             query_lower = query.lower()
 
             # Check if query matches known topics
-            for topic, info in self.knowledge_base.items():
-                if topic in query_lower or any(
-                    word in query_lower for word in topic.split()
-                ):
-                    return f"Here's what I know about {topic}:\n\n{info}\n\nIs there anything specific about this topic you'd like me to explain further?"
+            with self._lock:
+                topic = self.topic_matcher.match(query_lower)
+                info = self.knowledge_base.get(topic)
+            if topic:
+                return f"Here's what I know about {topic}:\n\n{info}\n\nIs there anything specific about this topic you'd like me to explain further?"
 
             # If context is provided, use it to answer
             if context:
@@ -91,24 +120,46 @@ Is there anything else I can assist you with?"""
 
     def get_available_topics(self) -> List[str]:
         """Get list of topics in the knowledge base."""
-        return list(self.knowledge_base.keys())
+        with self._lock:
+            return list(self.knowledge_base.keys())
 
     def add_to_knowledge_base(self, topic: str, information: str) -> bool:
         """Add new information to the knowledge base."""
         try:
-            self.knowledge_base[topic.lower()] = information
+            with self._lock:
+                self.knowledge_base[topic.lower()] = information
+                self.topic_matcher.add(topic.lower())
+                self.search_index.add(topic.lower(), information)
             return True
         except Exception as e:
             st.error(f"Error adding to knowledge base: {str(e)}")
             return False
 
-    def search_knowledge_base(self, search_term: str) -> List[str]:
-        """Search for topics containing the search term."""
-        search_term_lower = search_term.lower()
-        matching_topics = []
-
-        for topic, info in self.knowledge_base.items():
-            if search_term_lower in topic or search_term_lower in info.lower():
-                matching_topics.append(topic)
+    def search_knowledge_base(
+        self, search_term: str, limit: Optional[int] = None, offset: int = 0
+    ) -> List[str]:
+        """Search for topics matching the search term, best first."""
+        return [
+            result["topic"]
+            for result in self.search_knowledge_base_ranked(
+                search_term, limit=limit, offset=offset
+            )[1]
+        ]
 
-        return matching_topics
+    def search_knowledge_base_ranked(
+        self, search_term: str, limit: Optional[int] = None, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Search the knowledge base with ranking and highlighted snippets.
+
+        Args:
+            search_term: Search terms; prefixes and small typos also match
+            limit: Maximum number of results (all if None)
+            offset: Number of best results to skip
+
+        Returns:
+            (total number of matches, list of {"topic", "score", "snippet"})
+        """
+        with self._lock:
+            if limit is None:
+                limit = len(self.search_index)
+            return self.search_index.search(search_term, limit=limit, offset=offset)
@@ -1,27 +1,54 @@
 """Project manager for handling multiple subjects/projects in StudyBuddy."""
 
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 import streamlit as st
 from datetime import datetime
 import uuid
 
 from ..config.settings import settings
+from .index_store import IndexStore
+from .project_store import ProjectStore
+
+# Session state of the current project that is too heavy to store on disk
+# as is; it is rebuilt from the saved index when a project is reopened
+RESIDENT_KEYS = ("conversation", "vector_store", "index_version", "documents_processed")
+
+# URL query parameter holding the session's current project ID
+PROJECT_QUERY_PARAM = "project"
 
 
 class ProjectManager:
-    """Manages multiple projects/subjects for students."""
+    """Manages multiple projects/subjects for students.
+
+    Projects are stored on disk by a ProjectStore, so they outlive the
+    session. The session only holds the current project's files, chat
+    history, vector store and conversation; those of projects switched away
+    from are kept resident up to settings.MAX_RESIDENT_PROJECTS and then
+    evicted, to be reloaded from disk when the project is opened again.
+    """
 
     def __init__(self):
-        self.initialize_projects_session_state()
+        self.index_store = IndexStore()
+        self.store = ProjectStore()
+        # Failed or interrupted uploads leave blobs and derived artifacts
+        # behind. Processing writes artifacts before the file is stored, so
+        # indexed files and anything changed recently are kept.
+        self.store.collect_garbage(
+            keep=self.index_store.indexed_hashes(),
+            min_age_seconds=settings.BLOB_GC_MIN_AGE_SECONDS,
+        )
 
     def initialize_projects_session_state(self):
         """Initialize project-related session state variables."""
-        if "projects" not in st.session_state:
-            st.session_state.projects = {}
         if "current_project_id" not in st.session_state:
             st.session_state.current_project_id = None
         if "project_selector_key" not in st.session_state:
             st.session_state.project_selector_key = 0
+        if "resident_projects" not in st.session_state:
+            st.session_state.resident_projects = OrderedDict()
+        if "saved_message_count" not in st.session_state:
+            st.session_state.saved_message_count = 0
 
     def create_project(
         self, name: str, emoji: str = None, description: str = ""
@@ -41,30 +68,49 @@ class ProjectManager:
         if not emoji:
             emoji = settings.DEFAULT_PROJECT_EMOJI
 
-        project = {
-            "id": project_id,
-            "name": name,
-            "emoji": emoji,
-            "description": description,
-            "created_at": datetime.now().isoformat(),
-            "document_count": 0,
-            "uploaded_files": [],  # Store uploaded PDF files
-            "file_names": [],  # Store file names for display
-            "conversation": None,
-            "chat_history": None,
-            "vector_store": None,
-        }
-
-        st.session_state.projects[project_id] = project
+        self.store.create_project(
+            {
+                "id": project_id,
+                "name": name,
+                "emoji": emoji,
+                "description": description,
+                "created_at": datetime.now().isoformat(),
+                "document_count": 0,
+            }
+        )
         return project_id
 
     def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
         """Get project by ID."""
-        return st.session_state.projects.get(project_id)
+        return self.store.get_project(project_id)
 
     def get_all_projects(self) -> Dict[str, Dict[str, Any]]:
-        """Get all projects."""
-        return st.session_state.projects
+        """Get all projects.
+
+        Reads the whole catalog; use search_projects to list projects.
+        """
+        return {project["id"]: project for project in self.store.list_projects()}
+
+    def search_projects(
+        self, query: str = "", page: int = 0, page_size: Optional[int] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Get one page of projects, in name order.
+
+        Args:
+            query: Words the project name must contain as word prefixes (optional)
+            page: Zero-based page number
+            page_size: Projects per page, settings.PROJECT_PAGE_SIZE by default
+
+        Returns:
+            (number of matching projects, projects of the page)
+        """
+        page_size = page_size or settings.PROJECT_PAGE_SIZE
+        return self.store.search_projects(query, limit=page_size, offset=page * page_size)
+
+    @staticmethod
+    def get_display_name(project: Dict[str, Any]) -> str:
+        """Get the label a project is shown with."""
+        return f"{project['emoji']} {project['name']}"
 
     def delete_project(self, project_id: str) -> bool:
         """Delete a project.
@@ -75,27 +121,38 @@ class ProjectManager:
         Returns:
             True if deleted, False if not found
         """
-        if project_id in st.session_state.projects:
-            del st.session_state.projects[project_id]
+        if not self.store.delete_project(project_id):
+            return False
 
-            # If this was the current project, clear current project
-            if st.session_state.current_project_id == project_id:
-                st.session_state.current_project_id = None
-                self.clear_current_session_data()
+        self.index_store.delete(project_id)
+        st.session_state.resident_projects.pop(project_id, None)
 
-            return True
-        return False
+        # If this was the current project, clear current project
+        if st.session_state.current_project_id == project_id:
+            st.session_state.current_project_id = None
+            st.experimental_set_query_params()
+            self.clear_current_session_data()
+        return True
 
     def set_current_project(self, project_id: str):
-        """Set the current active project."""
-        if project_id in st.session_state.projects:
-            # Save current session data to the old project
-            if st.session_state.current_project_id:
-                self.save_session_to_project(st.session_state.current_project_id)
+        """Set the current active project.
+
+        The previous project is saved and its loaded index kept resident
+        until it is evicted; the new one is loaded from disk unless it is
+        still resident.
+        """
+        if not self.store.get_project(project_id):
+            return
 
-            # Switch to new project
-            st.session_state.current_project_id = project_id
-            self.load_project_to_session(project_id)
+        previous_id = st.session_state.current_project_id
+        if previous_id and previous_id != project_id:
+            self.save_session_to_project(previous_id)
+            self._keep_resident(previous_id)
+
+        # Switch to new project
+        st.session_state.current_project_id = project_id
+        st.experimental_set_query_params(**{PROJECT_QUERY_PARAM: project_id})
+        self.load_project_to_session(project_id)
 
     def get_current_project(self) -> Optional[Dict[str, Any]]:
         """Get the current active project."""
@@ -103,110 +160,231 @@ class ProjectManager:
             return self.get_project(st.session_state.current_project_id)
         return None
 
+    def get_session_project_id(self) -> Optional[str]:
+        """Get the project this browser session last had open, if it still exists.
+
+        The ID is kept in the page URL, so reloading the page reopens the
+        project while other sessions start from the project list.
+        """
+        project_ids = st.experimental_get_query_params().get(PROJECT_QUERY_PARAM, [])
+        if project_ids and self.store.get_project(project_ids[0]):
+            return project_ids[0]
+        return None
+
     def save_session_to_project(self, project_id: str):
-        """Save current session data to a project."""
-        if project_id in st.session_state.projects:
-            project = st.session_state.projects[project_id]
-            project["conversation"] = st.session_state.get("conversation")
-            project["chat_history"] = st.session_state.get("chat_history")
-            project["document_count"] = st.session_state.get("document_count", 0)
-            project["documents_processed"] = st.session_state.get(
-                "documents_processed", False
+        """Save current session data to a project.
+
+        Only chat messages added since the last save are written.
+        """
+        if st.session_state.current_project_id != project_id:
+            return
+
+        messages = st.session_state.get("chat_history") or []
+        saved_count = st.session_state.get("saved_message_count", 0)
+        pairs = [(message.type, message.content) for message in messages[saved_count:]]
+        if len(messages) >= saved_count:
+            if pairs:
+                self.store.append_messages(project_id, pairs, saved_count)
+        else:
+            # The history was replaced rather than extended
+            self.store.replace_messages(
+                project_id, [(message.type, message.content) for message in messages]
             )
-            project["uploaded_files"] = st.session_state.get("uploaded_files", [])
-            project["file_names"] = st.session_state.get("file_names", [])
-            project["last_updated"] = datetime.now().isoformat()
+        st.session_state.saved_message_count = len(messages)
+
+        self.store.update_project(
+            project_id,
+            document_count=st.session_state.get("document_count", 0),
+            last_updated=datetime.now().isoformat(),
+        )
 
     def load_project_to_session(self, project_id: str):
-        """Load project data to current session."""
-        if project_id in st.session_state.projects:
-            project = st.session_state.projects[project_id]
-            st.session_state.conversation = project.get("conversation")
-            st.session_state.chat_history = project.get("chat_history")
-            st.session_state.document_count = project.get("document_count", 0)
-            st.session_state.documents_processed = project.get(
-                "documents_processed", False
-            )
-            st.session_state.uploaded_files = project.get("uploaded_files", [])
-            st.session_state.file_names = project.get("file_names", [])
+        """Load project data to current session.
+
+        The project's conversation and vector store are only restored if it
+        is still resident; otherwise main.restore_project_index reloads
+        them from the saved index when the next question is asked.
+        """
+        project = self.store.get_project(project_id)
+        if not project:
+            return
+
+        resident = st.session_state.resident_projects.pop(project_id, {})
+        for key in RESIDENT_KEYS:
+            st.session_state[key] = resident.get(key)
+        st.session_state.documents_processed = bool(resident.get("documents_processed"))
+
+        conversation = resident.get("conversation")
+        if conversation is not None:
+            # The chain's memory holds the same messages as the store
+            chat_history = conversation.memory.chat_memory.messages
+        else:
+            chat_history = self._to_messages(self.store.get_messages(project_id))
+        st.session_state.chat_history = chat_history or None
+        st.session_state.saved_message_count = len(chat_history)
+        st.session_state.chat_window_turns = settings.CHAT_WINDOW_TURNS
+
+        files = self.store.list_files(project_id)
+        st.session_state.uploaded_files = files
+        st.session_state.file_names = [file["name"] for file in files]
+        st.session_state.document_count = project["document_count"]
 
     def clear_current_session_data(self):
         """Clear current session data."""
         st.session_state.conversation = None
         st.session_state.chat_history = None
+        st.session_state.vector_store = None
+        st.session_state.index_version = None
         st.session_state.document_count = 0
         st.session_state.documents_processed = False
         st.session_state.uploaded_files = []
         st.session_state.file_names = []
+        st.session_state.saved_message_count = 0
 
     def clear_project_data(self, project_id: str):
         """Clear all data for a specific project."""
-        if project_id in st.session_state.projects:
-            project = st.session_state.projects[project_id]
-            project["conversation"] = None
-            project["chat_history"] = None
-            project["document_count"] = 0
-            project["documents_processed"] = False
-            project["vector_store"] = None
-            project["uploaded_files"] = []
-            project["file_names"] = []
-
-            # If this is the current project, also clear session
-            if st.session_state.current_project_id == project_id:
-                self.clear_current_session_data()
+        if not self.store.get_project(project_id):
+            return
+
+        self.store.clear_project(project_id)
+        self.index_store.delete(project_id)
+        st.session_state.resident_projects.pop(project_id, None)
+
+        # If this is the current project, also clear session
+        if st.session_state.current_project_id == project_id:
+            self.clear_current_session_data()
 
     def save_files_to_project(self, project_id: str, pdf_files, file_names):
-        """Save uploaded files to a specific project."""
-        if project_id in st.session_state.projects:
-            project = st.session_state.projects[project_id]
-            project["uploaded_files"] = pdf_files
-            project["file_names"] = file_names
-            project["document_count"] = len(pdf_files)
-
-            # Also update session state if this is the current project
-            if st.session_state.current_project_id == project_id:
-                st.session_state.uploaded_files = pdf_files
-                st.session_state.file_names = file_names
-                st.session_state.document_count = len(pdf_files)
+        """Add uploaded files to a specific project.
+
+        Files are listed by content hash, as in the project index: contents
+        already listed are not added twice, and a changed file uploaded
+        under a listed name is kept as another document.
+        """
+        if not self.store.get_project(project_id):
+            return
+        for pdf, name in zip(pdf_files, file_names):
+            self.store.add_file(project_id, name, pdf.getvalue())
+        self._sync_project_files(project_id)
+
+    def remove_file_from_project(self, project_id: str, file_hash: str) -> bool:
+        """Remove one document and only its vectors from a project.
+
+        Args:
+            project_id: Project to remove the document from
+            file_hash: SHA-256 of the document, as listed by get_project_documents
+
+        Returns:
+            True if removed, False if the project or document was not found
+        """
+        if not self.store.get_project(project_id):
+            return False
+
+        removed = [
+            doc for doc in self.get_project_documents(project_id)
+            if doc["sha256"] == file_hash
+        ]
+        if not removed:
+            return False
+
+        is_current = st.session_state.current_project_id == project_id
+        resident = st.session_state.resident_projects.get(project_id, {})
+        vector_store = (
+            st.session_state.get("vector_store") if is_current
+            else resident.get("vector_store")
+        )
+        manifest = self.index_store.remove_file(project_id, file_hash, vector_store)
+        if manifest is None:
+            return False
+
+        if not manifest["files"]:
+            # Nothing left to search, so drop the empty index and its chain
+            self.index_store.delete(project_id)
+            st.session_state.resident_projects.pop(project_id, None)
+            if is_current:
+                st.session_state.vector_store = None
+                st.session_state.conversation = None
+                st.session_state.documents_processed = False
+
+        self.store.remove_files(project_id, [file_hash])
+        self._sync_project_files(project_id)
+        return True
+
+    def get_project_documents(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get the indexed documents of a project.
+
+        Returns:
+            List of {"name", "sha256", "chunk_count"} dictionaries
+        """
+        manifest = self.index_store.load_manifest(project_id)
+        if not self.index_store.is_compatible(manifest):
+            return []
+        return manifest.get("files", [])
+
+    def _sync_project_files(self, project_id: str):
+        """Update a project's document count and mirror its files into the session."""
+        files = self.store.list_files(project_id)
+        self.store.update_project(
+            project_id,
+            document_count=len(files),
+            last_updated=datetime.now().isoformat(),
+        )
+
+        # Also update session state if this is the current project
+        if st.session_state.current_project_id == project_id:
+            st.session_state.uploaded_files = files
+            st.session_state.file_names = [file["name"] for file in files]
+            st.session_state.document_count = len(files)
 
     def get_project_files(self, project_id: str):
-        """Get uploaded files for a specific project."""
-        if project_id in st.session_state.projects:
-            project = st.session_state.projects[project_id]
-            return project.get("uploaded_files", []), project.get("file_names", [])
-        return [], []
-
-    def get_project_list_for_selectbox(self) -> List[str]:
-        """Get formatted project list for selectbox."""
-        projects = []
-        for project_id, project in st.session_state.projects.items():
-            display_name = f"{project['emoji']} {project['name']}"
-            projects.append(display_name)
-        return projects
-
-    def get_project_id_from_display_name(self, display_name: str) -> Optional[str]:
-        """Get project ID from display name."""
-        for project_id, project in st.session_state.projects.items():
-            project_display = f"{project['emoji']} {project['name']}"
-            if project_display == display_name:
-                return project_id
-        return None
+        """Get the stored files of a specific project.
+
+        Returns:
+            (list of {"name", "sha256", "size", "path"} dictionaries, file names)
+        """
+        files = self.store.list_files(project_id)
+        return files, [file["name"] for file in files]
+
+    def _keep_resident(self, project_id: str):
+        """Keep the session's loaded objects of a project, evicting idle ones.
+
+        The least recently used projects are dropped once more than
+        settings.MAX_RESIDENT_PROJECTS (the current one included) are loaded.
+        """
+        resident_projects = st.session_state.resident_projects
+        if st.session_state.get("conversation") is not None:
+            resident_projects[project_id] = {
+                key: st.session_state.get(key) for key in RESIDENT_KEYS
+            }
+            resident_projects.move_to_end(project_id)
+        while len(resident_projects) > max(0, settings.MAX_RESIDENT_PROJECTS - 1):
+            resident_projects.popitem(last=False)
+
+    @staticmethod
+    def _to_messages(pairs: List[Tuple[str, str]]) -> list:
+        """Turn stored (role, content) pairs back into chat messages."""
+        if not pairs:
+            return []
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        return [
+            HumanMessage(content=content) if role == "human" else AIMessage(content=content)
+            for role, content in pairs
+        ]
 
     def get_projects_summary(self) -> Dict[str, int]:
-        """Get summary statistics for all projects."""
-        total_projects = len(st.session_state.projects)
-        total_documents = sum(
-            project.get("document_count", 0)
-            for project in st.session_state.projects.values()
-        )
-        active_projects = sum(
-            1
-            for project in st.session_state.projects.values()
-            if project.get("conversation") is not None
+        """Get summary statistics for all projects.
+
+        Totals come from counters the store keeps up to date; active
+        projects are those with a loaded conversation in this session.
+        """
+        stats = self.store.get_stats()
+        active_projects = len(st.session_state.get("resident_projects", {})) + (
+            st.session_state.get("conversation") is not None
         )
 
         return {
-            "total_projects": total_projects,
-            "total_documents": total_documents,
+            "total_projects": stats["total_projects"],
+            "total_documents": stats["total_documents"],
             "active_projects": active_projects,
         }
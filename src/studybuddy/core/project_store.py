@@ -0,0 +1,480 @@
+"""Persistent storage of projects, their uploaded files and chat history."""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config.settings import settings
+from .blob_store import BlobStore
+from .lexical_index import tokenize
+
+# Project columns that can be changed after creation
+PROJECT_FIELDS = ("name", "emoji", "description", "last_updated", "document_count")
+
+# Catalog counters kept up to date with every change
+STATS_KEYS = ("total_projects", "total_documents")
+
+
+class ProjectStore:
+    """SQLite-backed repository of projects, shared by all sessions.
+
+    Project metadata, the list of uploaded files and the chat history live
+    in models/projects.sqlite3, so a project can be loaded by any later
+    session. Uploaded files are kept in a content-addressed BlobStore and
+    referenced by hash; the store counts the references to each blob and
+    deletes a blob once no project lists it anymore.
+
+    The catalog scales to thousands of projects: projects are looked up by
+    ID, listed a page at a time in name order, searched through an index of
+    their name words by prefix, and counted by counters that every change
+    updates, so no operation scans all projects.
+    """
+
+    def __init__(self, path: Optional[str] = None, blob_store: Optional[BlobStore] = None):
+        self.path = path or settings.PROJECTS_DB_PATH
+        self.blob_store = blob_store or BlobStore()
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS projects (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                emoji TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL,
+                last_updated TEXT NOT NULL,
+                document_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS projects_name
+                ON projects (name COLLATE NOCASE, id);
+            CREATE TABLE IF NOT EXISTS project_terms (
+                term TEXT NOT NULL,
+                project_id TEXT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+                PRIMARY KEY (term, project_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS project_terms_project
+                ON project_terms (project_id);
+            CREATE TABLE IF NOT EXISTS catalog_stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS project_files (
+                project_id TEXT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+                name TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (project_id, sha256)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                project_id TEXT NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (project_id, position)
+            );
+            """
+        )
+        self._conn.commit()
+        if self._conn.execute("SELECT COUNT(*) FROM catalog_stats").fetchone()[0] == 0:
+            self._rebuild_catalog()
+
+    def create_project(self, project: Dict[str, Any]) -> None:
+        """Insert a new project.
+
+        Args:
+            project: Dictionary with id, name, emoji, description and created_at
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO projects "
+                "(id, name, emoji, description, created_at, last_updated, document_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    project["id"],
+                    project["name"],
+                    project["emoji"],
+                    project.get("description", ""),
+                    project["created_at"],
+                    project.get("last_updated", project["created_at"]),
+                    project.get("document_count", 0),
+                ),
+            )
+            self._index_name(project["id"], project["name"])
+            self._bump(total_projects=1, total_documents=project.get("document_count", 0))
+
+    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Get a project's metadata, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM projects WHERE id = ?", (project_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_projects(self) -> List[Dict[str, Any]]:
+        """Get the metadata of all projects, oldest first.
+
+        Reads the whole catalog; use search_projects to show projects.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM projects ORDER BY created_at, id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search_projects(
+        self, query: str = "", limit: int = 20, offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Get one page of the projects whose name matches a search, by name.
+
+        Every word of the query must be the start of a word of the name, so
+        "bio lab" finds "Biology Lab Reports".
+
+        Args:
+            query: Search words; an empty query lists all projects
+            limit: Page size
+            offset: Number of matching projects to skip
+
+        Returns:
+            (number of matching projects, projects of the requested page)
+        """
+        terms = sorted(set(tokenize(query)))
+        where = " AND ".join(
+            "id IN (SELECT project_id FROM project_terms WHERE term >= ? AND term < ?)"
+            for _ in terms
+        ) or "1"
+        parameters = [bound for term in terms for bound in (term, term + "\uffff")]
+        with self._lock:
+            if terms:
+                total = self._conn.execute(
+                    f"SELECT COUNT(*) FROM projects WHERE {where}", parameters
+                ).fetchone()[0]
+            else:
+                total = self._get_stat("total_projects")
+            rows = self._conn.execute(
+                f"SELECT * FROM projects WHERE {where} "
+                f"ORDER BY name COLLATE NOCASE, id LIMIT ? OFFSET ?",
+                (*parameters, limit, offset),
+            ).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the catalog counters (total_projects, total_documents)."""
+        with self._lock:
+            return {key: self._get_stat(key) for key in STATS_KEYS}
+
+    def update_project(self, project_id: str, **fields: Any) -> None:
+        """Change some of a project's metadata.
+
+        Args:
+            project_id: Project to update
+            **fields: New values, keyed by column name
+        """
+        unknown = set(fields) - set(PROJECT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown project fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            if "document_count" in fields:
+                self._bump_document_count(project_id, fields["document_count"])
+            updated = self._conn.execute(
+                f"UPDATE projects SET {assignments} WHERE id = ?",
+                (*fields.values(), project_id),
+            ).rowcount
+            if updated and "name" in fields:
+                self._index_name(project_id, fields["name"])
+
+    def delete_project(self, project_id: str) -> bool:
+        """Delete a project with its files and chat history.
+
+        Blobs no other project references are deleted too.
+
+        Returns:
+            True if deleted, False if not found
+        """
+        with self._lock:
+            with self._conn:
+                released = self._release_files(
+                    "SELECT sha256 FROM project_files WHERE project_id = ?", (project_id,)
+                )
+                self._bump_document_count(project_id, 0)
+                deleted = self._conn.execute(
+                    "DELETE FROM projects WHERE id = ?", (project_id,)
+                ).rowcount
+                self._bump(total_projects=-deleted)
+            self._delete_blobs(released)
+        return bool(deleted)
+
+    def add_file(self, project_id: str, name: str, data: bytes) -> Optional[str]:
+        """Store an uploaded file in a project.
+
+        The contents are stored once however many projects list them. Files
+        are listed by content, like the project index: contents already
+        listed in the project are not added again, while a changed file
+        uploaded under a listed name is listed next to the old one.
+
+        Args:
+            project_id: Project to add the file to
+            name: File name shown to the user
+            data: File contents
+
+        Returns:
+            SHA-256 of the stored contents, or None if they were already listed
+        """
+        with self._lock:
+            # Listed contents are stored already, so this writes nothing for them
+            file_hash = self.blob_store.put(data)
+            if self._conn.execute(
+                "SELECT 1 FROM project_files WHERE project_id = ? AND sha256 = ?",
+                (project_id, file_hash),
+            ).fetchone():
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO project_files (project_id, name, sha256, size, position) "
+                    "SELECT ?, ?, ?, ?, COALESCE(MAX(position) + 1, 0) "
+                    "FROM project_files WHERE project_id = ?",
+                    (project_id, name, file_hash, len(data), project_id),
+                )
+                self._conn.execute(
+                    "INSERT INTO blobs (sha256, size, refcount) VALUES (?, ?, 1) "
+                    "ON CONFLICT (sha256) DO UPDATE SET refcount = refcount + 1",
+                    (file_hash, len(data)),
+                )
+        return file_hash
+
+    def remove_files(self, project_id: str, file_hashes: List[str]) -> None:
+        """Remove files from a project by content hash, deleting unreferenced blobs."""
+        if not file_hashes:
+            return
+        with self._lock:
+            with self._conn:
+                released = self._release_files(
+                    f"SELECT sha256 FROM project_files WHERE project_id = ? "
+                    f"AND sha256 IN ({', '.join('?' * len(file_hashes))})",
+                    (project_id, *file_hashes),
+                )
+                self._conn.executemany(
+                    "DELETE FROM project_files WHERE project_id = ? AND sha256 = ?",
+                    [(project_id, file_hash) for file_hash in file_hashes],
+                )
+            self._delete_blobs(released)
+
+    def list_files(self, project_id: str) -> List[Dict[str, Any]]:
+        """Get a project's uploaded files in upload order.
+
+        Returns:
+            List of {"name", "sha256", "size", "path"} dictionaries
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, sha256, size FROM project_files "
+                "WHERE project_id = ? ORDER BY position",
+                (project_id,),
+            ).fetchall()
+        return [
+            {**dict(row), "path": str(self.blob_store.path(row["sha256"]))} for row in rows
+        ]
+
+    def get_refcount(self, file_hash: str) -> int:
+        """Get the number of project files referencing a blob."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT refcount FROM blobs WHERE sha256 = ?", (file_hash,)
+            ).fetchone()
+        return row["refcount"] if row else 0
+
+    def collect_garbage(self, keep: Iterable[str] = (), min_age_seconds: float = 0) -> int:
+        """Delete stored blobs that no project references.
+
+        Blobs are normally deleted as soon as their last reference goes;
+        this also catches blobs and derived artifacts left behind by an
+        interrupted upload.
+
+        Args:
+            keep: Hashes in use elsewhere, such as those of indexed files
+            min_age_seconds: Blobs and artifacts changed more recently are
+                kept, as their upload may still be running
+
+        Returns:
+            Number of blobs deleted
+        """
+        with self._lock:
+            referenced = {
+                row["sha256"]
+                for row in self._conn.execute("SELECT sha256 FROM blobs WHERE refcount > 0")
+            }
+            referenced.update(keep)
+            unreferenced = [
+                file_hash
+                for file_hash in self.blob_store.stored_hashes(min_age_seconds)
+                if file_hash not in referenced
+            ]
+            with self._conn:
+                self._conn.execute("DELETE FROM blobs WHERE refcount <= 0")
+            self._delete_blobs(unreferenced)
+        return len(unreferenced)
+
+    def _release_files(self, query: str, parameters: Iterable[Any]) -> List[str]:
+        """Drop one reference per selected project file from its blob.
+
+        Must be called inside a transaction, before the rows are deleted.
+
+        Returns:
+            Hashes of the blobs left without references, whose rows are deleted
+        """
+        hashes = [row["sha256"] for row in self._conn.execute(query, tuple(parameters))]
+        if not hashes:
+            return []
+        self._conn.executemany(
+            "UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?",
+            [(file_hash,) for file_hash in hashes],
+        )
+        released = [
+            row["sha256"]
+            for row in self._conn.execute(
+                f"SELECT sha256 FROM blobs WHERE refcount <= 0 "
+                f"AND sha256 IN ({', '.join('?' * len(hashes))})",
+                hashes,
+            )
+        ]
+        self._conn.executemany(
+            "DELETE FROM blobs WHERE sha256 = ?", [(file_hash,) for file_hash in released]
+        )
+        return released
+
+    def _index_name(self, project_id: str, name: str) -> None:
+        """Replace the indexed name words of a project."""
+        self._conn.execute("DELETE FROM project_terms WHERE project_id = ?", (project_id,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO project_terms (term, project_id) VALUES (?, ?)",
+            [(term, project_id) for term in set(tokenize(name))],
+        )
+
+    def _get_stat(self, key: str) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM catalog_stats WHERE key = ?", (key,)
+        ).fetchone()
+        return row["value"] if row else 0
+
+    def _bump(self, **deltas: int) -> None:
+        """Add to catalog counters; must be called inside a transaction."""
+        self._conn.executemany(
+            "UPDATE catalog_stats SET value = value + ? WHERE key = ?",
+            [(delta, key) for key, delta in deltas.items() if delta],
+        )
+
+    def _bump_document_count(self, project_id: str, document_count: int) -> None:
+        """Count the change of a project's document count before it is written."""
+        row = self._conn.execute(
+            "SELECT document_count FROM projects WHERE id = ?", (project_id,)
+        ).fetchone()
+        if row:
+            self._bump(total_documents=document_count - row["document_count"])
+
+    def _rebuild_catalog(self) -> None:
+        """Build the name index and the counters from the projects table.
+
+        Runs once, for databases created before the catalog was indexed.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM project_terms")
+            for row in self._conn.execute("SELECT id, name FROM projects").fetchall():
+                self._index_name(row["id"], row["name"])
+            total_projects, total_documents = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(document_count), 0) FROM projects"
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO catalog_stats (key, value) VALUES (?, ?)",
+                [("total_projects", total_projects), ("total_documents", total_documents)],
+            )
+
+    def _delete_blobs(self, hashes: Iterable[str]) -> None:
+        for file_hash in hashes:
+            self.blob_store.delete(file_hash)
+
+    def count_messages(self, project_id: str) -> int:
+        """Get the number of stored chat messages of a project."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM chat_messages WHERE project_id = ?", (project_id,)
+            ).fetchone()[0]
+
+    def append_messages(
+        self, project_id: str, messages: List[Tuple[str, str]], start: int
+    ) -> None:
+        """Store chat messages after the first start messages of a project.
+
+        Args:
+            project_id: Project the messages belong to
+            messages: (role, content) pairs, in order
+            start: Position of the first message
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chat_messages (project_id, position, role, content) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (project_id, position, role, content)
+                    for position, (role, content) in enumerate(messages, start)
+                ],
+            )
+
+    def replace_messages(self, project_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Replace the whole stored chat history of a project."""
+        self.clear_messages(project_id)
+        self.append_messages(project_id, messages, 0)
+
+    def get_messages(self, project_id: str) -> List[Tuple[str, str]]:
+        """Get the stored chat history of a project as (role, content) pairs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM chat_messages "
+                "WHERE project_id = ? ORDER BY position",
+                (project_id,),
+            ).fetchall()
+        return [(row["role"], row["content"]) for row in rows]
+
+    def clear_messages(self, project_id: str) -> None:
+        """Delete the stored chat history of a project."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE project_id = ?", (project_id,)
+            )
+
+    def clear_project(self, project_id: str) -> None:
+        """Delete a project's files and chat history, keeping the project.
+
+        Blobs no other project references are deleted too.
+        """
+        with self._lock:
+            with self._conn:
+                released = self._release_files(
+                    "SELECT sha256 FROM project_files WHERE project_id = ?", (project_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM project_files WHERE project_id = ?", (project_id,)
+                )
+                self._conn.execute(
+                    "DELETE FROM chat_messages WHERE project_id = ?", (project_id,)
+                )
+                self._bump_document_count(project_id, 0)
+                self._conn.execute(
+                    "UPDATE projects SET document_count = 0 WHERE id = ?", (project_id,)
+                )
+            self._delete_blobs(released)
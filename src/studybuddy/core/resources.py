@@ -0,0 +1,41 @@
+"""Process-wide StudyBuddy services shared by every session.
+
+Streamlit reruns the app script on every interaction. The services created
+here hold no per-session state (that lives in st.session_state), so each
+is created once per process and shared across reruns and sessions. Their
+modules are imported on first use, keeping heavy dependencies out of the
+app's cold start.
+"""
+
+from typing import TYPE_CHECKING
+
+import streamlit as st
+
+if TYPE_CHECKING:
+    from .chat_service import ChatService
+    from .document_processor import DocumentProcessor
+    from .project_manager import ProjectManager
+
+
+@st.cache_resource(show_spinner=False)
+def get_document_processor() -> "DocumentProcessor":
+    """Get the shared document processor."""
+    from .document_processor import DocumentProcessor
+
+    return DocumentProcessor()
+
+
+@st.cache_resource(show_spinner=False)
+def get_chat_service() -> "ChatService":
+    """Get the shared chat service."""
+    from .chat_service import ChatService
+
+    return ChatService()
+
+
+@st.cache_resource(show_spinner=False)
+def get_project_manager() -> "ProjectManager":
+    """Get the shared project manager."""
+    from .project_manager import ProjectManager
+
+    return ProjectManager()
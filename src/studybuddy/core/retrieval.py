@@ -0,0 +1,196 @@
+"""Hybrid keyword and vector retrieval over a project's chunks."""
+
+from typing import Any, Collection, Dict, FrozenSet, List, Optional, Union
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.pydantic_v1 import Field
+from langchain_core.retrievers import BaseRetriever
+
+from ..config.settings import settings
+from . import metrics
+from .ann_index import get_ann_index
+from .index_store import IndexStore
+from .lexical_index import BM25Index
+
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+
+
+class DocumentPartitions:
+    """Positions of each document's chunks in the indexes of a retriever.
+
+    Chunk IDs start with their file's key (see IndexStore.chunk_id), so one
+    pass over an index's position-to-ID mapping groups its positions by
+    document. The grouping is kept until the mapping is replaced or grows,
+    which FAISS does on delete and add, so scoping a search to a few
+    documents only costs joining their partitions.
+    """
+
+    def __init__(self):
+        # Index name -> (mapping, its size, file key -> positions)
+        self._groups: Dict[str, tuple] = {}
+
+    def positions(
+        self, name: str, mapping: Union[Dict[int, str], List[str]], file_keys: Collection[str]
+    ) -> np.ndarray:
+        """Get the positions of the chunks of some documents in an index.
+
+        Args:
+            name: Name of the index, such as "vector"
+            mapping: The index's chunk IDs by position, as a dict or list
+            file_keys: Documents to include, see IndexStore.file_key
+
+        Returns:
+            Array of positions, empty if none of the documents is indexed
+        """
+        cached = self._groups.get(name)
+        if cached is None or cached[0] is not mapping or cached[1] != len(mapping):
+            items = mapping.items() if isinstance(mapping, dict) else enumerate(mapping)
+            groups: Dict[str, List[int]] = {}
+            for position, chunk_id in items:
+                groups.setdefault(chunk_id.rpartition("-")[0], []).append(position)
+            cached = (
+                mapping,
+                len(mapping),
+                {key: np.array(group, dtype=np.int64) for key, group in groups.items()},
+            )
+            self._groups[name] = cached
+
+        parts = [cached[2][key] for key in file_keys if key in cached[2]]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing BM25 and vector search by reciprocal rank fusion.
+
+    In "lexical" mode only the local BM25 index is consulted, so questions
+    are answered from the documents without embedding the query and without
+    any network access. "vector" mode behaves like a plain vector retriever.
+
+    Vector search uses the project's approximate index while it is
+    current, see core/ann_index.py, and the exact FAISS index otherwise.
+
+    When file_hashes is set, only those documents are searched: FAISS is
+    given an ID selector over their vector positions and BM25 skips the
+    postings of other chunks, so the top results are drawn from the
+    selected documents rather than filtered out of a project-wide search.
+    """
+
+    vector_store: Any
+    lexical_index: Optional[BM25Index] = None
+    mode: str = "hybrid"
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    # Hashes of the documents to search; None searches all of them
+    file_hashes: Optional[FrozenSet[str]] = None
+    partitions: DocumentPartitions = Field(default_factory=DocumentPartitions)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        mode = self.mode if self.lexical_index is not None else "vector"
+        file_keys = None
+        if self.file_hashes is not None:
+            file_keys = {IndexStore.file_key(file_hash) for file_hash in self.file_hashes}
+
+        rankings: List[List[str]] = []
+        if mode in ("hybrid", "lexical"):
+            rankings.append(self._lexical_search(query, self.fetch_k, file_keys))
+        if mode in ("hybrid", "vector"):
+            rankings.append(self._vector_search(query, self.fetch_k, file_keys))
+
+        fused: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, chunk_id in enumerate(ranking):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+
+        documents = []
+        for chunk_id in sorted(fused, key=fused.get, reverse=True):
+            document = self.vector_store.docstore.search(chunk_id)
+            # The lexical index may briefly lag behind a removed document
+            if isinstance(document, Document):
+                documents.append(document)
+            if len(documents) == self.k:
+                break
+        return documents
+
+    def _lexical_search(
+        self, query: str, k: int, file_keys: Optional[Collection[str]]
+    ) -> List[str]:
+        """Get the IDs of the chunks ranked highest by BM25."""
+        doc_numbers = None
+        if file_keys is not None:
+            doc_numbers = set(
+                self.partitions.positions(
+                    "lexical", self.lexical_index.doc_ids, file_keys
+                ).tolist()
+            )
+        return [
+            chunk_id
+            for chunk_id, _ in self.lexical_index.search(query, k, doc_numbers=doc_numbers)
+        ]
+
+    def _vector_search(
+        self, query: str, k: int, file_keys: Optional[Collection[str]] = None
+    ) -> List[str]:
+        """Get the IDs of the chunks nearest to the query embedding."""
+        index_to_id = self.vector_store.index_to_docstore_id
+        ann = get_ann_index(self.vector_store)
+        selector = params = None
+        if file_keys is not None:
+            allowed = self.partitions.positions("vector", index_to_id, file_keys)
+            if not len(allowed):
+                return []
+            if len(allowed) < len(index_to_id):
+                import faiss
+
+                # The selector is checked before distances are computed
+                selector = faiss.IDSelectorBatch(allowed)
+                params = faiss.SearchParameters(sel=selector)
+                if len(allowed) < settings.ANN_MIN_VECTORS:
+                    # Few enough to search exactly; an approximate search
+                    # would visit too few of them
+                    ann = None
+
+        trace = metrics.current_trace()
+        if trace is not None:
+            trace.set(vector_index=ann.spec if ann is not None else "Flat")
+
+        embedding = np.array(
+            [self.vector_store.embedding_function.embed_query(query)], dtype=np.float32
+        )
+        if ann is not None:
+            positions = ann.search(embedding, k, self.vector_store.index, selector)
+        else:
+            _, positions = self.vector_store.index.search(embedding, k, params=params)
+        return [index_to_id[position] for position in positions[0] if position != -1]
+
+
+def create_retriever(vector_store, lexical_index: Optional[BM25Index] = None):
+    """Create the configured retriever for a project's vector store.
+
+    Args:
+        vector_store: FAISS vector store holding the project's chunks
+        lexical_index: BM25 index over the same chunks (optional)
+
+    Returns:
+        Retriever for the conversation chain
+    """
+    mode = settings.RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        mode = "hybrid"
+    return HybridRetriever(
+        vector_store=vector_store,
+        lexical_index=lexical_index,
+        mode=mode,
+        k=settings.RETRIEVAL_K,
+        fetch_k=settings.RETRIEVAL_FETCH_K,
+        rrf_k=settings.RRF_K,
+    )
@@ -0,0 +1,186 @@
+"""Token-sized, page-aware chunking of document text for StudyBuddy."""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+from ..config.settings import settings
+from .tokens import estimate_tokens, get_encoding
+
+# Splits a line after each run of whitespace, keeping every character
+_WORD_BOUNDARY = re.compile(r"(?<=\s)(?=\S)")
+
+
+class ChunkRecord(NamedTuple):
+    """A chunk of a document and where it came from.
+
+    Pages are numbered from 1. Character offsets index the document text,
+    which is its pages' texts each followed by a newline; text is
+    document_text[char_start:char_end].
+    """
+
+    text: str
+    file_hash: str
+    page_start: int
+    page_end: int
+    char_start: int
+    char_end: int
+    tokens: int
+
+    def to_row(self) -> list:
+        """Get the record as a compact JSON row, without its file hash."""
+        return [
+            self.text, self.page_start, self.page_end, self.char_start, self.char_end, self.tokens
+        ]
+
+    @classmethod
+    def from_row(cls, row: list, file_hash: str) -> "ChunkRecord":
+        """Rebuild a record from a row made by to_row."""
+        text, page_start, page_end, char_start, char_end, tokens = row
+        return cls(text, file_hash, page_start, page_end, char_start, char_end, tokens)
+
+
+class _Unit(NamedTuple):
+    """A line, or a piece of an overlong line, with its trailing separator."""
+
+    text: str
+    page: int
+    start: int
+    tokens: int
+
+
+class PageTextSplitter:
+    """Splits a document's page stream into chunks of at most a token budget.
+
+    Pages are cut into lines, and lines longer than a chunk into words, in
+    one pass. Units are packed into a chunk until the next would exceed
+    chunk_tokens; the next chunk starts with the trailing units of the
+    previous one, up to overlap_tokens. Chunks never span two documents,
+    and each carries its page range and character offsets.
+
+    A chunk's size is the sum of its units' token counts, which are cached
+    since lines such as headers and footers recur on every page. When
+    tiktoken has no encoding for the model, tokens are estimated at four
+    characters each, which needs no cache.
+
+    Args:
+        chunk_tokens: Maximum tokens per chunk (defaults to settings.CHUNK_TOKENS)
+        overlap_tokens: Tokens repeated from the previous chunk, at most half a
+            chunk (defaults to settings.CHUNK_OVERLAP_TOKENS)
+        model: Model whose tokenizer sizes the chunks (defaults to settings.EMBEDDING_MODEL)
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        model: Optional[str] = None,
+    ):
+        self.chunk_tokens = chunk_tokens or settings.CHUNK_TOKENS
+        self.overlap_tokens = min(
+            settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens,
+            self.chunk_tokens // 2,
+        )
+        self.model = model or settings.EMBEDDING_MODEL
+        self.count_tokens = lru_cache(maxsize=settings.TOKEN_COUNT_CACHE_SIZE)(
+            self._count_tokens
+        )
+
+    def _count_tokens(self, text: str) -> int:
+        encoding = get_encoding(self.model)
+        if encoding is None:
+            return estimate_tokens(text)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def split_pages(self, pages: Iterable[str], file_hash: str = "") -> Iterator[ChunkRecord]:
+        """Split the pages of one document into chunk records.
+
+        Args:
+            pages: Page texts of the document, in order
+            file_hash: SHA-256 of the document, stored in its records
+
+        Yields:
+            Chunk records in document order; chunks of only whitespace are skipped
+        """
+        window: deque = deque()
+        window_tokens = 0
+        pending = False  # Whether the window holds units not emitted yet
+
+        count_tokens = (
+            self.count_tokens if get_encoding(self.model) is not None else estimate_tokens
+        )
+        for unit in self._units(pages, count_tokens):
+            if pending and window_tokens + unit.tokens > self.chunk_tokens:
+                record = self._record(window, file_hash, window_tokens)
+                if record:
+                    yield record
+                pending = False
+                while window and (
+                    window_tokens > self.overlap_tokens
+                    or window_tokens + unit.tokens > self.chunk_tokens
+                ):
+                    window_tokens -= window.popleft().tokens
+            if not window and not unit.text.strip():
+                # Chunks never start with blank lines
+                continue
+            window.append(unit)
+            window_tokens += unit.tokens
+            pending = True
+
+        if pending:
+            record = self._record(window, file_hash, window_tokens)
+            if record:
+                yield record
+
+    def split_text(self, text: str) -> List[str]:
+        """Split a text, treated as a single page, into chunk texts."""
+        return [record.text for record in self.split_pages([text])]
+
+    def _units(
+        self, pages: Iterable[str], count_tokens: Callable[[str], int]
+    ) -> Iterator[_Unit]:
+        """Cut pages into lines, and overlong lines into words."""
+        chunk_tokens = self.chunk_tokens
+        offset = 0
+        for page_number, page in enumerate(pages, 1):
+            for line in f"{page}\n".splitlines(keepends=True):
+                tokens = count_tokens(line)
+                if tokens <= chunk_tokens:
+                    yield _Unit(line, page_number, offset, tokens)
+                else:
+                    yield from self._split_line(line, page_number, offset, count_tokens)
+                offset += len(line)
+
+    def _split_line(
+        self, line: str, page_number: int, offset: int, count_tokens: Callable[[str], int]
+    ) -> Iterator[_Unit]:
+        """Cut a line longer than a chunk into words, and overlong words into slices."""
+        for word in _WORD_BOUNDARY.split(line):
+            tokens = count_tokens(word)
+            if tokens <= self.chunk_tokens:
+                yield _Unit(word, page_number, offset, tokens)
+            else:
+                # A token spans at least one character, so slices this long fit
+                for start in range(0, len(word), self.chunk_tokens):
+                    piece = word[start : start + self.chunk_tokens]
+                    yield _Unit(piece, page_number, offset + start, count_tokens(piece))
+            offset += len(word)
+
+    @staticmethod
+    def _record(window: deque, file_hash: str, tokens: int) -> Optional[ChunkRecord]:
+        """Build the record of the units in a window."""
+        text = "".join(unit.text for unit in window)
+        stripped = text.strip()
+        if not stripped:
+            return None
+        char_start = window[0].start + len(text) - len(text.lstrip())
+        return ChunkRecord(
+            stripped,
+            file_hash,
+            next(unit.page for unit in window if unit.text.strip()),
+            next(unit.page for unit in reversed(window) if unit.text.strip()),
+            char_start,
+            char_start + len(stripped),
+            tokens,
+        )
@@ -0,0 +1,20 @@
+"""Token counting shared by the text splitter and conversation memory."""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str):
+    """Get the tiktoken encoding of a model, or None if it is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model_name)
+    except Exception:
+        # Unknown model, or the encoding could not be downloaded
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text at four characters per token."""
+    return (len(text) + 3) // 4
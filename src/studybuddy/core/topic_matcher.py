@@ -0,0 +1,179 @@
+"""Indexed matching of questions against knowledge-base topics."""
+
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .lexical_index import tokenize
+
+# Topics added since the automaton was last built are looked up by their
+# first word until they outnumber the built ones (and this minimum)
+MIN_PENDING_PHRASES = 256
+
+
+class TopicMatcher:
+    """Finds the knowledge-base topic that best matches a question.
+
+    Topic phrases are compiled into an Aho-Corasick automaton over words, so
+    every topic phrase occurring in a question is found in one pass over the
+    question, however many topics there are. An inverted index from words to
+    topics finds topics that only share some words with the question.
+
+    Each candidate topic is scored by the share of its words (weighted by
+    inverse topic frequency) that the question contains, plus one if the
+    whole phrase occurs, and the best one wins.
+
+    Topics can be added at any time. They go into the word index right away
+    and into a small first-word index of pending phrases; the automaton is
+    rebuilt once the pending topics outnumber the compiled ones, so the
+    rebuilds cost a constant amortized time per added topic.
+    """
+
+    def __init__(self, topics: Iterable[str] = ()):
+        self.topics: List[str] = []
+        self.topic_words: List[Tuple[str, ...]] = []
+        self.topic_ids: Dict[str, int] = {}
+        self.word_topics: Dict[str, List[int]] = {}
+
+        # Automaton over word sequences: child links, failure links, the
+        # topics whose phrase ends at a node (several topics can share the
+        # words of a phrase), and the nearest node on the failure chain
+        # where another phrase ends
+        self._children: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._ends: List[List[int]] = [[]]
+        self._output_link: List[int] = [-1]
+        self._built_count = 0
+        self._pending: Dict[str, List[int]] = {}
+        self._pending_count = 0
+
+        for topic in topics:
+            self.add(topic)
+
+    def __len__(self) -> int:
+        return len(self.topics)
+
+    def add(self, topic: str) -> None:
+        """Add a topic phrase; adding a known topic again does nothing."""
+        if topic in self.topic_ids:
+            return
+        words = tuple(tokenize(topic))
+        topic_id = len(self.topics)
+        self.topics.append(topic)
+        self.topic_words.append(words)
+        self.topic_ids[topic] = topic_id
+        if not words:
+            return
+
+        for word in set(words):
+            # Single characters ("s" of "newton's") say nothing about the topic
+            if len(word) > 1:
+                self.word_topics.setdefault(word, []).append(topic_id)
+        self._pending.setdefault(words[0], []).append(topic_id)
+        self._pending_count += 1
+
+    def match(self, query: str) -> Optional[str]:
+        """Get the best matching topic of a question.
+
+        Args:
+            query: User's question
+
+        Returns:
+            Best scoring topic or None if no topic shares a word with the question
+        """
+        words = tokenize(query)
+        if not words or not self.topics:
+            return None
+
+        phrase_hits = self._find_phrases(words)
+        candidates = set(phrase_hits)
+        query_words = set(words)
+        for word in query_words:
+            candidates.update(self.word_topics.get(word, ()))
+        if not candidates:
+            return None
+
+        topic_count = len(self.topics)
+        best_id, best_score = -1, -1.0
+        for topic_id in candidates:
+            matched = total = 0.0
+            for word in set(self.topic_words[topic_id]):
+                if len(word) == 1:
+                    continue
+                weight = math.log(1 + topic_count / len(self.word_topics[word]))
+                total += weight
+                if word in query_words:
+                    matched += weight
+            score = (topic_id in phrase_hits) + (matched / total if total else 0.0)
+            # Ties go to the longer, more specific topic
+            if score > best_score or (
+                score == best_score
+                and len(self.topic_words[topic_id]) > len(self.topic_words[best_id])
+            ):
+                best_id, best_score = topic_id, score
+        return self.topics[best_id]
+
+    def _find_phrases(self, words: List[str]) -> Set[int]:
+        """Get the topics whose whole phrase occurs in a word sequence."""
+        if self._pending_count > max(MIN_PENDING_PHRASES, self._built_count):
+            self._build()
+
+        found: Set[int] = set()
+        node = 0
+        for word in words:
+            while node and word not in self._children[node]:
+                node = self._fail[node]
+            node = self._children[node].get(word, 0)
+            match = node if self._ends[node] else self._output_link[node]
+            while match != -1:
+                found.update(self._ends[match])
+                match = self._output_link[match]
+
+        # Topics added since the last build are not in the automaton yet
+        if self._pending:
+            for start, word in enumerate(words):
+                for topic_id in self._pending.get(word, ()):
+                    phrase = self.topic_words[topic_id]
+                    if tuple(words[start : start + len(phrase)]) == phrase:
+                        found.add(topic_id)
+        return found
+
+    def _build(self) -> None:
+        """Insert pending topics into the trie and relink the automaton."""
+        for topic_id in (
+            topic_id for topic_ids in self._pending.values() for topic_id in topic_ids
+        ):
+            node = 0
+            for word in self.topic_words[topic_id]:
+                child = self._children[node].get(word)
+                if child is None:
+                    child = len(self._children)
+                    self._children[node][word] = child
+                    self._children.append({})
+                    self._fail.append(0)
+                    self._ends.append([])
+                    self._output_link.append(-1)
+                node = child
+            if node:
+                self._ends[node].append(topic_id)
+        self._built_count += self._pending_count
+        self._pending = {}
+        self._pending_count = 0
+
+        # Failure and output links of every node, breadth first
+        queue = deque(self._children[0].values())
+        for child in queue:
+            self._fail[child] = 0
+            self._output_link[child] = -1
+        while queue:
+            node = queue.popleft()
+            for word, child in self._children[node].items():
+                fail = self._fail[node]
+                while fail and word not in self._children[fail]:
+                    fail = self._fail[fail]
+                fail = self._children[fail].get(word, 0)
+                self._fail[child] = fail
+                self._output_link[child] = (
+                    fail if self._ends[fail] else self._output_link[fail]
+                )
+                queue.append(child)
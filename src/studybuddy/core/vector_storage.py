@@ -0,0 +1,235 @@
+"""Compact, memory-mapped storage of a project's vectors and chunk texts.
+
+Vectors are kept in a FAISS flat-codes index whose codes are float32
+(IndexFlatL2), float16 or 8-bit scalar-quantized (IndexScalarQuantizer),
+as settings.VECTOR_STORAGE says. A saved index file is those codes behind
+a short header, and is memory-mapped when loaded, so every session and
+process searching a project shares its pages through the OS cache. A
+mapped index is read-only; it is copied into memory before its first add
+or delete.
+
+Chunk texts and metadata are saved as JSON lines in index order, next to
+a side file of their byte offsets and IDs. ChunkDocstore maps both and
+decodes a chunk only when it is asked for, instead of holding a Document
+per chunk.
+"""
+
+import json
+import mmap
+import os
+import struct
+import weakref
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+from ..config.settings import settings
+
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+# Vectors read per batch when converting an index to another storage type
+CONVERT_BATCH_SIZE = 8192
+# Widens the int8 range beyond the training sample, as a share of its span
+INT8_RANGE_MARGIN = 0.1
+
+_HEADER = struct.Struct("<Q")
+
+# Indexes read by read_index, whose codes are a view of the mapped file
+_mapped: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def create_index(dimensions: int, sample: np.ndarray):
+    """Create an empty exact index with the configured vector storage.
+
+    Args:
+        dimensions: Dimensions of the vectors
+        sample: Vectors to train the int8 range on, such as the first batch
+
+    Returns:
+        FAISS index ready for adding vectors
+    """
+    import faiss
+
+    storage = settings.VECTOR_STORAGE
+    if storage == "float16":
+        return faiss.IndexScalarQuantizer(
+            dimensions, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2
+        )
+    if storage == "int8":
+        # One range for every dimension, so a small first batch trains it well
+        index = faiss.IndexScalarQuantizer(
+            dimensions, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_L2
+        )
+        index.sq.rangestat_arg = INT8_RANGE_MARGIN
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+        return index
+    return faiss.IndexFlatL2(dimensions)
+
+
+def storage_of(index) -> str:
+    """Get the storage type of an exact index."""
+    import faiss
+
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return "float16"
+        return "int8"
+    return "float32"
+
+
+def convert_index(index):
+    """Get an index with the configured storage holding the same vectors.
+
+    Returns the index itself if it already has that storage. Vectors are
+    converted in batches, so a mapped index is never loaded whole.
+    """
+    if storage_of(index) == settings.VECTOR_STORAGE or not index.ntotal:
+        return index
+    first = index.reconstruct_n(0, min(CONVERT_BATCH_SIZE, index.ntotal))
+    converted = create_index(index.d, first)
+    converted.add(first)
+    for start in range(len(first), index.ntotal, CONVERT_BATCH_SIZE):
+        converted.add(index.reconstruct_n(start, min(CONVERT_BATCH_SIZE, index.ntotal - start)))
+    return converted
+
+
+def read_index(path: Union[str, Path]):
+    """Read a saved index, memory-mapping its codes when the index type allows."""
+    import faiss
+
+    try:
+        index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC)
+    except RuntimeError:
+        return faiss.read_index(str(path))
+    _mapped.add(index)
+    return index
+
+
+def ensure_writable(vector_store) -> None:
+    """Copy a vector store's mapped index into memory before it is changed.
+
+    FAISS aborts the process when codes of a mapped index are resized, so
+    this must precede every add or delete on a loaded vector store.
+    """
+    if vector_store.index in _mapped:
+        import faiss
+
+        vector_store.index = faiss.deserialize_index(faiss.serialize_index(vector_store.index))
+
+
+class ChunkWriter:
+    """Writes chunk records and their offsets and IDs, replacing both files on success.
+
+    Args:
+        records_path: JSON lines file of {"text", "metadata"} records
+        offsets_path: Side file with the record count, the n + 1 byte
+            offsets of the records and the n chunk IDs, newline-separated
+    """
+
+    def __init__(self, records_path: Path, offsets_path: Path):
+        self.records_path = Path(records_path)
+        self.offsets_path = Path(offsets_path)
+        self.offsets = array("Q", [0])
+        self.ids: List[str] = []
+        self._file = None
+
+    def __enter__(self) -> "ChunkWriter":
+        self._file = open(f"{self.records_path}.tmp", "wb")
+        return self
+
+    def add(self, chunk_id: str, text: str, metadata: dict) -> Tuple[str, str]:
+        """Write one chunk record.
+
+        Returns:
+            (chunk id, text), so records can be fed to another index as written
+        """
+        line = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False)
+        self._file.write(line.encode("utf-8") + b"\n")
+        self.offsets.append(self._file.tell())
+        self.ids.append(chunk_id)
+        return chunk_id, text
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self._file.close()
+        if exc_type is not None:
+            os.unlink(f"{self.records_path}.tmp")
+            return
+        with open(f"{self.offsets_path}.tmp", "wb") as f:
+            f.write(_HEADER.pack(len(self.ids)))
+            self.offsets.tofile(f)
+            f.write("\n".join(self.ids).encode("utf-8"))
+        os.replace(f"{self.records_path}.tmp", self.records_path)
+        os.replace(f"{self.offsets_path}.tmp", self.offsets_path)
+
+
+class ChunkDocstore(Docstore, AddableMixin):
+    """Docstore decoding chunks from memory-mapped files written by ChunkWriter.
+
+    Chunks added after loading are kept in memory until the next save;
+    deleted ones are forgotten.
+
+    Args:
+        records_path: JSON lines file of chunk records
+        offsets_path: Side file of the records' offsets and IDs
+    """
+
+    def __init__(self, records_path: Path, offsets_path: Path):
+        with open(offsets_path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"Truncated chunk offsets file: {offsets_path}")
+            (count,) = _HEADER.unpack(header)
+            f.seek(_HEADER.size + (count + 1) * 8)
+            ids = f.read().decode("utf-8")
+        self.ids: List[str] = ids.split("\n") if count else []
+        self._offsets = np.memmap(
+            offsets_path, dtype="<u8", mode="r", offset=_HEADER.size, shape=(count + 1,)
+        )
+        self._map: Optional[mmap.mmap] = None
+        if os.path.getsize(records_path):
+            with open(records_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._positions: Dict[str, int] = {
+            chunk_id: position for position, chunk_id in enumerate(self.ids)
+        }
+        self._added: Dict[str, Document] = {}
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Get a chunk by ID, or a message if there is none."""
+        document = self._added.get(search)
+        if document is not None:
+            return document
+        position = self._positions.get(search)
+        if position is None:
+            return f"ID {search} not found."
+        start, end = self._offsets[position], self._offsets[position + 1]
+        record = json.loads(self._map[start:end])
+        return Document(page_content=record["text"], metadata=record["metadata"])
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Add chunks by ID; IDs already present are rejected."""
+        overlapping = [
+            chunk_id
+            for chunk_id in texts
+            if chunk_id in self._added or chunk_id in self._positions
+        ]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+
+    def delete(self, ids: List[str]) -> None:
+        """Forget chunks by ID."""
+        missing = [
+            chunk_id
+            for chunk_id in ids
+            if chunk_id not in self._added and chunk_id not in self._positions
+        ]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        for chunk_id in ids:
+            if self._added.pop(chunk_id, None) is None:
+                del self._positions[chunk_id]
@@ -2,6 +2,8 @@
 
 import streamlit as st
 import time
+import uuid
+from collections import Counter
 from typing import Optional
 
 from .templates import CSS_STYLES, BOT_MESSAGE_TEMPLATE, USER_MESSAGE_TEMPLATE
@@ -26,31 +28,68 @@ class UIComponents:
 
     @staticmethod
     def render_project_selector(project_manager):
-        """Render simple project selector."""
-        projects = project_manager.get_project_list_for_selectbox()
+        """Render the project selector with name search and paging.
+
+        The selection is resolved to a project ID within the listed page, so
+        projects sharing a name and icon stay apart, and only one page of
+        the catalog is loaded per rerun.
+        """
         current_project = project_manager.get_current_project()
+        col_search, col_select, col_page = st.columns([2, 3, 1])
+
+        with col_search:
+            query = st.text_input(
+                "Search Projects", key="project_search", placeholder="Name starts with..."
+            )
 
+        page = st.session_state.get("project_page", 1)
+        total, projects = project_manager.search_projects(query, page - 1)
+        pages = max(1, -(-total // settings.PROJECT_PAGE_SIZE))
+        if page > pages:
+            # The search narrowed the results below the current page
+            page = st.session_state.project_page = pages
+            total, projects = project_manager.search_projects(query, page - 1)
+
+        if current_project and all(
+            project["id"] != current_project["id"] for project in projects
+        ):
+            projects = [current_project] + projects
         if not projects:
             return None
 
-        current_display = None
+        # Labels map back to IDs; projects sharing a name and icon also show their ID
+        names = [project_manager.get_display_name(project) for project in projects]
+        name_counts = Counter(names)
+        labels = {
+            (f"{name} ({project['id']})" if name_counts[name] > 1 else name): project["id"]
+            for name, project in zip(names, projects)
+        }
+        options = list(labels)
+        # Nothing is preselected until the session opens a project
+        current_index = None
         if current_project:
-            current_display = f"{current_project['emoji']} {current_project['name']}"
+            current_index = list(labels.values()).index(current_project["id"])
+
+        with col_select:
+            selected = st.selectbox(
+                f"Select Project ({total} found)" if query else "Select Project",
+                options=options,
+                index=current_index,
+                placeholder="Choose a project",
+                key=f"project_selector_{st.session_state.project_selector_key}",
+            )
+        selected_id = labels.get(selected)
 
-        selected = st.selectbox(
-            "Select Project",
-            options=projects,
-            index=projects.index(current_display) if current_display in projects else 0,
-            key=f"project_selector_{st.session_state.project_selector_key}",
-        )
+        with col_page:
+            st.number_input(
+                f"Page of {pages}", min_value=1, max_value=pages, key="project_page"
+            )
 
-        if selected:
-            project_id = project_manager.get_project_id_from_display_name(selected)
-            if project_id != st.session_state.current_project_id:
-                project_manager.set_current_project(project_id)
-                st.rerun()
+        if selected_id and selected_id != st.session_state.current_project_id:
+            project_manager.set_current_project(selected_id)
+            st.rerun()
 
-        return selected
+        return selected_id
 
     @staticmethod
     def render_new_project_form(project_manager):
@@ -84,15 +123,12 @@ class UIComponents:
                     st.rerun()
 
     @staticmethod
-    def render_file_upload():
+    def render_file_upload(project_manager):
         """Render simple file upload."""
         current_project_id = st.session_state.get("current_project_id")
 
         # Show current file status
         if current_project_id:
-            from ..core.project_manager import ProjectManager
-
-            project_manager = ProjectManager()
             existing_files, existing_names = project_manager.get_project_files(
                 current_project_id
             )
@@ -114,6 +150,54 @@ class UIComponents:
             key=f"files_{current_project_id}",
         )
 
+    @staticmethod
+    def render_ingestion_progress():
+        """Render per-stage document processing progress.
+
+        Returns:
+            Progress callback accepting (stage, done, total)
+        """
+        labels = {
+            "extract": "Extracted {done} pages",
+            "split": "Created {done} chunks",
+            "embed": "Embedded {done} chunks",
+            "index": "Indexed {done} chunks",
+        }
+        lines = {stage: st.empty() for stage in labels}
+
+        def update(stage: str, done: int, total: Optional[int] = None):
+            if stage not in lines:
+                return
+            text = labels[stage].format(done=done)
+            if total:
+                text += f" of {total}"
+            lines[stage].markdown(text)
+
+        return update
+
+    @staticmethod
+    def render_streaming_answer():
+        """Render a bot message that fills in as answer tokens arrive.
+
+        Returns:
+            (token callback, placeholder to clear once the answer is committed)
+        """
+        placeholder = st.empty()
+        placeholder.markdown(
+            BOT_MESSAGE_TEMPLATE.replace("{{MSG}}", "🤔 StudyBuddy is thinking..."),
+            unsafe_allow_html=True,
+        )
+        tokens = []
+
+        def on_token(token: str):
+            tokens.append(token)
+            placeholder.markdown(
+                BOT_MESSAGE_TEMPLATE.replace("{{MSG}}", "".join(tokens) + "▌"),
+                unsafe_allow_html=True,
+            )
+
+        return on_token, placeholder
+
     @staticmethod
     def render_chat_input():
         """Render simple chat input."""
@@ -125,21 +209,70 @@ class UIComponents:
 
     @staticmethod
     def render_chat_history(chat_history):
-        """Render simple chat history."""
-        if chat_history:
-            st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-            for i, message in enumerate(chat_history):
-                if i % 2 == 0:
-                    st.markdown(
-                        USER_MESSAGE_TEMPLATE.replace("{{MSG}}", message.content),
-                        unsafe_allow_html=True,
-                    )
-                else:
-                    st.markdown(
-                        BOT_MESSAGE_TEMPLATE.replace("{{MSG}}", message.content),
-                        unsafe_allow_html=True,
-                    )
-            st.markdown("</div>", unsafe_allow_html=True)
+        """Render the most recent turns of the chat history.
+
+        Only the last st.session_state.chat_window_turns turns are drawn,
+        with a button to load earlier ones. Each message's HTML is cached by
+        message ID and the window is drawn with a single markdown call, so a
+        rerun costs the same however long the chat has grown. The speaker is
+        taken from the message type, not its position in the history.
+        """
+        if not chat_history:
+            return
+
+        turns = st.session_state.get("chat_window_turns", settings.CHAT_WINDOW_TURNS)
+        start = UIComponents._chat_window_start(chat_history, turns)
+        if start > 0:
+            # A fixed label keeps the button the same widget as the window grows
+            st.button(
+                "Load earlier messages",
+                key="load_earlier_messages",
+                help=f"{start} earlier messages",
+                on_click=UIComponents._load_earlier_turns,
+                args=(turns,),
+            )
+
+        cached_html = st.session_state.get("message_html", {})
+        window_html = {}
+        for message in chat_history[start:]:
+            if message.id is None:
+                message.id = uuid.uuid4().hex
+            html = cached_html.get(message.id)
+            if html is None:
+                html = UIComponents._render_message_html(message)
+            window_html[message.id] = html
+        # Messages that scrolled out of the window are rendered again if loaded
+        st.session_state.message_html = window_html
+
+        st.markdown(
+            f'<div class="chat-container">{"".join(window_html.values())}</div>',
+            unsafe_allow_html=True,
+        )
+
+    @staticmethod
+    def _load_earlier_turns(turns: int):
+        """Grow the chat window by another page of turns."""
+        st.session_state.chat_window_turns = turns + settings.CHAT_WINDOW_TURNS
+
+    @staticmethod
+    def _chat_window_start(chat_history, turns: int) -> int:
+        """Get the index of the first message of the last turns turns."""
+        questions = 0
+        for position in range(len(chat_history) - 1, -1, -1):
+            if chat_history[position].type == "human":
+                questions += 1
+                if questions == turns:
+                    return position
+        return 0
+
+    @staticmethod
+    def _render_message_html(message) -> str:
+        """Render one chat message; system messages are not shown."""
+        if message.type == "human":
+            return USER_MESSAGE_TEMPLATE.replace("{{MSG}}", message.content)
+        if message.type == "system":
+            return ""
+        return BOT_MESSAGE_TEMPLATE.replace("{{MSG}}", message.content)
 
     @staticmethod
     def render_welcome():
@@ -147,7 +280,12 @@ class UIComponents:
         st.info("Upload PDF documents and start asking questions.")
 
     @staticmethod
-    def render_sidebar(project_manager, chat_service):
+    def render_project_prompt():
+        """Render the message shown until a project is open."""
+        st.info("Select a project above or create a new one to get started.")
+
+    @staticmethod
+    def render_sidebar(project_manager):
         """Render simplified sidebar."""
         # Project selector
         UIComponents.render_new_project_form(project_manager)
@@ -155,12 +293,30 @@ class UIComponents:
 
         # File upload
         st.subheader("Documents")
-        pdf_docs = UIComponents.render_file_upload()
+        pdf_docs = UIComponents.render_file_upload(project_manager)
 
         if pdf_docs:
             if st.button("Process Documents", type="primary", use_container_width=True):
                 return {"action": "process", "files": pdf_docs}
 
+        # Indexed documents, each removable without rebuilding the others
+        current_project_id = st.session_state.get("current_project_id")
+        documents = []
+        if current_project_id:
+            documents = project_manager.get_project_documents(current_project_id)
+            for document in documents:
+                col_name, col_remove = st.columns([4, 1])
+                with col_name:
+                    st.caption(f"📄 {document['name']}")
+                with col_remove:
+                    if st.button(
+                        "✕",
+                        key=f"remove_{document['sha256']}",
+                        help="Remove this document",
+                    ):
+                        return {"action": "remove", "file_hash": document["sha256"]}
+        UIComponents.render_document_scope(current_project_id, documents)
+
         st.divider()
 
         # Simple chatbot toggle
@@ -170,9 +326,12 @@ class UIComponents:
             value=st.session_state.get("simple_chatbot_enabled", False),
         )
 
+        time_to_first_token = st.session_state.get("time_to_first_token")
+        if time_to_first_token is not None:
+            st.caption(f"Last answer started after {time_to_first_token:.2f}s")
+
         if simple_mode != st.session_state.get("simple_chatbot_enabled", False):
             st.session_state.simple_chatbot_enabled = simple_mode
-            chat_service.toggle_simple_chatbot(simple_mode)
 
             if simple_mode:
                 st.markdown(
@@ -184,4 +343,78 @@ class UIComponents:
                     unsafe_allow_html=True,
                 )
 
+        if settings.DEBUG_PANEL:
+            UIComponents.render_debug_panel()
+
         return None
+
+    @staticmethod
+    def render_document_scope(project_id, documents):
+        """Render the choice of documents questions are answered from.
+
+        The chosen file hashes are kept in st.session_state.document_scope,
+        None when no document is chosen, meaning all of them are searched.
+        """
+        st.session_state.document_scope = None
+        if len(documents) < 2:
+            return
+
+        # Labels map back to hashes; documents sharing a name also show their hash
+        name_counts = Counter(document["name"] for document in documents)
+        labels = {
+            (
+                f"{document['name']} ({document['sha256'][:8]})"
+                if name_counts[document["name"]] > 1
+                else document["name"]
+            ): document["sha256"]
+            for document in documents
+        }
+        selected = st.multiselect(
+            "Ask about",
+            options=list(labels),
+            key=f"document_scope_{project_id}",
+            placeholder="All documents",
+            help="Only search the chosen documents when answering",
+        )
+        if selected:
+            st.session_state.document_scope = [labels[label] for label in selected]
+
+    @staticmethod
+    def render_debug_panel():
+        """Render the session summary, the last operation traces and metric exports."""
+        from ..core.metrics import get_metrics
+        from ..utils.helpers import get_session_state_summary
+
+        registry = get_metrics()
+        summary = get_session_state_summary()
+        last_operations = summary.pop("last_operations")
+
+        with st.expander("🛠️ Debug", expanded=False):
+            st.json(summary, expanded=False)
+            for operation, trace in last_operations.items():
+                rows = "".join(
+                    f"| {stage} | {values['ms']:.1f} | "
+                    + ", ".join(
+                        f"{key}={value:g}" for key, value in values.items() if key != "ms"
+                    )
+                    + " |\n"
+                    for stage, values in trace["stages"].items()
+                )
+                st.markdown(
+                    f"**Last {operation}**: {trace['duration_ms']:.0f} ms\n\n"
+                    "| Stage | ms | Counts |\n|---|---:|---|\n" + rows
+                )
+            st.download_button(
+                "Prometheus metrics",
+                registry.to_prometheus(),
+                file_name="studybuddy_metrics.prom",
+                mime="text/plain",
+                use_container_width=True,
+            )
+            st.download_button(
+                "Traces (JSON lines)",
+                registry.to_jsonl(),
+                file_name="studybuddy_traces.jsonl",
+                mime="application/x-ndjson",
+                use_container_width=True,
+            )
@@ -3,6 +3,7 @@
 from .helpers import (
     validate_environment,
     initialize_streamlit_config,
+    initialize_chat_session_state,
     clear_chat_session,
     format_file_size,
     get_session_state_summary,
@@ -11,6 +12,7 @@ from .helpers import (
 __all__ = [
     "validate_environment",
     "initialize_streamlit_config",
+    "initialize_chat_session_state",
     "clear_chat_session",
     "format_file_size",
     "get_session_state_summary",
@@ -3,6 +3,8 @@
 import streamlit as st
 from typing import Any, Dict
 
+from ..config.settings import settings
+
 
 def validate_environment() -> bool:
     """Validate that required environment variables are set.
@@ -31,6 +33,32 @@ def initialize_streamlit_config():
     )
 
 
+def initialize_chat_session_state():
+    """Initialize the chat-related Streamlit session state variables.
+
+    Kept free of chat dependencies so the first page can be drawn before
+    any of them are imported.
+    """
+    if "conversation" not in st.session_state:
+        st.session_state.conversation = None
+    if "chat_history" not in st.session_state:
+        st.session_state.chat_history = None
+    if "vector_store" not in st.session_state:
+        st.session_state.vector_store = None
+    if "index_version" not in st.session_state:
+        st.session_state.index_version = None
+    if "documents_processed" not in st.session_state:
+        st.session_state.documents_processed = False
+    if "uploaded_files" not in st.session_state:
+        st.session_state.uploaded_files = []
+    if "file_names" not in st.session_state:
+        st.session_state.file_names = []
+    if "simple_chatbot_enabled" not in st.session_state:
+        st.session_state.simple_chatbot_enabled = False
+    if "chat_window_turns" not in st.session_state:
+        st.session_state.chat_window_turns = settings.CHAT_WINDOW_TURNS
+
+
 def clear_chat_session():
     """Clear the current chat session and reset state."""
     st.session_state.conversation = None
@@ -65,11 +93,28 @@ def get_session_state_summary() -> Dict[str, Any]:
     """Get summary of current session state for debugging.
 
     Returns:
-        Dictionary with session state information
+        Dictionary with session state information, how the current index is
+        searched, and the most recent trace of each traced operation
+        ("ingest", "question", "ann_build") of the process
     """
+    from ..core.metrics import get_metrics
+
+    vector_index = {}
+    if st.session_state.get("vector_store") is not None:
+        from ..core.ann_index import describe
+
+        vector_index = describe(st.session_state.vector_store)
+
     return {
         "has_conversation": st.session_state.get("conversation") is not None,
         "has_chat_history": st.session_state.get("chat_history") is not None,
         "documents_processed": st.session_state.get("documents_processed", False),
         "document_count": st.session_state.get("document_count", 0),
+        "time_to_first_token": st.session_state.get("time_to_first_token"),
+        "current_project_id": st.session_state.get("current_project_id"),
+        "index_version": st.session_state.get("index_version"),
+        "chat_messages": len(st.session_state.get("chat_history") or []),
+        "resident_projects": len(st.session_state.get("resident_projects") or {}),
+        "vector_index": vector_index,
+        "last_operations": get_metrics().last_traces(),
     }
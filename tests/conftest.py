@@ -0,0 +1,76 @@
+"""Shared fixtures for the StudyBuddy tests.
+
+The app's OpenAI models are swapped for the deterministic fakes of
+benchmarks.fakes, and every store is created under the test's temporary
+directory.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+# Keep the run offline and away from the user's models directory; the
+# settings are read when the app modules are first imported
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["STUDYBUDDY_MODELS_DIR"] = tempfile.mkdtemp(prefix="studybuddy-tests-")
+os.environ["STUDYBUDDY_EMBEDDING_BACKEND"] = "local"
+
+import pytest  # noqa: E402
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from src.studybuddy.core.blob_store import BlobStore  # noqa: E402
+from src.studybuddy.core.index_store import IndexStore  # noqa: E402
+from src.studybuddy.core.project_store import ProjectStore  # noqa: E402
+
+EMBEDDING_DIMENSIONS = 32
+
+
+class CountingChatModel(FakeChatModel):
+    """Fake chat model that records the prompts it completed."""
+
+    prompts: List[str] = []
+    reply_words: int = 8
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def new_project(store: ProjectStore, project_id: str, name: str = "Biology") -> str:
+    """Create a project in a store and get its ID."""
+    store.create_project(
+        {
+            "id": project_id,
+            "name": name,
+            "emoji": "📚",
+            "description": "",
+            "created_at": datetime.now().isoformat(),
+        }
+    )
+    return project_id
+
+
+@pytest.fixture
+def project_store(tmp_path) -> ProjectStore:
+    return ProjectStore(
+        str(tmp_path / "projects.sqlite3"), BlobStore(str(tmp_path / "blobs"))
+    )
+
+
+@pytest.fixture
+def index_store(tmp_path) -> IndexStore:
+    return IndexStore(str(tmp_path / "indexes"))
+
+
+@pytest.fixture
+def embeddings() -> FakeEmbeddings:
+    return FakeEmbeddings(EMBEDDING_DIMENSIONS)
+
+
+@pytest.fixture
+def chat_model() -> CountingChatModel:
+    return CountingChatModel()
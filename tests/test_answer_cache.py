@@ -0,0 +1,82 @@
+"""Tests for the process-wide answer cache."""
+
+from src.studybuddy.core import answer_cache
+from src.studybuddy.core.answer_cache import AnswerCache
+
+MODEL = {"model_name": "gpt-3.5-turbo", "temperature": 0.7}
+
+
+def test_reworded_question_hits_the_same_entry():
+    cache = AnswerCache()
+    scope = AnswerCache.make_scope("v1", MODEL)
+
+    cache.put("What is osmosis?", scope, "Diffusion of water.")
+
+    assert cache.get("what is   OSMOSIS", scope) == "Diffusion of water."
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_answers_are_scoped_by_index_version_and_model():
+    cache = AnswerCache()
+    cache.put("What is osmosis?", AnswerCache.make_scope("v1", MODEL), "Diffusion of water.")
+
+    assert cache.get("What is osmosis?", AnswerCache.make_scope("v2", MODEL)) is None
+    other_model = dict(MODEL, temperature=0.0)
+    assert cache.get("What is osmosis?", AnswerCache.make_scope("v1", other_model)) is None
+
+
+def test_reindexing_one_project_keeps_answers_of_others_on_the_old_version():
+    # Projects holding the same documents share an index version
+    cache = AnswerCache()
+    shared_scope = AnswerCache.make_scope("v1", MODEL)
+    cache.put("What is osmosis?", shared_scope, "Diffusion of water.")
+
+    # One session adds a document and moves on to a new version
+    new_scope = AnswerCache.make_scope("v2", MODEL)
+    assert cache.get("What is osmosis?", new_scope) is None
+    cache.put("What is osmosis?", new_scope, "Diffusion of water, see also chapter 2.")
+
+    assert cache.get("What is osmosis?", shared_scope) == "Diffusion of water."
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60)
+    scope = AnswerCache.make_scope("v1", MODEL)
+    cache.put("What is osmosis?", scope, "Diffusion of water.")
+
+    now[0] += 59
+    assert cache.get("What is osmosis?", scope) == "Diffusion of water."
+    now[0] += 2
+    assert cache.get("What is osmosis?", scope) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = AnswerCache(max_entries=2)
+    scope = AnswerCache.make_scope("v1", MODEL)
+    cache.put("first", scope, "1")
+    cache.put("second", scope, "2")
+    cache.get("first", scope)
+
+    cache.put("third", scope, "3")
+
+    assert cache.get("second", scope) is None
+    assert cache.get("first", scope) == "1"
+    assert cache.get("third", scope) == "3"
+
+
+def test_similar_question_reuses_an_answer_above_the_threshold():
+    cache = AnswerCache(semantic_threshold=0.9)
+    scope = AnswerCache.make_scope("v1", MODEL)
+    vectors = {
+        "What is osmosis?": [1.0, 0.0],
+        "Explain osmosis": [0.99, 0.1],
+        "What is mitosis?": [0.0, 1.0],
+    }
+    cache.put("What is osmosis?", scope, "Diffusion of water.", vectors.get)
+
+    assert cache.get("Explain osmosis", scope, vectors.get) == "Diffusion of water."
+    assert cache.get("What is mitosis?", scope, vectors.get) is None
+    assert cache.get_stats()["semantic_hits"] == 1
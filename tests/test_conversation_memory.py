@@ -0,0 +1,99 @@
+"""Tests for the token-budgeted conversation memory."""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.studybuddy.core.conversation_memory import TokenBudgetMemory
+
+
+def question(turn: int) -> str:
+    return f"Question {turn} about the cell cycle " + "and mitosis " * 12
+
+
+def answer(turn: int) -> str:
+    return f"Answer {turn} on the phases of division " + "with chromosomes " * 12
+
+
+@pytest.fixture
+def memory(chat_model) -> TokenBudgetMemory:
+    # Room for about two turns next to the summary
+    return TokenBudgetMemory(llm=chat_model, max_token_limit=260, summary_token_limit=60)
+
+
+def add_turns(memory: TokenBudgetMemory, turns, save=True) -> None:
+    for turn in turns:
+        add = memory.save_context if save else memory.add_turn
+        add({"question": question(turn)}, {"answer": answer(turn)})
+
+
+def test_history_under_budget_is_sent_whole(memory, chat_model):
+    add_turns(memory, [0])
+
+    messages = memory.load_memory_variables({})["chat_history"]
+    assert [message.content for message in messages] == [question(0), answer(0)]
+    assert chat_model.prompts == []
+
+
+def test_evicted_turns_are_summarized_and_the_prompt_stays_in_budget(memory, chat_model):
+    add_turns(memory, range(6))
+
+    messages = memory.load_memory_variables({})["chat_history"]
+    assert isinstance(messages[0], SystemMessage)
+    assert messages[0].content == memory.summary
+    assert messages[-1].content == answer(5)
+    assert memory.get_prompt_tokens() <= memory.max_token_limit
+    assert memory.window_start > 0
+    assert memory.summarized_until == memory.window_start
+    assert len(memory.chat_memory.messages) == 12
+
+
+def test_add_turn_defers_summarizing_to_the_next_saved_turn(memory, chat_model):
+    add_turns(memory, range(5), save=False)
+
+    assert chat_model.prompts == []
+    assert memory.summary == ""
+    assert memory.window_start > 0
+    assert memory.summarized_until == 0
+    assert memory.get_prompt_tokens() <= memory.max_token_limit
+
+    add_turns(memory, [5])
+
+    # One summarizing call covers every turn evicted since the last one
+    assert len(chat_model.prompts) == 1
+    evicted_turns = memory.window_start // 2
+    assert evicted_turns >= 4
+    for turn in range(evicted_turns):
+        assert f"Question {turn} " in chat_model.prompts[0]
+    assert memory.summarized_until == memory.window_start
+    assert memory.summary
+
+
+def test_load_history_drops_old_turns_without_summarizing(memory, chat_model):
+    history = []
+    for turn in range(6):
+        history += [HumanMessage(content=question(turn)), AIMessage(content=answer(turn))]
+
+    memory.load_history(history)
+
+    assert chat_model.prompts == []
+    assert memory.summary == ""
+    assert memory.summarized_until == memory.window_start > 0
+    assert memory.load_memory_variables({})["chat_history"][-1].content == answer(5)
+
+    # Only turns evicted after loading are summarized later
+    restored_start = memory.window_start
+    add_turns(memory, [6])
+    assert len(chat_model.prompts) == 1
+    assert f"Question {restored_start // 2 - 1} " not in chat_model.prompts[0]
+    assert f"Question {restored_start // 2} " in chat_model.prompts[0]
+
+
+def test_clear_forgets_history_and_summary(memory):
+    add_turns(memory, range(6))
+
+    memory.clear()
+
+    assert memory.chat_memory.messages == []
+    assert memory.summary == ""
+    assert memory.get_prompt_tokens() == 0
+    assert (memory.window_start, memory.summarized_until, memory.token_counts) == (0, 0, [])
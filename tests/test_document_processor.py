@@ -0,0 +1,87 @@
+"""Tests for streaming page extraction out of uploaded PDFs."""
+
+import hashlib
+
+import pytest
+
+from benchmarks.corpus import CorpusFile, make_pdf
+from src.studybuddy.config.settings import settings
+from src.studybuddy.core.document_processor import DocumentProcessor
+from src.studybuddy.core.index_store import IndexStore
+
+
+@pytest.fixture(scope="module")
+def processor() -> DocumentProcessor:
+    return DocumentProcessor()
+
+
+@pytest.fixture(params=[1, 3], ids=["serial", "pool"])
+def workers(request, monkeypatch) -> int:
+    # Two pages per range, so files span several ranges in both modes
+    monkeypatch.setattr(settings, "PDF_EXTRACTION_WORKERS", request.param)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_TASK", 2)
+    return request.param
+
+
+def pdf(name: str, pages: int) -> CorpusFile:
+    return CorpusFile(name, make_pdf([f"{name} page {page}" for page in range(pages)]))
+
+
+def test_pages_come_in_upload_and_page_order(processor, workers):
+    uploads = [pdf("notes.pdf", 5), pdf("slides.pdf", 3)]
+
+    errors = {}
+    pages = list(processor.iter_pdf_pages(uploads, errors))
+
+    assert errors == {}
+    assert [(file_index, name) for file_index, name, _ in pages] == (
+        [(0, "notes.pdf")] * 5 + [(1, "slides.pdf")] * 3
+    )
+    assert [text.strip() for *_, text in pages] == (
+        [f"notes.pdf page {page}" for page in range(5)]
+        + [f"slides.pdf page {page}" for page in range(3)]
+    )
+
+
+def test_a_broken_file_is_reported_without_losing_the_others(processor, workers):
+    # The broken upload shares its name with a good one
+    uploads = [
+        pdf("notes.pdf", 3),
+        CorpusFile("notes.pdf", b"%PDF-1.4 not really a pdf"),
+        pdf("slides.pdf", 2),
+    ]
+
+    errors = {}
+    pages = list(processor.iter_pdf_pages(uploads, errors))
+
+    assert list(errors) == [1]
+    assert [file_index for file_index, *_ in pages] == [0, 0, 0, 2, 2]
+
+
+def test_extraction_leaves_the_uploads_unread(processor, workers):
+    upload = pdf("notes.pdf", 3)
+    upload.seek(7)
+
+    list(processor.iter_pdf_pages([upload]))
+
+    assert upload.tell() == 7
+
+
+def test_extract_pages_skips_failed_files(processor, workers, monkeypatch):
+    warnings = []
+    monkeypatch.setattr("streamlit.warning", warnings.append)
+    uploads = [CorpusFile("broken.pdf", b"garbage"), pdf("notes.pdf", 2)]
+
+    documents = processor.extract_pages_from_pdfs(uploads)
+
+    assert [(name, len(pages)) for name, pages in documents] == [("notes.pdf", 2)]
+    assert len(warnings) == 1 and "broken.pdf" in warnings[0]
+
+
+def test_hash_file_reads_the_whole_upload_and_restores_its_position(monkeypatch):
+    monkeypatch.setattr(IndexStore, "READ_BLOCK_SIZE", 7)
+    upload = pdf("notes.pdf", 2)
+    upload.seek(5)
+
+    assert IndexStore.hash_file(upload) == hashlib.sha256(upload.getvalue()).hexdigest()
+    assert upload.tell() == 5
@@ -0,0 +1,89 @@
+"""Tests for saving project indexes and removing single files from them."""
+
+from langchain_community.vectorstores import FAISS
+
+NOTES_HASH = "1" * 64
+SLIDES_HASH = "2" * 64
+
+
+def save_project(index_store, embeddings, project_id="p"):
+    """Save an index of two files, notes.pdf (3 chunks) and slides.pdf (2)."""
+    files = [("notes.pdf", NOTES_HASH, 3), ("slides.pdf", SLIDES_HASH, 2)]
+    texts, metadatas, ids = [], [], []
+    for name, file_hash, chunk_count in files:
+        for position in range(chunk_count):
+            texts.append(f"{name} chunk {position} about mitochondria")
+            metadatas.append({"source": name, "file_hash": file_hash})
+            ids.append(index_store.chunk_id(file_hash, position))
+    vector_store = FAISS.from_texts(texts, embeddings, metadatas=metadatas, ids=ids)
+
+    manifest = index_store.new_manifest()
+    manifest["files"] = [
+        {"name": name, "sha256": file_hash, "chunk_count": chunk_count}
+        for name, file_hash, chunk_count in files
+    ]
+    index_store.save(project_id, vector_store, manifest)
+    return vector_store
+
+
+def test_saved_index_loads_with_its_chunks(index_store, embeddings):
+    save_project(index_store, embeddings)
+
+    loaded = index_store.load("p", embeddings)
+    assert loaded.index.ntotal == 5
+    document = loaded.similarity_search("slides.pdf chunk 1 about mitochondria", k=1)[0]
+    assert document.page_content == "slides.pdf chunk 1 about mitochondria"
+    assert document.metadata["file_hash"] == SLIDES_HASH
+
+
+def test_remove_file_drops_only_its_vectors_and_keyword_postings(index_store, embeddings):
+    vector_store = save_project(index_store, embeddings)
+
+    manifest = index_store.remove_file("p", NOTES_HASH, vector_store)
+
+    assert [entry["sha256"] for entry in manifest["files"]] == [SLIDES_HASH]
+    assert vector_store.index.ntotal == 2
+    loaded = index_store.load("p", embeddings)
+    assert sorted(loaded.index_to_docstore_id.values()) == [
+        index_store.chunk_id(SLIDES_HASH, 0),
+        index_store.chunk_id(SLIDES_HASH, 1),
+    ]
+    hits = index_store.load_lexical("p").search("notes mitochondria", k=10)
+    assert all(chunk_id.startswith(index_store.file_key(SLIDES_HASH)) for chunk_id, _ in hits)
+
+
+def test_remove_file_loads_the_index_when_none_is_given(index_store, embeddings):
+    save_project(index_store, embeddings)
+
+    manifest = index_store.remove_file("p", SLIDES_HASH)
+
+    assert [entry["sha256"] for entry in manifest["files"]] == [NOTES_HASH]
+    assert index_store.load("p", embeddings).index.ntotal == 3
+
+
+def test_remove_last_file_leaves_an_empty_index(index_store, embeddings):
+    vector_store = save_project(index_store, embeddings)
+
+    index_store.remove_file("p", NOTES_HASH, vector_store)
+    manifest = index_store.remove_file("p", SLIDES_HASH, vector_store)
+
+    assert manifest["files"] == []
+    assert index_store.load("p", embeddings).index.ntotal == 0
+
+
+def test_remove_file_without_a_stored_index(index_store):
+    assert index_store.remove_file("missing", NOTES_HASH) is None
+
+
+def test_index_version_follows_the_indexed_files(index_store, embeddings):
+    vector_store = save_project(index_store, embeddings, "a")
+    save_project(index_store, embeddings, "b")
+    assert index_store.index_version("a") == index_store.index_version("b")
+
+    index_store.remove_file("a", NOTES_HASH, vector_store)
+    assert index_store.index_version("a") != index_store.index_version("b")
+    assert index_store.indexed_hashes() == {NOTES_HASH, SLIDES_HASH}
+
+    index_store.delete("b")
+    assert index_store.index_version("b") is None
+    assert index_store.indexed_hashes() == {SLIDES_HASH}
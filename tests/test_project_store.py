@@ -0,0 +1,113 @@
+"""Tests for the project catalog and its reference-counted file blobs."""
+
+from conftest import new_project
+
+
+def test_same_contents_are_stored_once(project_store):
+    new_project(project_store, "a")
+    new_project(project_store, "b")
+
+    file_hash = project_store.add_file("a", "notes.pdf", b"%PDF notes")
+    assert project_store.add_file("b", "copy.pdf", b"%PDF notes") == file_hash
+    assert project_store.get_refcount(file_hash) == 2
+
+    project_store.remove_files("a", [file_hash])
+    assert project_store.blob_store.exists(file_hash)
+    assert project_store.get_refcount(file_hash) == 1
+
+    project_store.remove_files("b", [file_hash])
+    assert not project_store.blob_store.exists(file_hash)
+
+
+def test_listed_contents_are_not_added_again(project_store):
+    new_project(project_store, "a")
+
+    file_hash = project_store.add_file("a", "notes.pdf", b"%PDF notes")
+    assert project_store.add_file("a", "renamed.pdf", b"%PDF notes") is None
+    assert [file["name"] for file in project_store.list_files("a")] == ["notes.pdf"]
+    assert project_store.get_refcount(file_hash) == 1
+
+
+def test_changed_file_under_listed_name_is_listed_too(project_store):
+    new_project(project_store, "a")
+
+    old_hash = project_store.add_file("a", "notes.pdf", b"%PDF version 1")
+    new_hash = project_store.add_file("a", "notes.pdf", b"%PDF version 2")
+
+    assert new_hash is not None and new_hash != old_hash
+    assert [(file["name"], file["sha256"]) for file in project_store.list_files("a")] == [
+        ("notes.pdf", old_hash),
+        ("notes.pdf", new_hash),
+    ]
+
+    project_store.remove_files("a", [old_hash])
+    assert [file["sha256"] for file in project_store.list_files("a")] == [new_hash]
+    assert not project_store.blob_store.exists(old_hash)
+    assert project_store.blob_store.exists(new_hash)
+
+
+def test_reuploaded_file_keeps_its_artifacts_through_garbage_collection(project_store):
+    new_project(project_store, "a")
+    blobs = project_store.blob_store
+    old_hash = project_store.add_file("a", "notes.pdf", b"%PDF version 1")
+    new_hash = project_store.add_file("a", "notes.pdf", b"%PDF version 2")
+    orphan_hash = "f" * 64
+    for file_hash in (old_hash, new_hash, orphan_hash):
+        blobs.save_pages(file_hash, ["page text"])
+
+    assert project_store.collect_garbage() == 1
+    assert blobs.has_pages(old_hash) and blobs.has_pages(new_hash)
+    assert not blobs.has_pages(orphan_hash)
+
+
+def test_garbage_collection_keeps_hashes_in_use_and_recent_artifacts(project_store):
+    blobs = project_store.blob_store
+    indexed_hash, recent_hash = "a" * 64, "b" * 64
+    for file_hash in (indexed_hash, recent_hash):
+        blobs.save_pages(file_hash, ["page text"])
+
+    assert project_store.collect_garbage(keep=[indexed_hash], min_age_seconds=3600) == 0
+    assert blobs.has_pages(indexed_hash) and blobs.has_pages(recent_hash)
+
+    assert project_store.collect_garbage(keep=[indexed_hash]) == 1
+    assert blobs.has_pages(indexed_hash)
+    assert not blobs.has_pages(recent_hash)
+
+
+def test_delete_project_releases_its_files_and_history(project_store):
+    new_project(project_store, "a")
+    file_hash = project_store.add_file("a", "notes.pdf", b"%PDF notes")
+    project_store.append_messages("a", [("human", "Hi"), ("ai", "Hello")], 0)
+
+    assert project_store.delete_project("a")
+    assert not project_store.delete_project("a")
+    assert project_store.get_project("a") is None
+    assert project_store.get_messages("a") == []
+    assert not project_store.blob_store.exists(file_hash)
+    assert project_store.get_stats()["total_projects"] == 0
+
+
+def test_search_projects_matches_word_prefixes_a_page_at_a_time(project_store):
+    new_project(project_store, "a", "Biology Lab Reports")
+    new_project(project_store, "b", "Organic Chemistry")
+    new_project(project_store, "c", "Biochemistry")
+
+    total, projects = project_store.search_projects("bio lab")
+    assert total == 1
+    assert [project["id"] for project in projects] == ["a"]
+
+    total, projects = project_store.search_projects("", limit=2, offset=2)
+    assert total == 3
+    assert [project["name"] for project in projects] == ["Organic Chemistry"]
+
+
+def test_messages_are_appended_and_replaced_in_order(project_store):
+    new_project(project_store, "a")
+
+    project_store.append_messages("a", [("human", "Q1"), ("ai", "A1")], 0)
+    project_store.append_messages("a", [("human", "Q2")], 2)
+    assert project_store.get_messages("a") == [("human", "Q1"), ("ai", "A1"), ("human", "Q2")]
+
+    project_store.replace_messages("a", [("human", "Only")])
+    assert project_store.get_messages("a") == [("human", "Only")]
+    assert project_store.count_messages("a") == 1
@@ -0,0 +1,26 @@
+"""Tests for matching questions against knowledge-base topics."""
+
+import pytest
+
+from src.studybuddy.core import topic_matcher
+from src.studybuddy.core.topic_matcher import TopicMatcher
+
+
+@pytest.fixture(params=[False, True], ids=["pending", "built"])
+def build(request, monkeypatch) -> bool:
+    if request.param:
+        monkeypatch.setattr(topic_matcher, "MIN_PENDING_PHRASES", 0)
+    return request.param
+
+
+def test_whole_phrase_beats_shared_words(build):
+    matcher = TopicMatcher(["cell", "cell division", "division of labour"])
+
+    assert matcher.match("How does cell division work?") == "cell division"
+    assert matcher.match("Tell me about quarks") is None
+
+
+def test_topics_with_the_same_words_all_get_phrase_hits(build):
+    matcher = TopicMatcher(["Photo synthesis", "photo synthesis?", "synthesis"])
+
+    assert matcher._find_phrases(["what", "is", "photo", "synthesis"]) == {0, 1, 2}